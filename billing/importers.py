@@ -0,0 +1,164 @@
+# billing/importers.py
+from ingestion import cleaning
+from ingestion.importers import BaseImporter
+from .models import ImportBatch, SonatelInvoice, MonthlySynthesis
+from .serializers import ImportBatchSerializer
+from .services import (
+    delete_stale_contract_months,
+    monthly_syntheses,
+    upsert_contract_months_for_keys,
+)
+
+
+# === Mapping des en-têtes Excel -> champs modèle ===
+COLUMN_MAP = {
+    "Numero Compte Contrat": "numero_compte_contrat",
+    "Partenaire": "partenaire",
+    "Localite": "localite",
+    "Arrondissement": "arrondissement",
+    "Rue": "rue",
+    "Numero Facture": "numero_facture",
+    "Date comptable Facture": "date_comptable_facture",
+    "Montant Total Energie": "montant_total_energie",
+    "Montant Redevance": "montant_redevance",
+    "Montant TCO": "montant_tco",
+    "Montant Hors TVA": "montant_hors_tva",
+    "Montant TVA": "montant_tva",
+    " Montant Facture TTC ": "montant_ttc",  # certains fichiers contiennent des espaces
+    "Date Debut Periode Facturation": "date_debut_periode",
+    "Date Fin Periode Facturation": "date_fin_periode",
+    "Ancien index K1": "ancien_index_k1",
+    "Ancien Index K2": "ancien_index_k2",
+    "Nouvel index K1": "nouvel_index_k1",
+    "Nouvel Index K2": "nouvel_index_k2",
+    "Consommation Facturée": "conso_facturee",
+    "AGENCE": "agence",
+    "N° Compteur": "numero_compteur",
+}
+
+# Clé d'unicité d'une ligne (contrainte uniq_sonatel_invoice_row)
+UNIQUE_FIELDS = ["numero_compte_contrat", "numero_facture", "date_debut_periode", "date_fin_periode"]
+
+DATE_COLS = {"date_comptable_facture", "date_debut_periode", "date_fin_periode"}
+DATE_NULL_CODES = frozenset({"NAN", "NONE", "#N/A", "N/A"})
+DEC_COLS = {
+    "montant_total_energie",
+    "montant_redevance",
+    "montant_tco",
+    "montant_hors_tva",
+    "montant_tva",
+    "montant_ttc",
+    "ancien_index_k1",
+    "ancien_index_k2",
+    "nouvel_index_k1",
+    "nouvel_index_k2",
+    "conso_facturee",
+}
+
+
+class SonatelInvoiceImporter(BaseImporter):
+    """Extraction Sonatel : une ligne par facture, répartie ensuite par mois (MonthlySynthesis)."""
+    kind = "sonatel-billing"
+    header_error = "Fichier vide."
+
+    def open(self):
+        # Lecture en flux : la 1re ligne est l'en-tête
+        reader = self.read()
+
+        # comparaison sur les libellés sans espaces autour (" Montant Facture TTC ")
+        cols = {str(c).strip(): c for c in reader.columns}
+        rename_map = {cols[src.strip()]: dst for src, dst in COLUMN_MAP.items() if src.strip() in cols}
+        reader.columns = [rename_map.get(c, c) for c in reader.columns]
+        # champs présents dans le fichier (les autres ne sont pas touchés par l'upsert)
+        self.present = [k for k in COLUMN_MAP.values() if k in reader.columns]
+
+        self.affected_keys = set()
+        self.created_count = 0
+        self.updated_count = 0
+        self.duplicates = 0  # lignes remplacées par une occurrence suivante de la même facture
+        self.monthly_total = 0
+
+    def begin(self):
+        self.batch = ImportBatch.objects.create(source_filename=self.filename)
+
+    def clean(self, df):
+        """Nettoyage vectorisé d'un paquet : [(données, empreinte)]."""
+        columns = {}
+        for k in self.present:
+            if k in DATE_COLS:
+                columns[k] = cleaning.dates(df[k], codes=DATE_NULL_CODES).dt.date
+            elif k in DEC_COLS:
+                columns[k] = cleaning.decimals(df[k])
+            else:
+                columns[k] = cleaning.text(df[k], strip=False)
+        return list(zip(cleaning.records(columns), cleaning.fingerprints(columns).tolist()))
+
+    def process(self, cleaned):
+        rows = {}  # clé d'unicité -> données (la dernière occurrence du paquet l'emporte)
+        for data, fingerprint in cleaned:
+            if not data.get("numero_facture") or not data.get("date_debut_periode") or not data.get("date_fin_periode"):
+                continue
+            key = tuple(data.get(f) for f in UNIQUE_FIELDS)
+            if key in rows:
+                self.duplicates += 1
+            data["row_fingerprint"] = int(fingerprint)
+            rows[key] = data
+        if not rows:
+            return
+
+        # 1 requête : factures déjà en base parmi celles du paquet (pk, empreinte)
+        existing = {
+            key[:-2]: key[-2:]
+            for key in SonatelInvoice.objects.filter(
+                numero_facture__in={k[1] for k in rows}
+            ).values_list(*UNIQUE_FIELDS, "pk", "row_fingerprint")
+            if key[:-2] in rows
+        }
+        # lignes identiques à l'existant : ni réécriture ni nouveau découpage mensuel
+        for key, (_pk, fingerprint) in list(existing.items()):
+            if rows[key]["row_fingerprint"] == fingerprint:
+                del rows[key], existing[key]
+                self.unchanged += 1
+        if not rows:
+            return
+        existing = {key: pk for key, (pk, _fp) in existing.items()}
+
+        self.updated_count += len(existing)
+        self.created_count += len(rows) - len(existing)
+        self.written += len(rows)
+
+        # 1 upsert sur uniq_sonatel_invoice_row (les colonnes absentes du fichier ne sont pas touchées)
+        invoices = [SonatelInvoice(batch=self.batch, **data) for data in rows.values()]
+        SonatelInvoice.objects.bulk_create(
+            invoices,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=UNIQUE_FIELDS,
+            update_fields=[k for k in self.present if k not in UNIQUE_FIELDS] + ["batch", "row_fingerprint"],
+        )
+
+        # 1 delete des anciennes tranches mensuelles, 1 insert des nouvelles
+        if existing:
+            MonthlySynthesis.objects.filter(source_id__in=existing.values()).delete()
+        payloads = monthly_syntheses(invoices)
+        MonthlySynthesis.objects.bulk_create(payloads, batch_size=1000)
+
+        self.monthly_total += len(payloads)
+        self.affected_keys.update((p.numero_compte_contrat, p.year, p.month) for p in payloads)
+
+    def finish(self):
+        # ➜ agrégat/cleanup en une seule passe
+        self.count_upserted = upsert_contract_months_for_keys(self.affected_keys)
+        self.count_deleted = delete_stale_contract_months(self.affected_keys)
+
+    def result(self):
+        return {
+            "batch": ImportBatchSerializer(self.batch).data,
+            "rows_created": self.created_count,
+            "rows_updated": self.updated_count,
+            "rows_unchanged": self.unchanged,
+            "rows_duplicated": self.duplicates,
+            "monthly_rows_created": self.monthly_total,
+            "contract_months_upserted": self.count_upserted,
+            "contract_months_deleted": self.count_deleted,
+        }
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_contractmonth'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monthlysynthesis',
+            index=models.Index(fields=['year', 'month', 'id'], name='billing_mon_year_8da416_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sonatelinvoice',
+            index=models.Index(fields=['date_comptable_facture', 'id'], name='billing_son_date_co_bc5c2e_idx'),
+        ),
+    ]
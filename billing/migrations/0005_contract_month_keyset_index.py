@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_row_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contractmonth',
+            index=models.Index(fields=['-year', '-month', 'numero_compte_contrat', 'id'], name='billing_con_year_ad8042_idx'),
+        ),
+    ]
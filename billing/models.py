@@ -50,6 +50,9 @@ class SonatelInvoice(models.Model):
     agence = models.CharField(max_length=128, null=True, blank=True)
     numero_compteur = models.CharField(max_length=64, null=True, blank=True)
 
+    # empreinte des valeurs importées (réimport : ligne inchangée -> pas d'écriture)
+    row_fingerprint = models.BigIntegerField(null=True, blank=True, editable=False)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -65,6 +68,8 @@ class SonatelInvoice(models.Model):
         indexes = [
             models.Index(fields=["numero_compte_contrat", "date_debut_periode", "date_fin_periode"]),
             models.Index(fields=["numero_facture"]),
+            # pagination par curseur (-date_comptable_facture, -id)
+            models.Index(fields=["date_comptable_facture", "id"]),
         ]
 
     def __str__(self):
@@ -102,6 +107,8 @@ class MonthlySynthesis(models.Model):
         unique_together = ("source", "year", "month")
         indexes = [
             models.Index(fields=["year", "month", "numero_compte_contrat"]),
+            # pagination par curseur (-year, -month, -id)
+            models.Index(fields=["year", "month", "id"]),
         ]
 
     def __str__(self):
@@ -138,6 +145,8 @@ class ContractMonth(models.Model):
         indexes = [
             models.Index(fields=["numero_compte_contrat", "year", "month"]),
             models.Index(fields=["year", "month"]),
+            # pagination par curseur (-year, -month, numero_compte_contrat, id)
+            models.Index(fields=["-year", "-month", "numero_compte_contrat", "id"]),
         ]
 
     def __str__(self):
@@ -0,0 +1,103 @@
+# billing/prorata.py
+"""
+Répartition mensuelle vectorisée des périodes de facturation (MonthlySynthesis).
+
+Toutes les factures d'un paquet sont découpées d'un coup : une ligne par
+(facture, mois couvert), en arithmétique entière sur les jours (datetime64[D]).
+Les montants sont répartis au prorata des jours en unités entières (millièmes,
+l'échelle de DEC) par arrondi des cumuls : la somme des tranches d'une facture
+est exactement le montant de la facture.
+"""
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import numpy as np
+import pandas as pd
+
+
+SCALE = 3  # décimales des montants MonthlySynthesis (DEC)
+AMOUNT_FIELDS = ("conso", "montant_energie", "montant_ttc")
+
+
+def to_units(values, scale=SCALE):
+    """Decimal / None -> (entiers en 10^-scale, masque des valeurs présentes)."""
+    quantum = Decimal(1).scaleb(-scale)
+    present = np.array([v is not None for v in values], dtype=bool)
+    units = np.array(
+        [int(Decimal(v).quantize(quantum, ROUND_HALF_EVEN).scaleb(scale)) if v is not None else 0 for v in values],
+        dtype=np.int64,
+    )
+    return units, present
+
+
+def from_units(units, present, scale=SCALE):
+    out = np.full(len(units), None, dtype=object)
+    out[present] = [Decimal(int(u)).scaleb(-scale) for u in units[present]]
+    return out
+
+
+def _round_div(amount, days, total_days):
+    """round(amount * days / total_days) en entiers exacts (sans débordement int64)."""
+    q, r = np.divmod(amount, total_days)
+    x = r * days
+    return q * days + x // total_days + (2 * (x % total_days) >= total_days)
+
+
+def prorata(amount, covered_before, covered_through, total_days):
+    """
+    Part d'une tranche = arrondi(cumul jusqu'à la fin de la tranche)
+                       - arrondi(cumul avant la tranche) : le total est conservé.
+    """
+    return (
+        _round_div(amount, covered_through, total_days)
+        - _round_div(amount, covered_before, total_days)
+    )
+
+
+def split_months(frame):
+    """
+    frame : une ligne par facture, colonnes period_start / period_end (dates),
+    conso / montant_energie / montant_ttc (Decimal ou None) ; les autres colonnes
+    (source_id, numero_compte_contrat...) sont recopiées sur chaque tranche.
+
+    Retourne un DataFrame d'une ligne par tranche mensuelle, colonnes de
+    MonthlySynthesis (dates en datetime.date, montants en Decimal).
+    Les périodes absentes ou inversées ne produisent aucune tranche.
+    """
+    start = pd.to_datetime(frame["period_start"]).to_numpy("datetime64[D]")
+    end = pd.to_datetime(frame["period_end"]).to_numpy("datetime64[D]")
+    valid = ~np.isnat(start) & ~np.isnat(end) & (end >= start)
+    frame, start, end = frame[valid], start[valid], end[valid]
+
+    total_days = (end - start).astype(np.int64) + 1
+    first_month = start.astype("datetime64[M]")
+    n_months = (end.astype("datetime64[M]") - first_month).astype(np.int64) + 1
+
+    # une ligne par (facture, mois) : indice de la facture + rang du mois dans sa période
+    row = np.repeat(np.arange(len(frame)), n_months)
+    rank = np.arange(len(row)) - np.repeat(np.cumsum(n_months) - n_months, n_months)
+    month = first_month[row] + rank.astype("timedelta64[M]")
+
+    seg_start = np.maximum(start[row], month.astype("datetime64[D]"))
+    seg_end = np.minimum(end[row], (month + 1).astype("datetime64[D]") - 1)
+    days_covered = (seg_end - seg_start).astype(np.int64) + 1
+    covered_through = (seg_end - start[row]).astype(np.int64) + 1
+    covered_before = covered_through - days_covered
+
+    months = month.astype(np.int64)  # mois depuis 1970-01
+    out = frame.drop(columns=[*AMOUNT_FIELDS, "period_start", "period_end"], errors="ignore")
+    out = out.iloc[row].reset_index(drop=True)
+    out["year"] = months // 12 + 1970
+    out["month"] = months % 12 + 1
+    out["period_start"] = start[row].astype(object)
+    out["period_end"] = end[row].astype(object)
+    out["period_total_days"] = total_days[row]
+    out["days_covered"] = days_covered
+
+    for field in AMOUNT_FIELDS:
+        if field not in frame:
+            out[field] = None
+            continue
+        units, present = to_units(frame[field].tolist())
+        parts = prorata(units[row], covered_before, covered_through, total_days[row])
+        out[field] = from_units(parts, present[row])
+    return out
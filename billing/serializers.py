@@ -12,7 +12,7 @@ class ImportBatchSerializer(serializers.ModelSerializer):
 class SonatelInvoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = SonatelInvoice
-        exclude = []
+        exclude = ["row_fingerprint"]
 
 class MonthlySynthesisSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,169 @@
+# billing/services.py
+import time
+from typing import Set, Tuple
+
+import pandas as pd
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+from .models import SonatelInvoice, MonthlySynthesis, ContractMonth
+from .prorata import split_months
+
+
+def monthly_syntheses(invoices):
+    """
+    Prépare les objets MonthlySynthesis (non sauvegardés) d'une liste de lignes
+    brutes (déjà enregistrées : pk requis). Découpage vectorisé au prorata du
+    nombre de jours couverts dans chaque mois (voir billing.prorata).
+    """
+    if not invoices:
+        return []
+    frame = pd.DataFrame({
+        "source_id": [inv.pk for inv in invoices],
+        "numero_compte_contrat": [inv.numero_compte_contrat for inv in invoices],
+        "numero_facture": [inv.numero_facture for inv in invoices],
+        "period_start": [inv.date_debut_periode for inv in invoices],
+        "period_end": [inv.date_fin_periode for inv in invoices],
+        "conso": [inv.conso_facturee for inv in invoices],
+        "montant_energie": [inv.montant_total_energie for inv in invoices],
+        "montant_ttc": [inv.montant_ttc for inv in invoices],
+    })
+    rows = split_months(frame)
+    return [MonthlySynthesis(**row) for row in rows.to_dict("records")]
+
+
+def build_monthly_payloads(inv: SonatelInvoice):
+    """Tranches mensuelles d'une seule ligne brute."""
+    return monthly_syntheses([inv])
+
+
+# Clés (contrat, année, mois) par requête hors PostgreSQL (VALUES : 3 paramètres par clé)
+VALUES_KEYS_PER_STATEMENT = 5000
+
+CONTRACT_MONTH_AGGREGATES = {
+    "conso": "SUM(ms.conso)",
+    "montant_energie": "SUM(ms.montant_energie)",
+    "montant_ttc": "SUM(ms.montant_ttc)",
+    "invoices_count": "COUNT(*)",
+    "first_period_start": "MIN(ms.period_start)",
+    "last_period_end": "MAX(ms.period_end)",
+}
+
+
+def _key_sets(keys: Set[Tuple[str, int, int]]):
+    """
+    Découpe les clés en (CTE "keys", paramètres) : la liste part en base comme une
+    table (unnest de 3 tableaux sous PostgreSQL, VALUES ailleurs) au lieu d'un OR par clé.
+    """
+    keys = sorted(keys)
+    if connection.vendor == "postgresql":
+        accs, years, months = (list(col) for col in zip(*keys))
+        yield (
+            "SELECT * FROM unnest(%s::varchar[], %s::int[], %s::int[])",
+            [accs, years, months],
+        )
+        return
+    for i in range(0, len(keys), VALUES_KEYS_PER_STATEMENT):
+        part = keys[i:i + VALUES_KEYS_PER_STATEMENT]
+        yield (
+            "VALUES " + ", ".join(["(%s, %s, %s)"] * len(part)),
+            [v for key in part for v in key],
+        )
+
+
+def _tables():
+    qn = connection.ops.quote_name
+    return qn(MonthlySynthesis._meta.db_table), qn(ContractMonth._meta.db_table)
+
+
+def delete_stale_contract_months(keys: Set[Tuple[str, int, int]]) -> int:
+    """
+    Supprime les ContractMonth pour les (acc, y, m) donnés qui n'ont plus
+    aucune ligne MonthlySynthesis correspondante (1 DELETE en anti-jointure).
+    """
+    if not keys:
+        return 0
+
+    synthesis, contract_month = _tables()
+    deleted = 0
+    with connection.cursor() as cursor:
+        for source, params in _key_sets(keys):
+            cursor.execute(
+                f"""
+                DELETE FROM {contract_month}
+                WHERE (numero_compte_contrat, year, month) IN (
+                    WITH keys (numero_compte_contrat, year, month) AS ({source})
+                    SELECT numero_compte_contrat, year, month FROM keys
+                )
+                AND NOT EXISTS (
+                    SELECT 1 FROM {synthesis} ms
+                    WHERE ms.numero_compte_contrat = {contract_month}.numero_compte_contrat
+                      AND ms.year = {contract_month}.year
+                      AND ms.month = {contract_month}.month
+                )
+                """,
+                params,
+            )
+            deleted += cursor.rowcount
+    return deleted
+
+
+def upsert_contract_months_for_keys(keys: Set[Tuple[str, int, int]]) -> int:
+    """
+    keys = {(numero_compte_contrat, year, month), ...}
+    Recalcule depuis MonthlySynthesis et fait l'upsert dans ContractMonth en une
+    instruction : INSERT ... SELECT ... GROUP BY ... ON CONFLICT DO UPDATE.
+    Retourne le nb de lignes insérées ou mises à jour.
+    """
+    if not keys:
+        return 0
+
+    synthesis, contract_month = _tables()
+    columns = ", ".join(CONTRACT_MONTH_AGGREGATES)
+    aggregates = ", ".join(CONTRACT_MONTH_AGGREGATES.values())
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in CONTRACT_MONTH_AGGREGATES)
+    upserted = 0
+    with connection.cursor() as cursor:
+        for source, params in _key_sets(keys):
+            cursor.execute(
+                f"""
+                INSERT INTO {contract_month} (numero_compte_contrat, year, month, {columns})
+                WITH keys (numero_compte_contrat, year, month) AS ({source})
+                SELECT ms.numero_compte_contrat, ms.year, ms.month, {aggregates}
+                FROM {synthesis} ms
+                JOIN keys k
+                  ON k.numero_compte_contrat = ms.numero_compte_contrat
+                 AND k.year = ms.year
+                 AND k.month = ms.month
+                GROUP BY ms.numero_compte_contrat, ms.year, ms.month
+                ON CONFLICT (numero_compte_contrat, year, month) DO UPDATE SET {updates}
+                """,
+                params,
+            )
+            upserted += cursor.rowcount
+    return upserted
+
+
+# ---- Cache des agrégats ContractMonth (ContractMonthViewSet) ----
+# Les clés portent une version, changée à chaque ImportBatch (voir billing.signals) :
+# les anciennes entrées ne sont plus lues et expirent d'elles-mêmes.
+CONTRACT_MONTH_VERSION_KEY = "billing:contract-month:version"
+
+
+def contract_months_version():
+    return cache.get_or_set(CONTRACT_MONTH_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def invalidate_contract_months_cache():
+    cache.set(CONTRACT_MONTH_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def month_period(start=None, end=None):
+    """Q sur (year, month), bornes (année, mois) incluses."""
+    q = Q()
+    if start:
+        q &= Q(year__gt=start[0]) | Q(year=start[0], month__gte=start[1])
+    if end:
+        q &= Q(year__lt=end[0]) | Q(year=end[0], month__lte=end[1])
+    return q
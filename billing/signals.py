@@ -0,0 +1,14 @@
+# billing/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import ImportBatch
+from .services import invalidate_contract_months_cache
+
+
+@receiver(post_save, sender=ImportBatch)
+def import_batch_created(sender, instance, created, **kwargs):
+    # après commit : l'import (ContractMonth compris) est alors visible
+    if created:
+        transaction.on_commit(invalidate_contract_months_cache)
@@ -1,3 +1,126 @@
-from django.test import TestCase
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.core.files.base import ContentFile
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase
+from openpyxl import Workbook
+
+from billing.importers import SonatelInvoiceImporter
+from billing.models import ContractMonth, MonthlySynthesis, SonatelInvoice
+from billing.prorata import AMOUNT_FIELDS, from_units, prorata, split_months, to_units
+from ingestion import readers
+
+
+D = datetime.date
+
+
+def invoices(*rows):
+    return pd.DataFrame(
+        [
+            dict(source_id=i, period_start=start, period_end=end, conso=conso,
+                 montant_energie=energie, montant_ttc=ttc)
+            for i, (start, end, conso, energie, ttc) in enumerate(rows)
+        ]
+    )
+
+
+class SplitMonthsTests(SimpleTestCase):
+    def test_totals_are_kept(self):
+        frame = invoices(
+            (D(2025, 1, 15), D(2025, 3, 14), Decimal("1000.001"), Decimal("458543"), Decimal("0.005")),
+            (D(2024, 12, 31), D(2025, 1, 1), Decimal("1"), Decimal("-7.777"), Decimal("99999999.999")),
+            (D(2025, 2, 1), D(2025, 2, 28), Decimal("10"), None, Decimal("3")),
+        )
+        out = split_months(frame)
+        for i, row in frame.iterrows():
+            parts = out[out["source_id"] == row["source_id"]]
+            self.assertEqual(parts["days_covered"].sum(), (row["period_end"] - row["period_start"]).days + 1)
+            for field in AMOUNT_FIELDS:
+                if row[field] is None:
+                    self.assertTrue(parts[field].isna().all())
+                else:
+                    self.assertEqual(sum(parts[field]), row[field])
+
+    def test_one_slice_per_month(self):
+        out = split_months(invoices((D(2024, 11, 20), D(2025, 2, 10), Decimal("90"), None, None)))
+        self.assertEqual(
+            list(zip(out["year"], out["month"], out["days_covered"])),
+            [(2024, 11, 11), (2024, 12, 31), (2025, 1, 31), (2025, 2, 10)],
+        )
+        self.assertTrue((out["period_total_days"] == 83).all())
+        self.assertEqual(list(out["period_start"].unique()), [D(2024, 11, 20)])
+
+    def test_invalid_periods_are_dropped(self):
+        out = split_months(invoices(
+            (D(2025, 3, 1), D(2025, 2, 1), Decimal("1"), None, None),
+            (None, D(2025, 2, 1), Decimal("1"), None, None),
+            (D(2025, 1, 1), D(2025, 1, 1), Decimal("1"), None, None),
+        ))
+        self.assertEqual(list(out["source_id"]), [2])
+
+    def test_prorata_rounding(self):
+        # 1 / 3 en millièmes : 333 + 333 + 334, arrondi des cumuls
+        units, present = to_units([Decimal("1")] * 3)
+        parts = prorata(units, np.array([0, 1, 2]), np.array([1, 2, 3]), np.array([3, 3, 3]))
+        self.assertEqual(list(parts), [333, 334, 333])
+        self.assertEqual(list(from_units(parts, present)), [Decimal("0.333"), Decimal("0.334"), Decimal("0.333")])
+
+    def test_large_amounts_do_not_overflow(self):
+        units, _ = to_units([Decimal("9999999999999.999")])
+        parts = prorata(np.repeat(units, 2), np.array([0, 200]), np.array([200, 365]), np.array([365, 365]))
+        self.assertEqual(int(parts.sum()), int(units[0]))
+
+
+HEADER = [
+    "Numero Compte Contrat", "Partenaire", "Numero Facture", "Date comptable Facture", " Montant Facture TTC ",
+    "Date Debut Periode Facturation", "Date Fin Periode Facturation", "Consommation Facturée",
+]
+
+
+def sonatel_file(rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(HEADER)
+    for numero, ttc in rows:
+        ws.append(["ACC1", "P", numero, "15/03/2025", ttc, "15/01/2025", "14/03/2025", "100"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return ContentFile(buf.getvalue(), name="son.xlsx")
+
+
+class SonatelImportTests(TestCase):
+    def run_import(self, rows, **options):
+        f = sonatel_file(rows)
+        return SonatelInvoiceImporter(f, f.name, options).run()
+
+    def counts(self, result):
+        return tuple(result[f"rows_{k}"] for k in ("created", "updated", "unchanged", "duplicated"))
+
+    def test_created_updated_unchanged_counts(self):
+        result = self.run_import([("F1", "10"), ("F2", "20"), ("F3", "30")])
+        self.assertEqual(self.counts(result), (3, 0, 0, 0))
+        self.assertEqual(MonthlySynthesis.objects.count(), 9)  # 3 factures sur 3 mois
+
+        # F2 modifiée, F4 nouvelle, F1/F3 identiques ; F4 en double (dernière occurrence gardée)
+        result = self.run_import([("F1", "10"), ("F2", "21"), ("F3", "30"), ("F4", "1"), ("F4", "40")])
+        self.assertEqual(self.counts(result), (1, 1, 2, 1))
+        self.assertEqual(
+            dict(SonatelInvoice.objects.values_list("numero_facture", "montant_ttc")),
+            {"F1": Decimal("10"), "F2": Decimal("21"), "F3": Decimal("30"), "F4": Decimal("40")},
+        )
+        self.assertEqual(MonthlySynthesis.objects.count(), 12)  # tranches de F2 remplacées, pas ajoutées
+        self.assertEqual(
+            ContractMonth.objects.aggregate(total=Sum("montant_ttc"))["total"], Decimal("101"),
+        )
+
+    def test_duplicates_across_chunks(self):
+        with mock.patch.object(readers, "DEFAULT_CHUNK_SIZE", 2):
+            result = self.run_import([("F1", "10"), ("F2", "20"), ("F1", "11")])
+        # 2e paquet : F1 déjà écrite par le 1er, donc mise à jour
+        self.assertEqual(self.counts(result)[:2], (2, 1))
+        self.assertEqual(SonatelInvoice.objects.get(numero_facture="F1").montant_ttc, Decimal("11"))
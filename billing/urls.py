@@ -1,11 +1,12 @@
 # sonatel_billing/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ImportBatchViewSet, SonatelInvoiceViewSet, MonthlySynthesisViewSet
+from .views import ContractMonthViewSet, ImportBatchViewSet, SonatelInvoiceViewSet, MonthlySynthesisViewSet
 
 router = DefaultRouter()
 router.register(r"sonatel-billing/batches", ImportBatchViewSet, basename="sb-batches")
 router.register(r"sonatel-billing/records", SonatelInvoiceViewSet, basename="sb-records")
 router.register(r"sonatel-billing/monthly", MonthlySynthesisViewSet, basename="sb-monthly")
+router.register(r"sonatel-billing/contract-months", ContractMonthViewSet, basename="sb-contract-months")
 
 urlpatterns = [path("", include(router.urls))]
@@ -1,255 +1,44 @@
-from datetime import datetime
-from decimal import Decimal
-import pandas as pd
+import hashlib
+from urllib.parse import urlencode
 
-from django.db import transaction
-from django.db.models import Q
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
 from rest_framework import viewsets, status, mixins
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 
-from .models import ImportBatch, SonatelInvoice, MonthlySynthesis
+from enertrack_backend.exports import ExportMixin, model_fields
+from enertrack_backend.pagination import KeysetPagination, StreamAllMixin
+from ingestion.views import ImportViewMixin
+from .importers import SonatelInvoiceImporter
+from .models import ContractMonth, ImportBatch, SonatelInvoice, MonthlySynthesis
 from .serializers import (
+    ContractMonthSerializer,
     ImportBatchSerializer,
     SonatelInvoiceSerializer,
     MonthlySynthesisSerializer,
 )
-from .utils import parse_decimal_fr, iter_month_slices
+from .services import contract_months_version, month_period
 
-# ... (COLUMN_MAP, DATE_COLS, DEC_COLS identiques)
 
-from django.db.models import Q  # <-- ajoute ceci
-# services.py (ou dans views.py si tu préfères)
-from django.db import transaction
-from django.db.models import Sum, Count, Min, Max
-from .models import MonthlySynthesis, ContractMonth
-from typing import Set, Tuple
-from django.db.models import Q
-
-# === Mapping des en-têtes Excel -> champs modèle ===
-COLUMN_MAP = {
-    "Numero Compte Contrat": "numero_compte_contrat",
-    "Partenaire": "partenaire",
-    "Localite": "localite",
-    "Arrondissement": "arrondissement",
-    "Rue": "rue",
-    "Numero Facture": "numero_facture",
-    "Date comptable Facture": "date_comptable_facture",
-    "Montant Total Energie": "montant_total_energie",
-    "Montant Redevance": "montant_redevance",
-    "Montant TCO": "montant_tco",
-    "Montant Hors TVA": "montant_hors_tva",
-    "Montant TVA": "montant_tva",
-    " Montant Facture TTC ": "montant_ttc",  # certains fichiers contiennent des espaces
-    "Date Debut Periode Facturation": "date_debut_periode",
-    "Date Fin Periode Facturation": "date_fin_periode",
-    "Ancien index K1": "ancien_index_k1",
-    "Ancien Index K2": "ancien_index_k2",
-    "Nouvel index K1": "nouvel_index_k1",
-    "Nouvel Index K2": "nouvel_index_k2",
-    "Consommation Facturée": "conso_facturee",
-    "AGENCE": "agence",
-    "N° Compteur": "numero_compteur",
-}
-
-DATE_COLS = {"date_comptable_facture", "date_debut_periode", "date_fin_periode"}
-DEC_COLS = {
-    "montant_total_energie",
-    "montant_redevance",
-    "montant_tco",
-    "montant_hors_tva",
-    "montant_tva",
-    "montant_ttc",
-    "ancien_index_k1",
-    "ancien_index_k2",
-    "nouvel_index_k1",
-    "nouvel_index_k2",
-    "conso_facturee",
-}
-
-
-
-
-def _to_date(x):
-    # vides / NaN
-    if x is None or (isinstance(x, float) and pd.isna(x)):
-        return None
-    s = str(x).strip()
-    if s == "" or s.lower() in {"nan", "none", "#n/a", "n/a"}:
-        return None
-
-    # objets datetime/pandas
-    if isinstance(x, (pd.Timestamp, )):
-        return x.date()
-    from datetime import date as _date, datetime as _dt
-    if isinstance(x, _date) and not isinstance(x, _dt):
-        return x
-    if isinstance(x, _dt):
-        return x.date()
-
-    # parse auto
-    try:
-        ts = pd.to_datetime(s, dayfirst=True, errors="coerce")
-        if ts is not None and not pd.isna(ts):
-            return ts.date()
-    except Exception:
-        pass
-
-    # formats courants
-    for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y", "%Y.%m.%d", "%Y-%m-%d %H:%M:%S"):
-        try:
-            return datetime.strptime(s, fmt).date()
-        except Exception:
-            continue
-
-    # nombres Excel
-    try:
-        sn = s.replace(",", ".")
-        if sn.replace(".", "", 1).lstrip("-").isdigit():
-            val = float(sn)
-            if 30000 <= val <= 60000:
-                ts = pd.to_datetime(val, unit="D", origin="1899-12-30", errors="coerce")
-                if ts is not None and not pd.isna(ts):
-                    return ts.date()
-    except Exception:
-        pass
-
-    return None
-
-
-def _build_monthly_payloads(inv: SonatelInvoice):
-    """
-    Prépare les objets MonthlySynthesis (non sauvegardés) pour une ligne brute.
-    Répartition au prorata du nombre de jours couverts dans chaque mois.
-    """
-    start, end = inv.date_debut_periode, inv.date_fin_periode
-    if not start or not end or end < start:
-        return []
-
-    total_days = (end - start).days + 1
-    if total_days <= 0:
-        return []
-
-    conso = inv.conso_facturee or Decimal("0")
-    m_energie = inv.montant_total_energie or Decimal("0")
-    m_ttc = inv.montant_ttc or Decimal("0")
-
-    payloads = []
-    # iter_month_slices: (y, m, seg_start, seg_end, days_in_month, days_covered)
-    for y, m, _seg_start, _seg_end, _days_in_month, days_covered in iter_month_slices(start, end):
-        ratio = Decimal(days_covered) / Decimal(total_days)
-        payloads.append(
-            MonthlySynthesis(
-                source=inv,
-                year=y,
-                month=m,
-                period_start=start,
-                period_end=end,
-                period_total_days=total_days,
-                days_covered=days_covered,
-                conso=(conso * ratio) if inv.conso_facturee is not None else None,
-                montant_energie=(m_energie * ratio) if inv.montant_total_energie is not None else None,
-                montant_ttc=(m_ttc * ratio) if inv.montant_ttc is not None else None,
-                numero_compte_contrat=inv.numero_compte_contrat,
-                numero_facture=inv.numero_facture,
-            )
-        )
-    return payloads
-
-
-class ImportBatchViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
+class ImportBatchViewSet(ImportViewMixin, viewsets.GenericViewSet, mixins.ListModelMixin):
     queryset = ImportBatch.objects.all().order_by("-imported_at")
     serializer_class = ImportBatchSerializer
     parser_classes = (MultiPartParser, FormParser)
-    
-
-    @action(methods=["post"], detail=False, url_path="import")
-    def import_file(self, request, *args, **kwargs):
-        f = request.FILES.get("file")
-        if not f:
-            return Response({"detail": "Aucun fichier fourni"}, status=400)
-
-        affected_keys = set()
-
-        with transaction.atomic():
-            batch = ImportBatch.objects.create(source_filename=f.name)
-            df = pd.read_excel(f, dtype=str)
-
-            cols = {c.strip(): c for c in df.columns}
-            rename_map = {cols.get(src, src): dst for src, dst in COLUMN_MAP.items() if src in cols}
-            df = df.rename(columns=rename_map)
-
-            created_count = 0
-            updated_count = 0
-            monthly_total = 0
+    importer_class = SonatelInvoiceImporter
+    file_required_detail = "Aucun fichier fourni"
 
-            for _, row in df.iterrows():
-                data = {}
-                for k in COLUMN_MAP.values():
-                    if k not in df.columns:
-                        continue
-                    val = row.get(k, None)
-                    if k in DATE_COLS:
-                        data[k] = _to_date(val)
-                    elif k in DEC_COLS:
-                        data[k] = parse_decimal_fr(val)
-                    else:
-                        data[k] = None if (pd.isna(val) or val == "") else str(val)
+    def import_response(self, importer, result):
+        return Response(result, status=status.HTTP_201_CREATED)
 
-                if not data.get("numero_facture") or not data.get("date_debut_periode") or not data.get("date_fin_periode"):
-                    continue
 
-                existing = SonatelInvoice.objects.filter(
-                    numero_compte_contrat=data.get("numero_compte_contrat"),
-                    numero_facture=data.get("numero_facture"),
-                    date_debut_periode=data.get("date_debut_periode"),
-                    date_fin_periode=data.get("date_fin_periode"),
-                ).first()
-
-                if existing:
-                    # UPDATE
-                    for k, v in data.items():
-                        setattr(existing, k, v)
-                    existing.batch = batch
-                    existing.save()
-
-                    existing.months.all().delete()
-                    payloads = _build_monthly_payloads(existing)
-                    MonthlySynthesis.objects.bulk_create(payloads)
-                    updated_count += 1
-                else:
-                    # INSERT
-                    inv = SonatelInvoice.objects.create(batch=batch, **data)
-                    payloads = _build_monthly_payloads(inv)
-                    MonthlySynthesis.objects.bulk_create(payloads)
-                    created_count += 1
-
-                monthly_total += len(payloads)
-                for p in payloads:
-                    affected_keys.add((p.numero_compte_contrat, p.year, p.month))
-
-            # ➜ agrégat/cleanup en une seule passe
-            count_upserted = upsert_contract_months_for_keys(affected_keys)
-            count_deleted = delete_stale_contract_months(affected_keys)
-
-        return Response(
-            {
-                "batch": ImportBatchSerializer(batch).data,
-                "rows_created": created_count,
-                "rows_updated": updated_count,
-                "monthly_rows_created": monthly_total,
-                "contract_months_upserted": count_upserted,
-                "contract_months_deleted": count_deleted,
-            },
-            status=status.HTTP_201_CREATED,
-        )
-
-
-
-class SonatelInvoiceViewSet(viewsets.ReadOnlyModelViewSet):
+class SonatelInvoiceViewSet(StreamAllMixin, viewsets.ReadOnlyModelViewSet):
     queryset = SonatelInvoice.objects.select_related("batch").all().order_by("-date_comptable_facture")
     serializer_class = SonatelInvoiceSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -263,9 +52,14 @@ class SonatelInvoiceViewSet(viewsets.ReadOnlyModelViewSet):
         return qs
 
 
-class MonthlySynthesisViewSet(viewsets.ReadOnlyModelViewSet):
+class MonthlySynthesisViewSet(ExportMixin, StreamAllMixin, viewsets.ReadOnlyModelViewSet):
     queryset = MonthlySynthesis.objects.select_related("source").all().order_by("-year", "-month")
     serializer_class = MonthlySynthesisSerializer
+    pagination_class = KeysetPagination
+    # GET /api/sonatel-billing/monthly/export/?output=csv|ndjson|parquet|arrow (mêmes filtres, en flux)
+    export_name = "monthly_synthesis"
+    export_columnar = True
+    export_fields = model_fields(MonthlySynthesis)
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -284,110 +78,122 @@ class MonthlySynthesisViewSet(viewsets.ReadOnlyModelViewSet):
         return qs
 
 
+def _year_month(value, name):
+    """'2025-03' -> (2025, 3)"""
+    try:
+        year, month = (int(x) for x in value.split("-"))
+    except ValueError:
+        raise ValidationError({"detail": f"{name} attendu au format AAAA-MM"})
+    if not 1 <= month <= 12:
+        raise ValidationError({"detail": f"{name} attendu au format AAAA-MM"})
+    return year, month
 
 
-
-
-def _q_or_from_keys(keys: Set[Tuple[str, int, int]]) -> Q:
-    q = Q()
-    first = True
-    for acc, y, m in keys:
-        part = Q(numero_compte_contrat=acc, year=y, month=m)
-        q = part if first else (q | part)
-        first = False
-    return q if not first else Q(pk__in=[])  # vide si rien
-
-def delete_stale_contract_months(keys: Set[Tuple[str, int, int]]) -> int:
-    """
-    Supprime les ContractMonth pour les (acc, y, m) donnés qui n'ont plus
-    aucune ligne MonthlySynthesis correspondante.
-    """
-    if not keys:
-        return 0
-
-    # Clés encore présentes dans MonthlySynthesis
-    alive = set(
-        MonthlySynthesis.objects
-        .filter(_q_or_from_keys(keys))
-        .values_list("numero_compte_contrat", "year", "month")
-        .distinct()
-    )
-
-    stale = keys - alive
-    if not stale:
-        return 0
-
-    return ContractMonth.objects.filter(_q_or_from_keys(stale)).delete()[0]
-
-
-
-def upsert_contract_months_for_keys(keys: set[tuple[str, int, int]]):
+class ContractMonthViewSet(viewsets.ReadOnlyModelViewSet):
     """
-    keys = {(numero_compte_contrat, year, month), ...}
-    Recalcule depuis MonthlySynthesis et fait un upsert dans ContractMonth.
+    Agrégats mensuels par contrat (ContractMonth, tenu à jour à chaque import).
+    GET /api/sonatel-billing/contract-months/?year=&month=&account=A,B&q=&from=AAAA-MM&to=AAAA-MM
+    GET .../contract-months/pivot/?value=montant_ttc|montant_energie|conso|invoices_count
+        -> matrice contrat × mois (+ totaux par mois)
+    GET .../contract-months/totals/  -> totaux par mois
+    Réponses en cache, invalidées à chaque nouvel ImportBatch.
     """
-    if not keys:
-        return 0
-
-    # Filtre one-shot
-    filters = None
-    from django.db.models import Q
-    for (acc, y, m) in keys:
-        q = Q(numero_compte_contrat=acc, year=y, month=m)
-        filters = (filters | q) if filters is not None else q
-
-    qs = (MonthlySynthesis.objects
-          .filter(filters)
-          .values("numero_compte_contrat", "year", "month")
-          .annotate(
-              conso=Sum("conso"),
-              montant_energie=Sum("montant_energie"),
-              montant_ttc=Sum("montant_ttc"),
-              invoices_count=Count("id"),
-              first_period_start=Min("period_start"),
-              last_period_end=Max("period_end"),
-          ))
+    queryset = ContractMonth.objects.all().order_by("-year", "-month", "numero_compte_contrat")
+    serializer_class = ContractMonthSerializer
+    pagination_class = KeysetPagination
+    pivot_values = ("montant_ttc", "montant_energie", "conso", "invoices_count")
 
-    # Prépare upsert
-    objs = [
-        ContractMonth(
-            numero_compte_contrat=r["numero_compte_contrat"],
-            year=r["year"], month=r["month"],
-            conso=r["conso"], montant_energie=r["montant_energie"], montant_ttc=r["montant_ttc"],
-            invoices_count=r["invoices_count"],
-            first_period_start=r["first_period_start"],
-            last_period_end=r["last_period_end"],
-        )
-        for r in qs
-    ]
-
-    # Django 4.1+ : bulk upsert
-    try:
-        ContractMonth.objects.bulk_create(
-            objs,
-            update_conflicts=True,
-            unique_fields=["numero_compte_contrat", "year", "month"],
-            update_fields=[
-                "conso", "montant_energie", "montant_ttc",
-                "invoices_count", "first_period_start", "last_period_end"
-            ],
-        )
-        return len(objs)
-    except TypeError:
-        # Fallback si ta version ne supporte pas update_conflicts
-        # (plus lent mais OK pour un volume modéré)
-        with transaction.atomic():
-            for o in objs:
-                ContractMonth.objects.update_or_create(
-                    numero_compte_contrat=o.numero_compte_contrat,
-                    year=o.year, month=o.month,
-                    defaults=dict(
-                        conso=o.conso,
-                        montant_energie=o.montant_energie,
-                        montant_ttc=o.montant_ttc,
-                        invoices_count=o.invoices_count,
-                        first_period_start=o.first_period_start,
-                        last_period_end=o.last_period_end,
-                    )
+    def get_queryset(self):
+        qs = super().get_queryset()
+        p = self.request.query_params
+        try:
+            if p.get("year"):
+                qs = qs.filter(year=int(p["year"]))
+            if p.get("month"):
+                qs = qs.filter(month=int(p["month"]))
+        except ValueError:
+            raise ValidationError({"detail": "year / month doivent être des entiers"})
+        if p.get("account"):
+            qs = qs.filter(numero_compte_contrat__in=[a.strip() for a in p["account"].split(",") if a.strip()])
+        if p.get("q"):
+            qs = qs.filter(numero_compte_contrat__icontains=p["q"])
+        start = _year_month(p["from"], "from") if p.get("from") else None
+        end = _year_month(p["to"], "to") if p.get("to") else None
+        return qs.filter(month_period(start, end))
+
+    def cached(self, request, build):
+        """Données de réponse en cache, clé = version des agrégats + action + paramètres."""
+        params = hashlib.md5(urlencode(sorted(request.query_params.lists()), doseq=True).encode()).hexdigest()
+        key = f"billing:contract-month:{contract_months_version()}:{self.action}:{params}"
+        data = cache.get(key)
+        if data is None:
+            data = build()
+            cache.set(key, data, settings.CONTRACT_MONTH_CACHE_TTL)
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, lambda: super(ContractMonthViewSet, self).list(request, *args, **kwargs).data)
+
+    @action(detail=False, methods=["get"])
+    def pivot(self, request):
+        value = request.query_params.get("value", "montant_ttc")
+        if value not in self.pivot_values:
+            return Response({"detail": f"value doit valoir : {', '.join(self.pivot_values)}"}, status=400)
+
+        def build():
+            rows = list(
+                self.filter_queryset(self.get_queryset())
+                .order_by("numero_compte_contrat", "year", "month")
+                .values_list("numero_compte_contrat", "year", "month", value)
+            )
+            months = sorted({(y, m) for _, y, m, _ in rows})
+            column = {ym: i for i, ym in enumerate(months)}
+            matrix = {}
+            totals = [0] * len(months)
+            for account, y, m, v in rows:
+                values = matrix.setdefault(account, [None] * len(months))
+                values[column[(y, m)]] = v
+                if v is not None:
+                    totals[column[(y, m)]] += v
+            return {
+                "value": value,
+                "months": [f"{y}-{m:02d}" for y, m in months],
+                "rows": [
+                    {"account": account, "values": values, "total": sum(v for v in values if v is not None)}
+                    for account, values in matrix.items()
+                ],
+                "totals": totals,
+                "total": sum(totals),
+            }
+
+        return self.cached(request, build)
+
+    @action(detail=False, methods=["get"])
+    def totals(self, request):
+        def build():
+            rows = (
+                self.filter_queryset(self.get_queryset())
+                .values("year", "month")
+                .annotate(
+                    accounts=Count("id"),
+                    total_invoices=Sum("invoices_count"),
+                    total_conso=Sum("conso"),
+                    total_energie=Sum("montant_energie"),
+                    total_ttc=Sum("montant_ttc"),
                 )
-        return len(objs)
+                .order_by("year", "month")
+            )
+            return [
+                {
+                    "year": r["year"],
+                    "month": r["month"],
+                    "accounts": r["accounts"],
+                    "invoices_count": r["total_invoices"],
+                    "conso": r["total_conso"],
+                    "montant_energie": r["total_energie"],
+                    "montant_ttc": r["total_ttc"],
+                }
+                for r in rows
+            ]
+
+        return self.cached(request, build)
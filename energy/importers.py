@@ -0,0 +1,368 @@
+# energy/importers.py
+import re
+from calendar import month_name
+
+from dateutil.parser import parse as parse_date
+
+from ingestion import cleaning
+from ingestion.headers import HeaderSpec, normalize_units
+from ingestion.importers import BaseImporter, ImportFailed
+from .models import Country, SiteEnergyMonthlyStat, EnergyMonthlyStat
+from .services import resolve_sites
+
+
+MONTHS_MAP = {m.lower(): i for i, m in enumerate(month_name) if m}
+MONTHS_MAP.update({
+    'januray': 1,  # tolère la faute du fichier exemple
+    'january': 1
+})
+
+# Nb max de lignes parcourues pour trouver l'en-tête du tableau
+HEADER_SCAN_MAX = 100
+
+# Champs réécrits lors d'un ré-import (site, year, month) déjà présent
+SITE_ENERGY_UPDATE_FIELDS = [
+    "grid_status", "dg_status", "solar_status",
+    "grid_energy_kwh", "solar_energy_kwh", "telecom_load_kwh",
+    "grid_energy_pct", "rer_pct",
+    "router_availability_pct", "pwm_availability_pct", "pwc_availability_pct",
+    "source_filename",
+]
+
+
+# Colonnes du fichier par site (compilé une fois)
+SITE_ENERGY_HEADER = HeaderSpec({
+    "site_id": ["site id"],
+    "site_name": ["site name"],
+    "grid_status": ["grid"],
+    "dg_status": ["dg"],
+    "solar_status": ["solar"],
+    "grid_energy_kwh": ["grid energy kwh"],
+    "solar_energy_kwh": ["solar energy kwh"],
+    "telecom_load_kwh": ["telecom load energy kwh"],
+    "grid_energy_pct": ["grid energy"],
+    "rer_pct": ["rer renewable energy ratio"],
+    "router_availability_pct": ["router monitoring availability"],
+    "pwm_availability_pct": ["pwm monitoring availability"],
+    "pwc_availability_pct": ["pwc monitoring availability"],
+}, normalize=normalize_units)
+
+
+def _fuzzy_date(text):
+    try:
+        return parse_date(text, fuzzy=True)
+    except Exception:
+        return None
+
+
+def _report_date(importer, n):
+    """Date de rapport (optionnelle) : paramètre explicite, sinon lue dans le pré-en-tête."""
+    override = importer.option("report_date")
+    if override:
+        try:
+            return parse_date(override)
+        except Exception:
+            return None
+    return importer.head_value("report_date", _fuzzy_date, n)
+
+
+def _year_in(text):
+    yrs = re.findall(r"\b(20\d{2})\b", text)
+    return int(yrs[0]) if yrs else None
+
+
+def _month_in(text):
+    # exemple “July” apparaît seul dans l’entête
+    for mname, midx in MONTHS_MAP.items():
+        if re.search(rf"\b{re.escape(mname)}\b", text, flags=re.I):
+            return midx
+    return None
+
+
+def _title_word(text):
+    """Heuristique pays : 1er mot capitalisé (>= 3 lettres) du pré-en-tête."""
+    tokens = [t for t in text.split() if t.istitle() and len(t) >= 3]
+    return tokens[0] if tokens else None
+
+
+def _title_word_not_digit(text):
+    tokens = [t for t in text.split() if t.istitle() and len(t) >= 3 and not t.isdigit()]
+    return tokens[0] if tokens else None
+
+
+class EnergyStatImporter(BaseImporter):
+    """Synthèse mensuelle par pays (une ligne par mois)."""
+    kind = "energy"
+    header_error = "Impossible de localiser l’en-tête (colonne 'Month')."
+
+    # Cibles attendues -> clés normalisées possibles
+    WANTED = HeaderSpec({
+        'month': ['month'],
+        'sites_integrated': ['of sites integrated sites', '# of sites integrated sites'],
+        'sites_monitored': ['no of sites monitored', 'number of sites monitored'],
+        'grid_mwh': ['grid energy mwh'],
+        'solar_mwh': ['solar energy mwh'],
+        'generators_mwh': ['generators energy mwh'],
+        'telecom_mwh': ['telecom load energy mwh'],
+        'grid_pct': ['grid energy'],
+        'rer_pct': ['rer renewable energy ratio'],
+        'generators_pct': ['generators energy'],
+        'avg_telecom_load_mw': ['avg monthly telecom load power mw'],
+    }, normalize=normalize_units)
+
+    def open(self):
+        # --- Lecture en flux : seules les premières lignes sont chargées d'emblée
+        reader = self.read(
+            normalize=str.lower, scan_max=HEADER_SCAN_MAX,
+            is_header=lambda row: 'month' in row and any('grid energy' in c for c in row),
+        )
+
+        # --- Pré‑en‑tête pour pays/année/date (10 premières lignes)
+        override_country = self.option('country')
+        if override_country:
+            self.detected_country = override_country
+        elif self.user_country:
+            self.detected_country = self.user_country
+        else:
+            self.detected_country = self.head_value('country', _title_word, 10) or 'Unknown'
+
+        override_year = self.option('year')
+        if override_year:
+            self.detected_year = int(override_year)
+        else:
+            self.detected_year = self.head_value('year', _year_in, 10)
+
+        self.detected_report_date = _report_date(self, 10)
+
+        # --- Résoudre les noms réels des colonnes (tolérant aux variantes/espaces/majuscules)
+        self.colmap = self.resolve_columns(self.WANTED, reader.columns)
+
+        # Sanity minimal
+        if not self.colmap['month']:
+            raise ImportFailed("Colonne 'Month' introuvable.")
+
+        self.year_val = self.detected_year or (
+            self.detected_report_date.year if self.detected_report_date else None
+        )
+        if not self.year_val:
+            self.errors.append("Année introuvable (pré‑en‑tête manquant).")
+
+        self.created, self.updated = 0, 0
+
+    def begin(self):
+        # --- Pays
+        self.country, _ = Country.objects.get_or_create(name=self.detected_country)
+
+    def clean(self, df):
+        """Nettoyage vectorisé d'un paquet : [(mois lu, n° du mois ou None, valeurs)]."""
+        if not self.year_val:
+            return []
+        colmap = self.colmap
+
+        def col(name):
+            return df[name] if name else cleaning.missing(len(df), df.index)
+
+        months = cleaning.text(col(colmap['month']))
+        keep = months.notna() & ~months.str.lower().str.startswith('total', na=False)
+        df = df[keep]
+        months = months[keep]
+
+        columns = dict(
+            sites_integrated=cleaning.integers(col(colmap['sites_integrated'])),
+            sites_monitored=cleaning.integers(col(colmap['sites_monitored'])),
+            grid_mwh=cleaning.numbers(col(colmap['grid_mwh']), decimals=2),
+            solar_mwh=cleaning.numbers(col(colmap['solar_mwh']), decimals=2),
+            generators_mwh=cleaning.numbers(col(colmap['generators_mwh']), decimals=2),
+            telecom_mwh=cleaning.numbers(col(colmap['telecom_mwh']), decimals=2),
+            grid_pct=cleaning.numbers(col(colmap['grid_pct']), decimals=1),
+            rer_pct=cleaning.numbers(col(colmap['rer_pct']), decimals=1),
+            generators_pct=cleaning.numbers(col(colmap['generators_pct']), decimals=1),
+            avg_telecom_load_mw=cleaning.numbers(col(colmap['avg_telecom_load_mw']), decimals=2),
+        )
+
+        rows = []
+        for m, defaults in zip(cleaning.values(months), cleaning.records(columns)):
+            # Tolérer la faute "Januray"
+            m_idx = MONTHS_MAP.get(m.lower())
+            if not m_idx:
+                try:
+                    m_idx = parse_date(m).month
+                except Exception:
+                    m_idx = None
+            defaults['source_filename'] = self.filename
+            rows.append((m, m_idx, defaults))
+        return rows
+
+    def process(self, rows):
+        for m, m_idx, defaults in rows:
+            if not m_idx:
+                self.errors.append(f"Month non reconnu: {m}")
+                continue
+            _, was_created = EnergyMonthlyStat.objects.update_or_create(
+                country=self.country, year=self.year_val, month=m_idx, defaults=defaults
+            )
+            if was_created:
+                self.created += 1
+            else:
+                self.updated += 1
+            self.written += 1
+
+    def result(self):
+        return {
+            "country": self.country.name,
+            "year": self.detected_year,
+            "report_date": self.detected_report_date.isoformat() if self.detected_report_date else None,
+            "created": self.created,
+            "updated": self.updated,
+            "errors": self.errors
+        }
+
+
+class SiteEnergyImporter(BaseImporter):
+    """Énergie par site pour un mois (fichier 'Energy Efficiency')."""
+    kind = "site-energy"
+    header_error = "Ligne d’en-tête 'Site ID / Site Name' introuvable."
+
+    def open(self):
+        # --- Lecture en flux ; l'en-tête tableau contient 'Site ID' / 'Site Name'
+        reader = self.read(
+            normalize=normalize_units, scan_max=HEADER_SCAN_MAX,
+            is_header=lambda row: "site id" in row and "site name" in row,
+        )
+
+        # Pays / année / mois : options, sinon pré-en-tête (12 premières lignes)
+        override_country = self.option("country")
+        if override_country:
+            self.detected_country = override_country
+        elif self.user_country:
+            self.detected_country = self.user_country
+        else:
+            # heuristique simple : 1er mot capitalisé non numérique
+            self.detected_country = self.head_value("country", _title_word_not_digit, 12) or "Unknown"
+
+        # Year
+        override_year = self.option("year")
+        if override_year:
+            self.detected_year = int(override_year)
+        else:
+            self.detected_year = self.head_value("year", _year_in, 12)
+
+        # Month
+        override_month = self.option("month")
+        if override_month:
+            m = override_month.lower()
+            self.detected_month = MONTHS_MAP.get(m) or MONTHS_MAP.get(m[:3])
+        else:
+            self.detected_month = self.head_value("month", _month_in, 12)
+
+        # date de rapport (optionnel)
+        self.detected_report_date = _report_date(self, 12)
+
+        if not self.detected_year:
+            raise ImportFailed("Année introuvable dans l’en-tête ; préciser ?year=... si besoin.")
+        if not self.detected_month:
+            raise ImportFailed("Mois introuvable dans l’en-tête ; préciser ?month=... si besoin.")
+
+        # mapping des colonnes (tolérant aux variations, résolution mise en cache)
+        cols = self.resolve_columns(SITE_ENERGY_HEADER, reader.columns)
+        self.c_site_id = cols["site_id"]
+        self.c_site_name = cols["site_name"]
+        # champ -> (colonne réelle, nettoyage)
+        self.fields = dict(
+            grid_status=(cols["grid_status"], cleaning.statuses),
+            dg_status=(cols["dg_status"], cleaning.statuses),
+            solar_status=(cols["solar_status"], cleaning.statuses),
+            grid_energy_kwh=(cols["grid_energy_kwh"], cleaning.integers),
+            solar_energy_kwh=(cols["solar_energy_kwh"], cleaning.integers),
+            telecom_load_kwh=(cols["telecom_load_kwh"], cleaning.integers),
+            grid_energy_pct=(cols["grid_energy_pct"], cleaning.bounded),
+            rer_pct=(cols["rer_pct"], cleaning.bounded),
+            router_availability_pct=(cols["router_availability_pct"], cleaning.bounded),
+            pwm_availability_pct=(cols["pwm_availability_pct"], cleaning.bounded),
+            pwc_availability_pct=(cols["pwc_availability_pct"], cleaning.bounded),
+        )
+
+        required = [self.c_site_id, self.c_site_name] + [
+            self.fields[k][0] for k in ("grid_status", "dg_status", "solar_status")
+        ]
+        if any(c is None for c in required):
+            raise ImportFailed("Colonnes essentielles manquantes (Site ID, Site Name, GRID, DG, Solar).")
+
+        self.created, self.updated = 0, 0
+        self.seen = set()  # un site présent dans plusieurs paquets n'est compté qu'une fois
+
+    def begin(self):
+        # Pays
+        self.country, _ = Country.objects.get_or_create(name=self.detected_country)
+
+    def clean(self, df):
+        """
+        Nettoyage vectorisé d'un paquet de lignes.
+        Retourne {site_id: (site_name, valeurs)} ; la dernière occurrence d'un site l'emporte.
+        """
+        def col(name):
+            return df[name] if name else cleaning.missing(len(df), df.index)
+
+        sids = cleaning.text(col(self.c_site_id))
+        keep = sids.notna() & ~sids.str.lower().str.startswith("total", na=False)
+        df, sids = df[keep], sids[keep]
+
+        snames = cleaning.text(col(self.c_site_name)).fillna("")
+        columns = {field: clean(col(name)) for field, (name, clean) in self.fields.items()}
+        rows = {}
+        for sid, sname, values in zip(
+            cleaning.values(sids), cleaning.values(snames), cleaning.records(columns)
+        ):
+            values["source_filename"] = self.filename
+            rows[sid] = (sname, values)
+        return rows
+
+    def process(self, rows):
+        if not rows:
+            return
+        year, month = self.detected_year, self.detected_month
+
+        # --- Écriture ensembliste du paquet (nb de requêtes constant par paquet)
+        site_ids, _ = resolve_sites(
+            {sid: (self.country.id, sname) for sid, (sname, _) in rows.items()}
+        )
+
+        # Clés déjà présentes -> compteurs exacts créés / mis à jour
+        existing = set(
+            SiteEnergyMonthlyStat.objects
+            .filter(site_id__in=site_ids.values(), year=year, month=month)
+            .values_list("site_id", flat=True)
+        )
+
+        objs = [
+            SiteEnergyMonthlyStat(site_id=site_ids[sid], year=year, month=month, **values)
+            for sid, (_, values) in rows.items()
+        ]
+        SiteEnergyMonthlyStat.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["site", "year", "month"],
+            update_fields=SITE_ENERGY_UPDATE_FIELDS,
+        )
+
+        for o in objs:
+            if o.site_id in self.seen:
+                continue
+            self.seen.add(o.site_id)
+            if o.site_id in existing:
+                self.updated += 1
+            else:
+                self.created += 1
+        self.written = len(self.seen)
+
+    def result(self):
+        return {
+            "country": self.country.name,
+            "year": self.detected_year,
+            "month": self.detected_month,
+            "report_date": self.detected_report_date.isoformat() if self.detected_report_date else None,
+            "upserted": self.written,
+            "created": self.created,
+            "updated": self.updated,
+            "errors": self.errors,
+        }
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0003_alter_siteenergymonthlystat_pwc_availability_pct_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='siteenergymonthlystat',
+            index=models.Index(fields=['site', '-year', '-month', '-id'], name='energy_site_site_id_850c0c_idx'),
+        ),
+    ]
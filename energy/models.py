@@ -117,6 +117,8 @@ class SiteEnergyMonthlyStat(models.Model):
         indexes = [
             models.Index(fields=["year", "month"]),
             models.Index(fields=["site", "year", "month"]),
+            # pagination par curseur (site, -year, -month, -id)
+            models.Index(fields=["site", "-year", "-month", "-id"]),
         ]
 
     def __str__(self) -> str:
@@ -0,0 +1,48 @@
+# energy/services.py
+from .models import Site
+
+
+def resolve_sites(specs, rename=True):
+    """
+    Résout (et crée au besoin) les sites d'un fichier en un nombre constant de requêtes.
+
+    specs = {site_id: (country_id, site_name)}
+    - 1 SELECT pour les sites existants ;
+    - 1 INSERT groupé pour les sites manquants (+ 1 SELECT pour relire leurs PK) ;
+    - 1 UPDATE groupé pour les sites dont le pays (ou le nom si rename=True) a changé.
+
+    Retourne ({site_id: pk}, nb_sites_créés).
+    """
+    if not specs:
+        return {}, 0
+
+    existing = {s.site_id: s for s in Site.objects.filter(site_id__in=list(specs))}
+
+    to_create, to_update = [], []
+    for sid, (country_id, site_name) in specs.items():
+        site = existing.get(sid)
+        if site is None:
+            to_create.append(Site(site_id=sid, country_id=country_id, site_name=site_name or sid))
+            continue
+        changed = False
+        if site.country_id != country_id:
+            site.country_id = country_id
+            changed = True
+        if rename and site_name and site.site_name != site_name:
+            site.site_name = site_name
+            changed = True
+        if changed:
+            to_update.append(site)
+
+    if to_update:
+        Site.objects.bulk_update(to_update, ["country", "site_name"], batch_size=1000)
+
+    ids = {sid: s.pk for sid, s in existing.items()}
+    if to_create:
+        # ignore_conflicts : un import concurrent a pu créer le site entre-temps
+        Site.objects.bulk_create(to_create, batch_size=1000, ignore_conflicts=True)
+        ids.update(
+            Site.objects.filter(site_id__in=[s.site_id for s in to_create])
+            .values_list("site_id", "pk")
+        )
+    return ids, len(to_create)
@@ -1,3 +1,63 @@
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.core.files.base import ContentFile
 from django.test import TestCase
+from openpyxl import Workbook
+
+from energy.importers import SiteEnergyImporter
+from energy.models import Site, SiteEnergyMonthlyStat
+from ingestion import readers
+
+
+HEADER = [
+    "Site ID", "Site Name", "GRID", "DG", "Solar", "GRID Energy [kWh]", "SOLAR Energy [kWh]",
+    "TELECOM LOAD Energy [kWh]", "GRID Energy [%]", "RER Renewable Energy Ratio [%]",
+    "Router Monitoring Availability [%]", "PwM Monitoring Availability [%]", "PwC Monitoring Availability [%]",
+]
+
+
+def energy_file(rows, title="Energy Efficiency Senegal July 2025"):
+    wb = Workbook()
+    ws = wb.active
+    ws.append([title])
+    ws.append([])
+    ws.append(HEADER)
+    for site_id, name, kwh in rows:
+        ws.append([site_id, name, "YES", "NO", "NI", kwh, "NI", 500, 55.5, 12.3, 99.9, "NM", 100])
+    ws.append(["Total"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return ContentFile(buf.getvalue(), name="ee.xlsx")
+
+
+class SiteEnergyImportTests(TestCase):
+    def run_import(self, rows, **kwargs):
+        f = energy_file(rows, **kwargs)
+        return SiteEnergyImporter(f, f.name).run()
+
+    def test_created_then_updated_counts(self):
+        result = self.run_import([("S1", "one", "1,234"), ("S2", "two", 10), ("S3", "three", 20)])
+        self.assertEqual((result["created"], result["updated"], result["upserted"]), (3, 0, 3))
+        self.assertEqual((result["year"], result["month"]), (2025, 7))
+
+        # paquets de 2 lignes : S1 présent dans deux paquets, compté une fois (dernière valeur)
+        with mock.patch.object(readers, "DEFAULT_CHUNK_SIZE", 2):
+            result = self.run_import([("S1", "one", 1), ("S2", "two", 11), ("S1", "one", 2), ("S4", "four", 40)])
+        self.assertEqual((result["created"], result["updated"], result["upserted"]), (1, 2, 3))
+
+        stats = dict(SiteEnergyMonthlyStat.objects.values_list("site__site_id", "grid_energy_kwh"))
+        self.assertEqual(stats, {"S1": Decimal("2"), "S2": Decimal("11"), "S3": Decimal("20"), "S4": Decimal("40")})
+        self.assertEqual(SiteEnergyMonthlyStat.objects.filter(year=2025, month=7).count(), 4)
+
+    def test_other_month_creates_rows(self):
+        self.run_import([("S1", "one", 1)])
+        result = self.run_import([("S1", "one", 1)], title="Energy Efficiency Senegal August 2025")
+        self.assertEqual((result["created"], result["updated"]), (1, 0))
+        self.assertEqual(SiteEnergyMonthlyStat.objects.count(), 2)
 
-# Create your tests here.
+    def test_sites_created_and_renamed(self):
+        self.run_import([("S1", "one", 1)])
+        self.run_import([("S1", "renamed", 1), ("S2", "two", 2)])
+        self.assertEqual(dict(Site.objects.values_list("site_id", "site_name")), {"S1": "renamed", "S2": "two"})
@@ -0,0 +1,147 @@
+# enertrack_backend/columnar.py
+"""
+Écriture Arrow (flux IPC) et Parquet depuis un curseur values_list().
+
+Le schéma Arrow est déduit des champs du modèle : DecimalField -> decimal128(p, s),
+DateField -> date32, DateTimeField -> timestamp(us, UTC), entiers à la bonne
+largeur... Les lignes sont converties par lots (ARROW_BATCH_SIZE lignes =
+un record batch / un row group Parquet) et les octets rendus au fil de l'eau.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.constants import LOOKUP_SEP
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+INT_TYPES = {
+    "SmallAutoField": pa.int16(),
+    "SmallIntegerField": pa.int16(),
+    "PositiveSmallIntegerField": pa.int16(),
+    "AutoField": pa.int32(),
+    "IntegerField": pa.int32(),
+    "PositiveIntegerField": pa.int32(),
+    "BigAutoField": pa.int64(),
+    "BigIntegerField": pa.int64(),
+    "PositiveBigIntegerField": pa.int64(),
+}
+
+
+def resolve_field(model, lookup):
+    """(champ final, nullable) d'un lookup values_list() ("site__site_id", "site_id"...)."""
+    nullable = False
+    field = None
+    for part in lookup.split(LOOKUP_SEP):
+        if part == "pk":
+            field = model._meta.pk
+        else:
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                # attname d'une clé étrangère ("site_id")
+                field = next(f for f in model._meta.concrete_fields if f.attname == part)
+        nullable = nullable or field.null
+        if field.is_relation:
+            model = field.related_model
+    if field.is_relation and field.many_to_one:
+        field = field.target_field
+    return field, nullable
+
+
+def arrow_type(field):
+    internal = field.get_internal_type()
+    if internal in INT_TYPES:
+        return INT_TYPES[internal]
+    if internal == "DecimalField":
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if internal == "DateField":
+        return pa.date32()
+    if internal == "DateTimeField":
+        return pa.timestamp("us", tz="UTC" if settings.USE_TZ else None)
+    if internal == "TimeField":
+        return pa.time64("us")
+    if internal == "BooleanField":
+        return pa.bool_()
+    if internal == "FloatField":
+        return pa.float64()
+    return pa.string()
+
+
+def arrow_schema(model, fields):
+    """fields = [(nom de colonne, lookup), ...]"""
+    columns = []
+    for name, lookup in fields:
+        field, nullable = resolve_field(model, lookup)
+        columns.append(pa.field(name, arrow_type(field), nullable=nullable))
+    return pa.schema(columns)
+
+
+def record_batches(schema, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == settings.ARROW_BATCH_SIZE:
+            yield _to_batch(schema, batch)
+            batch = []
+    if batch:
+        yield _to_batch(schema, batch)
+
+
+def _to_batch(schema, rows):
+    columns = zip(*rows)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for field, values in zip(schema, columns)],
+        schema=schema,
+    )
+
+
+class _Sink:
+    """Fichier en écriture pour pyarrow : les octets écrits sont repris par drain()."""
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        # Parquet consigne les positions absolues des row groups dans le pied de fichier
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def stream_arrow(schema, rows):
+    """Flux Arrow IPC (pyarrow.ipc.open_stream / pandas côté analyste)."""
+    sink = _Sink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+        yield sink.drain()
+        for batch in record_batches(schema, rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_parquet(schema, rows):
+    """Fichier Parquet écrit row group par row group."""
+    sink = _Sink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="snappy") as writer:
+        for batch in record_batches(schema, rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
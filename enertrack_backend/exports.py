@@ -0,0 +1,134 @@
+# enertrack_backend/exports.py
+"""
+Exports en flux (CSV / NDJSON) sans passer par les serializers DRF.
+
+    GET /api/rectifiers/export/?output=csv&site_id=...     (mêmes filtres que la liste)
+    GET /api/rectifiers/export/?output=ndjson
+    GET /api/rectifiers/export/?output=parquet|arrow     (vues avec export_columnar)
+
+Les lignes sont lues par values_list().iterator() (curseur serveur sous
+PostgreSQL) et écrites au fil de l'eau : mémoire constante, premier octet
+envoyé dès la première requête.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+
+def _exported(field):
+    # champs non éditables = colonnes internes (row_fingerprint...), sauf horodatages d'import
+    return field.editable or getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+
+
+def model_fields(model, exclude=()):
+    """Colonnes simples du modèle (clés étrangères sous forme <champ>_id), colonnes internes exclues."""
+    return [f.attname for f in model._meta.concrete_fields if f.name not in exclude and _exported(f)]
+
+
+def _text(v):
+    if v is None:
+        return ""
+    return v.isoformat() if hasattr(v, "isoformat") else v
+
+
+def _json_default(v):
+    # dates ISO complètes, Decimal en texte (comme DRF)
+    return v.isoformat() if hasattr(v, "isoformat") else str(v)
+
+
+class _Line:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de l'écrire."""
+
+    def write(self, value):
+        return value
+
+
+class ExportMixin:
+    """
+    Action GET .../export/ :
+      export_fields   = lookups values_list(), ou couples (en-tête, lookup) ;
+                        en-tête par défaut = lookup avec "__" remplacé par "_" ;
+      export_ordering = tri (défaut : celui de get_queryset) ;
+      export_columnar = True pour proposer aussi Parquet et Arrow IPC
+                        (types déduits des champs, voir enertrack_backend.columnar).
+    """
+    export_fields = None
+    export_ordering = None
+    export_name = "export"
+    export_columnar = False
+    export_formats = {
+        "csv": "text/csv; charset=utf-8",
+        "ndjson": "application/x-ndjson",
+    }
+    columnar_formats = {
+        "parquet": "application/vnd.apache.parquet",
+        "arrow": "application/vnd.apache.arrow.stream",
+    }
+
+    def get_export_fields(self):
+        return self.export_fields or model_fields(self.get_queryset().model)
+
+    def get_export_formats(self):
+        if self.export_columnar:
+            return {**self.export_formats, **self.columnar_formats}
+        return self.export_formats
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        output = request.query_params.get("output", "csv").lower()
+        formats = self.get_export_formats()
+        if output not in formats:
+            return Response({"detail": f"output doit valoir : {', '.join(formats)}"}, status=400)
+
+        fields = [f if isinstance(f, tuple) else (f.replace("__", "_"), f) for f in self.get_export_fields()]
+        headers = [h for h, _ in fields]
+        qs = self.filter_queryset(self.get_queryset())
+        if self.export_ordering:
+            qs = qs.order_by(*self.export_ordering)
+        # values_list : ni instances ni select_related, uniquement les colonnes exportées
+        rows = self.export_rows(qs, [lookup for _, lookup in fields])
+
+        if output in self.columnar_formats:
+            from . import columnar  # pyarrow chargé seulement pour ces exports
+            schema = columnar.arrow_schema(qs.model, fields)
+            stream = columnar.stream_parquet if output == "parquet" else columnar.stream_arrow
+            content = stream(schema, rows)
+        else:
+            stream = self.stream_csv if output == "csv" else self.stream_ndjson
+            content = stream(headers, rows)
+        response = StreamingHttpResponse(content, content_type=formats[output])
+        filename = f"{self.export_name}_{timezone.now():%Y%m%d_%H%M}.{output}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def export_rows(self, qs, lookups):
+        """Tuples exportés, dans l'ordre de `lookups`."""
+        return qs.values_list(*lookups).iterator(chunk_size=settings.STREAM_CHUNK_SIZE)
+
+    def _batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == settings.STREAM_CHUNK_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def stream_csv(self, headers, rows):
+        writer = csv.writer(_Line())
+        yield "\ufeff" + writer.writerow(headers)  # BOM : accents lisibles dans Excel
+        for batch in self._batches(rows):
+            yield "".join(writer.writerow([_text(v) for v in row]) for row in batch)
+
+    def stream_ndjson(self, headers, rows):
+        for batch in self._batches(rows):
+            yield "".join(
+                json.dumps(dict(zip(headers, row)), default=_json_default, ensure_ascii=False) + "\n"
+                for row in batch
+            )
@@ -0,0 +1,204 @@
+# enertrack_backend/pagination.py
+"""
+Pagination par clé (keyset / curseur) pour les listes volumineuses.
+
+Le curseur encode les valeurs de tri de la dernière ligne servie ; la page
+suivante est lue par `WHERE (tri) > (curseur) ORDER BY tri LIMIT n`, sans
+OFFSET : coût proportionnel à la taille de page, quelle que soit la profondeur.
+
+    GET /api/rectifiers/?page_size=200           -> {"next": ..., "results": [...]}
+    GET /api/rectifiers/?cursor=<next>           -> page suivante
+    GET /api/rectifiers/?all=1                   -> tout, en flux JSON (exports)
+
+Le tri est celui du queryset de la vue (order_by) complété par la clé primaire,
+pour un ordre total.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(v):
+    # isoformat complet (DjangoJSONEncoder tronque les microsecondes)
+    return v.isoformat() if hasattr(v, "isoformat") else str(v)
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    invalid_cursor_message = "Curseur invalide."
+
+    def get_page_size(self, request):
+        size = api_settings.PAGE_SIZE or 100
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw:
+            try:
+                size = int(raw)
+            except ValueError:
+                pass
+        return max(1, min(size, self.max_page_size))
+
+    # ---- tri ----
+    def get_ordering(self, queryset):
+        ordering = [o for o in (queryset.query.order_by or queryset.model._meta.ordering) if isinstance(o, str)]
+        if not any(o.lstrip("-") in ("pk", "id", queryset.model._meta.pk.name) for o in ordering):
+            # départage par la clé primaire, dans le sens du dernier champ (parcours d'index arrière)
+            ordering.append("-pk" if ordering and ordering[-1].startswith("-") else "pk")
+        return [(o.lstrip("-"), o.startswith("-")) for o in ordering]
+
+    def _nullable(self, model, path):
+        field = None
+        for part in path.split(LOOKUP_SEP):
+            if part == "pk":
+                return False
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                return False
+            model = field.related_model or model
+        return bool(field and field.null)
+
+    def _order_by(self, field, desc, nullable):
+        if not nullable:
+            return f"-{field}" if desc else field
+        # NULL = plus grande valeur (comportement PostgreSQL), quel que soit le moteur
+        return F(field).desc(nulls_first=True) if desc else F(field).asc(nulls_last=True)
+
+    def _after(self, field, desc, nullable, value):
+        """Lignes strictement après `value` sur ce champ (None si aucune)."""
+        if value is None:
+            return Q(**{f"{field}__isnull": False}) if desc else None
+        q = Q(**{f"{field}__{'lt' if desc else 'gt'}": value})
+        if nullable and not desc:
+            q |= Q(**{f"{field}__isnull": True})
+        return q
+
+    def _equal(self, field, value):
+        return Q(**{f"{field}__isnull": True}) if value is None else Q(**{field: value})
+
+    def seek(self, queryset, keys, values):
+        condition, prefix = None, Q()
+        for (field, desc, nullable), value in zip(keys, values):
+            after = self._after(field, desc, nullable, value)
+            if after is not None:
+                term = prefix & after
+                condition = term if condition is None else condition | term
+            prefix &= self._equal(field, value)
+        if condition is None:
+            return queryset.none()
+        # borne simple sur le 1er champ : aide le planificateur à partir de l'index
+        field, desc, nullable = keys[0]
+        if values[0] is not None and not nullable:
+            queryset = queryset.filter(**{f"{field}__{'lte' if desc else 'gte'}": values[0]})
+        return queryset.filter(condition)
+
+    # ---- curseur ----
+    def encode_cursor(self, values):
+        raw = json.dumps([None if v is None else _encode_value(v) for v in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request, size):
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != size:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _value(self, obj, field):
+        if isinstance(obj, dict):  # queryset.values()
+            return obj[field]
+        for part in field.split(LOOKUP_SEP):
+            if obj is None:
+                return None
+            obj = getattr(obj, part)
+        return obj
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.get_ordering(queryset)
+        keys = [(f, desc, self._nullable(queryset.model, f)) for f, desc in ordering]
+        queryset = queryset.order_by(*(self._order_by(*k) for k in keys))
+
+        values = self.decode_cursor(request, len(keys))
+        size = self.get_page_size(request)
+        try:
+            if values is not None:
+                queryset = self.seek(queryset, keys, values)
+            page = list(queryset[:size + 1])
+        except (ValidationError, ValueError, TypeError):
+            # valeur de curseur non convertible dans le type du champ
+            raise NotFound(self.invalid_cursor_message)
+        self.next_cursor = None
+        if len(page) > size:
+            page = page[:size]
+            self.next_cursor = self.encode_cursor([self._value(page[-1], f) for f, _, _ in keys])
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class StreamAllMixin:
+    """
+    `?all=1` sur une liste paginée : renvoie tout le résultat filtré en flux JSON
+    (tableau), lu par paquets de STREAM_CHUNK_SIZE lignes (mémoire bornée).
+    """
+    stream_query_param = "all"
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(self.stream_query_param) not in ("1", "true", "yes"):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(self.stream_json(queryset), content_type="application/json")
+
+    def stream_json(self, queryset):
+        size = settings.STREAM_CHUNK_SIZE
+        encoder = JSONEncoder()
+        yield "["
+        first, batch = True, []
+        for obj in queryset.iterator(chunk_size=size):
+            batch.append(obj)
+            if len(batch) == size:
+                yield from self._stream_batch(encoder, batch, first)
+                first, batch = False, []
+        if batch:
+            yield from self._stream_batch(encoder, batch, first)
+        yield "]"
+
+    def _stream_batch(self, encoder, batch, first):
+        rows = self.get_serializer(batch, many=True).data
+        body = ",".join(encoder.encode(row) for row in rows)
+        yield body if first else "," + body
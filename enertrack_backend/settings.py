@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'certification',
     'powerquality',  # ✅ nouveau
     'pwmreport',           # ✅ nouveau
+    'ingestion',
     'corsheaders',
 
 ]
@@ -142,8 +143,16 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # taille de page par défaut des listes paginées par curseur (?page_size= pour changer)
+    'PAGE_SIZE': int(os.environ.get("API_PAGE_SIZE", 100)),
 }
 
+# Listes en flux (?all=1) : nb de lignes lues / sérialisées par paquet
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", 2000))
+
+# Exports Parquet / Arrow : lignes par record batch (= row group Parquet)
+ARROW_BATCH_SIZE = int(os.environ.get("ARROW_BATCH_SIZE", 65536))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -157,3 +166,35 @@ CELERY_BROKER_URL = 'redis://redis:6379/0'  # nom du service Docker
 CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+
+# Cache partagé web / workers (invalidation des agrégats à chaque import)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("CACHE_URL", "redis://redis:6379/1"),
+    }
+}
+
+# Réponses agrégées ContractMonth (pivots, totaux) : durée de vie en cache (s)
+CONTRACT_MONTH_CACHE_TTL = int(os.environ.get("CONTRACT_MONTH_CACHE_TTL", 3600))
+
+# Imports de fichiers : nb de lignes lues / écrites par paquet (mémoire bornée)
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 5000))
+
+# Mesures PQ : "wide" (colonnes de PQReport) ou "long" (table PQMeasurement), voir powerquality.measures
+PQ_MEASURE_STORAGE = os.environ.get("PQ_MEASURE_STORAGE", "wide")
+
+# Imports par lots (commande import_batch) : nb de processus de lecture et nettoyage (0 = nb de CPU)
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", 0))
+
+# Fichiers en attente d'import asynchrone : répertoire partagé entre web et workers Celery
+IMPORT_SPOOL_DIR = os.environ.get("IMPORT_SPOOL_DIR", str(BASE_DIR / "var" / "imports"))
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "imports": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": IMPORT_SPOOL_DIR},
+    },
+}
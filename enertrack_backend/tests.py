@@ -0,0 +1,109 @@
+# enertrack_backend/tests.py
+import datetime
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from billing.views import ContractMonthViewSet, MonthlySynthesisViewSet, SonatelInvoiceViewSet
+from energy.models import Country, Site
+from energy.views import SiteEnergyViewSet
+from enertrack_backend.pagination import KeysetPagination
+from powerquality.views import PQReportViewSet
+from pwmreport.views import PwmReportViewSet
+from rectifiers.models import RectifierReading
+from rectifiers.views import RectifierReadingViewSet
+
+
+T0 = datetime.datetime(2025, 8, 1, tzinfo=datetime.timezone.utc)
+
+
+class KeysetPaginationTests(TestCase):
+    """Parcours complet page par page : chaque ligne une fois, dans l'ordre du tri (NULL = plus grande valeur)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        country = Country.objects.create(name="Senegal")
+        sites = [Site.objects.create(site_id=f"S{i}", site_name=f"S{i}", country=country) for i in range(3)]
+        values = [Decimal("2"), None, Decimal("1"), Decimal("2"), None, Decimal("3"), Decimal("1"), None]
+        RectifierReading.objects.bulk_create(
+            RectifierReading(
+                site=sites[i % 3], country=country, param_name="p", param_value=v,
+                # horodatages en double : départage par site puis pk
+                measured_at=T0 + datetime.timedelta(hours=i // 2),
+            )
+            for i, v in enumerate(values)
+        )
+
+    def walk(self, queryset, size):
+        pager, cursor, seen = KeysetPagination(), None, []
+        while True:
+            params = {"page_size": size}
+            if cursor:
+                params["cursor"] = cursor
+            page = pager.paginate_queryset(queryset, Request(APIRequestFactory().get("/", params)))
+            self.assertLessEqual(len(page), size)
+            seen += [r.pk for r in page]
+            cursor = pager.next_cursor
+            if cursor is None:
+                return seen
+
+    def expected(self, desc):
+        rows = list(RectifierReading.objects.values_list("pk", "param_value"))
+        # NULL après toutes les valeurs en tri croissant, avant en décroissant (comme PostgreSQL)
+        key = lambda r: (r[1] is None, r[1] or 0, r[0])
+        return [pk for pk, _ in sorted(rows, key=key, reverse=desc)]
+
+    def test_nullable_ascending(self):
+        qs = RectifierReading.objects.order_by("param_value")
+        for size in (1, 2, 3, 100):
+            self.assertEqual(self.walk(qs, size), self.expected(desc=False))
+
+    def test_nullable_descending(self):
+        qs = RectifierReading.objects.order_by("-param_value")
+        for size in (1, 2, 3, 100):
+            self.assertEqual(self.walk(qs, size), self.expected(desc=True))
+
+    def test_default_ordering_with_related_key(self):
+        rows = RectifierReading.objects.values_list("pk", "measured_at", "site__site_id")
+        expected = [pk for pk, *_ in sorted(rows, key=lambda r: (-r[1].timestamp(), r[2], r[0]))]
+        for size in (1, 3):
+            self.assertEqual(self.walk(RectifierReading.objects.all(), size), expected)
+
+    def test_invalid_cursor(self):
+        pager = KeysetPagination()
+        for cursor in ("%%%", "WzFd"):  # illisible ; nb de valeurs différent du tri
+            request = Request(APIRequestFactory().get("/", {"cursor": cursor}))
+            with self.assertRaises(NotFound):
+                pager.paginate_queryset(RectifierReading.objects.order_by("param_value"), request)
+
+
+class KeysetIndexTests(SimpleTestCase):
+    """Tri de chaque liste paginée = champs d'un index, parcouru en avant ou en arrière."""
+
+    viewsets = [
+        RectifierReadingViewSet, PQReportViewSet, PwmReportViewSet, SiteEnergyViewSet,
+        SonatelInvoiceViewSet, MonthlySynthesisViewSet, ContractMonthViewSet,
+    ]
+
+    def test_orderings_match_an_index(self):
+        for viewset in self.viewsets:
+            with self.subTest(viewset.__name__):
+                view = viewset(action="list", format_kwarg=None, kwargs={})
+                view.request = Request(APIRequestFactory().get("/"))
+                queryset = view.get_queryset()
+                opts = queryset.model._meta
+
+                def columns(fields):
+                    # [(colonne, décroissant)] ; "pk" et "site"/"site_id" ramenés à leur colonne
+                    return [
+                        (opts.pk.column if f.lstrip("-") == "pk" else opts.get_field(f.lstrip("-")).column, f.startswith("-"))
+                        for f in fields
+                    ]
+
+                keys = columns(("-" if desc else "") + field for field, desc in KeysetPagination().get_ordering(queryset))
+                indexes = [columns(index.fields) for index in opts.indexes]
+                backward = [(column, not desc) for column, desc in keys]
+                self.assertTrue(keys in indexes or backward in indexes, keys)
@@ -28,6 +28,7 @@ urlpatterns = [
     path("api/", include("powerquality.urls")),   # ✅ nouveau
     path("api/", include("pwmreport.urls")),      # ✅ nouveau
     path("api/", include("billing.urls")),       # ✅ nouveau
+    path("api/", include("ingestion.urls")),
 
     
 ]
@@ -0,0 +1,207 @@
+# ingestion/batch.py
+"""
+Import par lots : plusieurs fichiers d'un même type, archives .zip dépliées,
+chaque feuille d'un classeur multi-feuilles traitée comme un fichier.
+
+    POST /api/imports/batch/  (multipart: kind=pq, files=..., files=... [, country=...])
+    python manage.py import_batch pq exports/*.xlsx exports/2025-07.zip --workers 8
+
+API : une tâche Celery par fichier (import_file), réunies par un chord qui
+assemble le rapport (batch_report). Les workers Celery (prefork) sont des
+processus démons : pas de pool de processus dans une tâche.
+
+Commande : lecture et nettoyage des paquets dans un pool de processus
+(run_batch), sans accès base ; les paquets nettoyés sont déposés dans le
+stockage des imports (spool_object). Seule l'écriture en base reste dans le
+processus principal, un fichier à la fois (une transaction chacun).
+"""
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connections
+
+from . import templates
+from .importers import ImportFailed, get_importer
+from .models import ImportLedger
+from .readers import EXCEL_EXTENSIONS, sheet_names
+from .storage import discard, load_spooled, open_spooled, spool_object, spool_upload
+
+
+IMPORT_EXTENSIONS = EXCEL_EXTENSIONS + (".csv",)
+
+
+def spool_files(files):
+    """Fichiers (uploads ou File) -> [(chemin déposé, nom, sha256)] ; les .zip sont dépliés."""
+    spooled = []
+    for f in files:
+        if not f.name.lower().endswith(".zip"):
+            spooled.append((*spool_upload(f), f.name))
+            continue
+        with zipfile.ZipFile(f) as archive:
+            for member in archive.infolist():
+                name = os.path.basename(member.filename)
+                if member.is_dir() or name.startswith(".") or not name.lower().endswith(IMPORT_EXTENSIONS):
+                    continue
+                with archive.open(member) as data:
+                    spooled.append((*spool_upload(File(data, name=name)), name))
+    return [(path, name, sha256) for path, sha256, name in spooled]
+
+
+def _sheets(f, filename):
+    sheets = sheet_names(f, filename)
+    # feuille unique : même contexte (ledger) qu'un import fichier par fichier
+    return sheets if len(sheets) > 1 else [None]
+
+
+def _entry(filename, sheet, importer=None, result=None, detail=None):
+    entry = {"filename": filename, "sheet": sheet}
+    if detail is not None:
+        return {**entry, "status": "failed", "detail": detail}
+    if result.get("unchanged_file"):
+        return {**entry, "status": "unchanged", "rows_written": 0, "result": result}
+    return {**entry, "status": "imported", "rows_written": importer.written, "result": result}
+
+
+def import_file(kind, path, filename, sha256, options, user_country):
+    """Importe toutes les feuilles d'un fichier déposé, dans le processus courant (tâche Celery)."""
+    importer_cls = get_importer(kind)
+    report = []
+    try:
+        with open_spooled(path) as f:
+            for sheet in _sheets(f, filename):
+                importer = importer_cls(
+                    f, filename, options=options, user_country=user_country, sha256=sha256, sheet=sheet,
+                )
+                try:
+                    result = importer.run()
+                except ImportFailed as e:
+                    report.append(_entry(filename, sheet, detail=e.detail))
+                except Exception as e:
+                    # la feuille est annulée (transaction), les suivantes sont importées
+                    report.append(_entry(filename, sheet, detail=f"Write error: {e}"))
+                else:
+                    report.append(_entry(filename, sheet, importer, result))
+                f.seek(0)
+    except Exception as e:
+        report.append(_entry(filename, None, detail=f"Read error: {e}"))
+    return report
+
+
+def _detach(importer):
+    # lecteur (générateur) et fichier ouvert ne passent pas par pickle
+    importer.reader = importer.f = None
+    return importer
+
+
+def parse_file(kind, path, filename, sha256, options, user_country, done=frozenset()):
+    """
+    Processus du pool, sans accès base : lit et nettoie (clean) chaque feuille
+    du fichier ; les paquets nettoyés sont déposés au fil de la lecture.
+    done = {(sha256, contexte)} déjà importés (registre lu par le parent) : non relus.
+    Retourne [(feuille, importeur | message d'erreur, [paquets déposés] | None)].
+    """
+    importer_cls = get_importer(kind)
+    parsed = []
+    with open_spooled(path) as f:
+        for sheet in _sheets(f, filename):
+            importer = importer_cls(
+                f, filename, options=options, user_country=user_country, sha256=sha256, sheet=sheet,
+            )
+            if not importer.forced() and (sha256, importer.context()) in done:
+                parsed.append((sheet, _detach(importer), None))
+                continue
+            spilled = []
+            try:
+                importer.start()
+                for n, data in enumerate(importer.cleaned()):
+                    spilled.append(spool_object(data, f"{filename}-{n}"))
+            except Exception as e:
+                for p in spilled:
+                    discard(p)
+                if importer.reader:
+                    importer.reader.close()
+                parsed.append((sheet, e.detail if isinstance(e, ImportFailed) else f"Read error: {e}", None))
+            else:
+                parsed.append((sheet, _detach(importer), spilled))
+            f.seek(0)
+    return parsed
+
+
+def write_parsed(path, sheet, importer, spilled, filename):
+    """
+    Processus principal : écrit une feuille nettoyée par parse_file, paquets
+    relus depuis le dépôt (le classeur n'est pas relu).
+    """
+    if isinstance(importer, str):
+        return _entry(filename, sheet, detail=importer)
+    try:
+        result = importer.previous_result()
+        if not result and spilled is None:
+            # déjà importé au lancement, entrée du registre supprimée depuis : lu ici
+            with open_spooled(path) as f:
+                importer.f = f
+                result = importer.run()
+        elif not result:
+            result = importer.write(chunks=map(load_spooled, spilled))
+    except ImportFailed as e:
+        return _entry(filename, sheet, detail=e.detail)
+    except Exception as e:
+        # le fichier est annulé (transaction), les suivants sont importés
+        return _entry(filename, sheet, detail=f"Write error: {e}")
+    finally:
+        for p in spilled or ():
+            discard(p)
+    return _entry(filename, sheet, importer, result)
+
+
+def batch_report(kind, entries):
+    entries = sorted(entries, key=lambda e: (e["filename"], e["sheet"] or ""))
+    return {
+        "kind": kind,
+        "files": entries,
+        "rows_written": sum(e.get("rows_written", 0) for e in entries),
+        "failed": sum(e["status"] == "failed" for e in entries),
+    }
+
+
+def run_batch(kind, spooled, options=None, user_country=None, workers=None, progress=None):
+    """
+    Commande import_batch (hors worker Celery, voir le module).
+    spooled = [(chemin déposé, nom, sha256)] (voir spool_files), supprimés à la fin.
+    progress(fichiers traités, total) est appelé après chaque fichier écrit.
+    """
+    workers = min(workers or settings.IMPORT_WORKERS or os.cpu_count() or 1, len(spooled)) or 1
+    report = []
+    # modèles de fichiers et registre lus avant le fork : les processus fils n'interrogent pas la base
+    known = templates.load(kind, refresh=True)
+    done = set(
+        ImportLedger.objects.filter(kind=kind, sha256__in={sha256 for _, _, sha256 in spooled})
+        .values_list("sha256", "context")
+    )
+    # les processus fils ne doivent pas hériter des connexions ouvertes du parent
+    connections.close_all()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=templates.preload, initargs=(kind, known)) as pool:
+            futures = {
+                pool.submit(parse_file, kind, path, name, sha256, options, user_country, done): (path, name)
+                for path, name, sha256 in spooled
+            }
+            for n, future in enumerate(as_completed(futures), start=1):
+                path, name = futures[future]
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    report.append(_entry(name, None, detail=f"Read error: {e}"))
+                else:
+                    report.extend(
+                        write_parsed(path, sheet, importer, spilled, name) for sheet, importer, spilled in parsed
+                    )
+                if progress:
+                    progress(n, len(spooled))
+    finally:
+        for path, _, _ in spooled:
+            discard(path)
+    return batch_report(kind, report)
@@ -0,0 +1,170 @@
+# ingestion/cleaning.py
+"""
+Nettoyage vectorisé des colonnes de fichiers d'import.
+
+Chaque fonction prend une colonne pandas entière (valeurs brutes du fichier)
+et renvoie une colonne typée : on ne parcourt plus les lignes une à une
+(`iterrows` + `safe_decimal`/`num`/`status_from_cell`...).
+Les importeurs récupèrent ensuite des valeurs Python natives via `values()`
+ou `records()` (None à la place de NaN/NaT/pd.NA, compatibles Django).
+"""
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from energy.models import InstallStatus
+
+
+# Codes "pas de valeur" rencontrés dans les fichiers
+NULL_CODES = frozenset({"NI", "NM", "NC", "N I", "N/A", ""})
+PQ_NULL_CODES = frozenset({
+    "N/A", "NA", "N A", "N A.", "N A/", "N/A/", "",
+    "NO LAST VALUE", "N A N", "NAN",
+})
+PWM_NULL_CODES = frozenset({"NI", "NM", "NC", "N/A", "NA", "N A", "NO LAST VALUE", "", "NAN"})
+
+INSTALL_STATUS_MAP = {
+    "YES": InstallStatus.YES, "Y": InstallStatus.YES,
+    "NO": InstallStatus.NO, "N": InstallStatus.NO,
+    "NI": InstallStatus.NI,
+    "NM": InstallStatus.NM,
+    "0DG": InstallStatus.ODG, "ODG": InstallStatus.ODG,
+    "NC": InstallStatus.NC,
+}
+
+EXCEL_EPOCH = "1899-12-30"
+
+
+def missing(length, index=None):
+    """Colonne vide (colonne absente du fichier)."""
+    return pd.Series([None] * length, index=index, dtype=object)
+
+
+def text(s, codes=None, strip=True):
+    """Colonne -> chaînes (strippées par défaut) ; vides / NaN / codes -> <NA>."""
+    out = s.astype("string")
+    if strip:
+        out = out.str.strip()
+    out = out.mask(out == "")
+    if codes:
+        out = out.mask(out.str.upper().isin(codes))
+    return out
+
+
+def numbers(s, decimals=None, codes=NULL_CODES, thousands=",", decimal_comma=False):
+    """
+    Colonne -> float64 (NaN pour les codes NI/NM/NC/N/A et valeurs illisibles).
+    thousands : séparateur de milliers à retirer ; decimal_comma : '12,5' -> 12.5.
+    """
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        out = s.astype("float64")
+    else:
+        txt = text(s, codes)
+        if decimal_comma:
+            txt = txt.str.replace(r"\s", "", regex=True).str.replace(",", ".", regex=False)
+        elif thousands:
+            txt = txt.str.replace(thousands, "", regex=False)
+        out = pd.to_numeric(txt, errors="coerce").astype("float64")
+    out = out.where(np.isfinite(out))
+    if decimals is not None:
+        out = out.round(decimals)
+    return out
+
+
+def decimals(s, codes=None, decimal_comma=True):
+    """
+    Colonne -> Decimal exacts (object, None si illisible ou non fini : 'inf', 'nan').
+    decimal_comma : format FR ('458 543', '48 763,5') ; sinon ',' = séparateur de milliers.
+    Pour les montants où le float n'est pas admis.
+    """
+    txt = text(s, codes).str.replace(r"\s", "", regex=True)
+    txt = txt.str.replace(",", "." if decimal_comma else "", regex=False)
+    ok = np.isfinite(pd.to_numeric(txt, errors="coerce").astype("float64"))
+    return txt.where(ok).astype(object).map(Decimal, na_action="ignore")
+
+
+def integers(s, codes=NULL_CODES):
+    """Colonne -> Int64 nullable (troncature comme int(float(x)))."""
+    return np.trunc(numbers(s, codes=codes)).astype("Int64")
+
+
+def bounded(s, decimals=1, hard_cap=100000, codes=NULL_CODES):
+    """Comme numbers(), mais |v| >= hard_cap -> NaN (évite l'overflow des DecimalField)."""
+    out = numbers(s, decimals=decimals, codes=codes)
+    return out.where(out.abs() < hard_cap)
+
+
+def statuses(s, mapping=INSTALL_STATUS_MAP, default=InstallStatus.NC):
+    """Colonne -> statut d'installation (YES/NO/NI/NM/0DG/NC), défaut NC."""
+    txt = s.astype("string").str.strip().str.upper()
+    return txt.map(mapping).astype(object).where(lambda x: x.notna(), default)
+
+
+def hhmm_minutes(s, codes=PWM_NULL_CODES):
+    """'HH:MM' (ou 'HH:MM:SS') -> minutes ; sinon nombre entier de minutes."""
+    txt = text(s, codes)
+    parts = txt.str.extract(r"^(-?\d+):(\d{1,2})(?::\d{1,2})?$")
+    hhmm = pd.to_numeric(parts[0]) * 60 + pd.to_numeric(parts[1])
+    plain = np.trunc(pd.to_numeric(txt.where(~txt.str.contains(":", na=False)), errors="coerce"))
+    return hhmm.fillna(plain).astype("Int64")
+
+
+def datetimes(s, dayfirst=True, codes=PQ_NULL_CODES):
+    """Colonne -> datetime64 (NaT si illisible). Accepte cellules Excel datetime ou texte."""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    raw = s.mask(text(s, codes).isna())
+    return pd.to_datetime(raw, errors="coerce", dayfirst=dayfirst, format="mixed")
+
+
+def dates(s, dayfirst=True, codes=PQ_NULL_CODES, serial_range=(30000, 60000)):
+    """
+    Colonne -> datetime64 normalisée au jour. Gère texte (jour en premier),
+    cellules datetime et numéros de série Excel (jours depuis 1899-12-30).
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.dt.normalize()
+    txt = text(s, codes)
+    numeric = pd.to_numeric(txt.str.replace(",", ".", regex=False), errors="coerce")
+    serial = numeric
+    if serial_range:
+        lo, hi = serial_range
+        serial = numeric.where(numeric.between(lo, hi))
+    # les nombres hors plage ne sont pas des dates (pas de parsing texte)
+    out = datetimes(s.where(numeric.isna()), dayfirst=dayfirst, codes=codes)
+    from_serial = pd.to_datetime(np.trunc(serial), unit="D", origin=EXCEL_EPOCH, errors="coerce")
+    return out.fillna(from_serial).dt.normalize()
+
+
+def values(s):
+    """Colonne typée -> liste de valeurs Python natives (None pour NaN/NaT/<NA>)."""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        if s.dt.tz is not None:
+            s = s.dt.tz_convert(None)
+        # datetime64[us] -> datetime.datetime natifs (NaT -> None)
+        return s.to_numpy(dtype="datetime64[us]").astype(object).tolist()
+    out = s.to_numpy(dtype=object, na_value=None)
+    return out.tolist()
+
+
+def date_values(s):
+    """Colonne datetime64 -> liste de datetime.date (None pour NaT)."""
+    return [d.date() if d is not None else None for d in values(s)]
+
+
+def records(columns):
+    """{champ: colonne typée} -> liste de dicts Python prêts pour le modèle."""
+    names = list(columns)
+    cols = [values(columns[n]) for n in names]
+    return [dict(zip(names, row)) for row in zip(*cols)]
+
+
+def fingerprints(columns, index=None):
+    """
+    Empreinte (int64) de chaque ligne d'un ensemble de colonnes nettoyées
+    {nom: Series} : deux lignes de mêmes valeurs ont la même empreinte,
+    d'un import à l'autre (hachage pandas à clé fixe).
+    """
+    frame = pd.DataFrame(columns, index=index)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy().view(np.int64)
@@ -0,0 +1,101 @@
+# ingestion/headers.py
+"""
+Résolution des en-têtes de fichiers : libellé de colonne -> champ du modèle.
+
+Les champs attendus et leurs synonymes sont compilés une fois, au chargement
+de l'importeur (HeaderSpec) : synonymes normalisés, index exact
+{libellé normalisé: champs}, jetons du repli "contient tous les jetons".
+Un en-tête se résout en une passe sur ses colonnes, et le résultat est gardé
+par signature (libellés bruts) : les fichiers suivants d'un même modèle ne
+refont aucune comparaison.
+
+    PQ_HEADER = HeaderSpec({"site_id": ["site id"], ...}, contains=True)
+    cols = PQ_HEADER.resolve(reader.columns)   # {"site_id": "Site ID", ...}
+    cols.unmapped                              # champs sans colonne
+"""
+import re
+from functools import lru_cache
+
+
+_UNITS = re.compile(r"\[[^\]]+\]")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+# Nb de signatures d'en-tête gardées par spécification
+SIGNATURE_CACHE_SIZE = 64
+
+
+@lru_cache(maxsize=8192)
+def normalize(label, keep_units=False):
+    """
+    Libellé -> minuscules, sans ponctuation ni espaces multiples :
+    'Vmin [V]' -> 'vmin' (unités entre crochets retirées, sauf keep_units -> 'vmin v').
+    Mis en cache : les mêmes libellés reviennent à chaque fichier et à chaque ligne scannée.
+    """
+    s = str(label or "").lower()
+    if not keep_units:
+        s = _UNITS.sub("", s)
+    s = s.replace("°", "")
+    return _NON_ALNUM.sub(" ", s).strip()
+
+
+def normalize_units(label):
+    """normalize() en gardant les unités ('Grid Energy [kWh]' -> 'grid energy kwh')."""
+    return normalize(label, keep_units=True)
+
+
+class Resolution(dict):
+    """{champ: colonne réelle ou None} ; .unmapped = champs sans colonne (ordre de la spécification)."""
+
+    @property
+    def unmapped(self):
+        return [field for field, column in self.items() if column is None]
+
+
+class HeaderSpec:
+    """
+    fields    = {champ: [synonyme, ...]} (synonymes normalisés ici) ;
+    normalize = normalisation appliquée aux colonnes et aux synonymes ;
+    contains  = repli si aucun synonyme n'est égal : 1re colonne contenant tous
+                les jetons d'un synonyme, en sous-chaînes ('vmin v' trouve 'monophase vmin').
+    Une colonne peut servir plusieurs champs ; à égalité, la première colonne gagne.
+    """
+
+    def __init__(self, fields, normalize=normalize, contains=False):
+        self.normalize = normalize
+        self.contains = contains
+        self.fields = {field: [normalize(c) for c in cands] for field, cands in fields.items()}
+        self.exact = {}
+        for field, cands in self.fields.items():
+            for cand in cands:
+                self.exact.setdefault(cand, []).append(field)
+        self.tokens = {field: [tuple(c.split()) for c in cands] for field, cands in self.fields.items()}
+        self._cache = {}
+
+    def resolve(self, columns):
+        """Colonnes réelles (libellés bruts) -> Resolution, mise en cache par signature."""
+        signature = tuple(columns)
+        cached = self._cache.get(signature)
+        if cached is None:
+            cached = self._resolve(signature)
+            if len(self._cache) >= SIGNATURE_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[signature] = cached
+        return Resolution(cached)
+
+    def _resolve(self, columns):
+        normed = [(real, self.normalize(real)) for real in columns]
+        found = dict.fromkeys(self.fields)
+        for real, n in normed:
+            for field in self.exact.get(n, ()):
+                if found[field] is None:
+                    found[field] = real
+        if self.contains:
+            for field in [f for f, c in found.items() if c is None]:
+                found[field] = next(
+                    (
+                        real for real, n in normed
+                        if any(all(t in n for t in toks) for toks in self.tokens[field])
+                    ),
+                    None,
+                )
+        return found
@@ -0,0 +1,246 @@
+# ingestion/importers.py
+"""
+Socle commun des importeurs de fichiers.
+
+Un importeur encapsule la logique d'un type de fichier (lecture en flux,
+nettoyage, écriture) indépendamment de HTTP : la même classe sert
+l'endpoint synchrone `.../import/` et la tâche Celery `ingestion.tasks.run_import`.
+
+    importer = PQImporter(f, f.name, options={"country": "SN"}, user_country="SEN")
+    result = importer.run(progress=callback)   # callback(importer) après chaque paquet
+
+Chaque import est consigné dans ImportLedger (sha256 du fichier + options) :
+un fichier identique déjà traité renvoie le résultat enregistré sans relecture
+(option force=1 pour retraiter). Les importeurs comparent en plus une empreinte
+par ligne (cleaning.fingerprints) et n'écrivent que les lignes modifiées.
+
+La structure d'un fichier importé avec succès (en-tête, colonnes, cellules
+des métadonnées) est apprise : les fichiers suivants du même modèle sont lus
+sans recherche (ingestion.templates).
+"""
+import datetime
+import hashlib
+import json
+
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from . import templates
+from .headers import Resolution
+from .models import ImportLedger
+from .readers import HeaderNotFound, SheetReader
+from .storage import sha256sum
+
+
+# Registre kind -> importeur (chemins pointés : pas d'import croisé entre apps)
+IMPORTERS = {
+    "energy": "energy.importers.EnergyStatImporter",
+    "site-energy": "energy.importers.SiteEnergyImporter",
+    "pq": "powerquality.importers.PQImporter",
+    "pwm": "pwmreport.importers.PwmImporter",
+    "rectifiers": "rectifiers.importers.RectifierImporter",
+    "sonatel-billing": "billing.importers.SonatelInvoiceImporter",
+}
+
+
+def get_importer(kind):
+    try:
+        return import_string(IMPORTERS[kind])
+    except KeyError:
+        raise ValueError(f"Type d'import inconnu: {kind}")
+
+
+def naive_utc(value):
+    """Datetime lu en base (aware) -> naïf UTC, comme les valeurs nettoyées des fichiers."""
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ImportFailed(Exception):
+    """Fichier rejeté avant écriture (en-tête, colonnes essentielles...) -> HTTP 400."""
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class BaseImporter:
+    """
+    Sous-classes :
+      - open()       : ouvre le lecteur (self.read(...)), lit le pré-en-tête,
+                       résout les colonnes ; lève ImportFailed ;
+      - clean(df)    : nettoyage vectorisé d'un paquet de lignes, sans accès
+                       base (exécutable dans un processus du pool d'ingestion.batch) ;
+                       retourne des données sérialisables (pickle) ;
+      - process(data): écrit un paquet nettoyé ;
+      - result()     : dict de réponse (sérialisable JSON).
+    begin() / finish() encadrent les paquets, dans la même transaction.
+    """
+    kind = None
+    header_error = "En-tête introuvable."
+
+    def __init__(self, f, filename, options=None, user_country=None, sha256=None, sheet=None):
+        self.f = f
+        self.filename = filename
+        self.sheet = sheet  # feuille du classeur (import par lots), défaut = feuille active
+        self.options = options or {}
+        self.user_country = user_country
+        self.sha256 = sha256  # déjà calculé lors du dépôt (import asynchrone)
+        self.reader = None
+        self.errors = []
+        self.written = 0    # lignes créées / mises à jour
+        self.unchanged = 0  # lignes identiques à l'existant (empreinte), non réécrites
+        self.template = None  # modèle de fichier reconnu (ingestion.templates)
+        self.layout = None    # structure découverte, apprise si l'import réussit
+
+    def option(self, name):
+        """Paramètre du formulaire d'import (country, year...) ; None si absent ou vide."""
+        value = self.options.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        return value or None
+
+    def read(self, **kwargs):
+        """
+        Ouvre le lecteur. Structure déjà vue (ingestion.templates) : en-tête pris
+        à la position connue ; sinon recherché, et la structure est décrite dans
+        self.layout pour être apprise si l'import réussit.
+        """
+        header_rows = kwargs.get("header_rows", 1)
+
+        def known_header(preview):
+            self.template = templates.match(self.kind, preview, header_rows)
+            return self.template.header_idx if self.template else None
+
+        try:
+            self.reader = SheetReader(self.f, self.filename, sheet=self.sheet, known_header=known_header, **kwargs)
+        except HeaderNotFound:
+            raise ImportFailed(self.header_error)
+        except Exception as e:
+            raise ImportFailed(f"Read error: {e}")
+        if not self.template:
+            self.layout = dict(
+                signature=templates.signature(self.reader.preview, self.reader.header_idx, header_rows),
+                header_idx=self.reader.header_idx, header_rows=header_rows, columns={}, meta_cells={},
+            )
+        return self.reader
+
+    def resolve_columns(self, spec, columns):
+        """Colonnes résolues par `spec` (HeaderSpec), ou mémorisées par le modèle de fichier."""
+        if self.template and self.template.columns:
+            return Resolution((field, self.template.columns.get(field)) for field in spec.fields)
+        resolution = spec.resolve(columns)
+        if self.layout:
+            self.layout["columns"].update(resolution)
+        return resolution
+
+    def head_value(self, key, extract, n):
+        """
+        Métadonnée du pré-en-tête (pays, date...) : extract(texte) sur la cellule
+        mémorisée par le modèle de fichier ; sinon sur le texte des n premières
+        lignes, puis la cellule d'où vient la valeur est notée pour l'apprentissage.
+        """
+        cell = self.template and self.template.meta_cells.get(key)
+        if cell:
+            value = extract(self.reader.cell_text(*cell))
+            if value is not None:
+                return value
+        value = extract(self.reader.head_text(n))
+        if value is not None and self.layout:
+            self.layout["meta_cells"][key] = self.reader.locate(extract, value)
+        return value
+
+    def known_fingerprints(self, queryset, key_fields):
+        """{clé: row_fingerprint} des lignes déjà en base (1 requête)."""
+        return {
+            tuple(naive_utc(v) for v in row[:-1]): row[-1]
+            for row in queryset.values_list(*key_fields, "row_fingerprint")
+        }
+
+    def open(self):
+        raise NotImplementedError
+
+    def begin(self):
+        pass
+
+    def clean(self, df):
+        return df
+
+    def process(self, data):
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+    def result(self):
+        raise NotImplementedError
+
+    def context(self):
+        """Empreinte des paramètres qui influent sur l'import (options du formulaire, pays)."""
+        options = {k: v for k, v in self.options.items() if k != "force"}
+        params = [self.user_country, sorted(options.items())]
+        if self.sheet:
+            params.append(self.sheet)
+        raw = json.dumps(params, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def ledger_key(self):
+        if self.sha256 is None:
+            self.sha256 = sha256sum(self.f)
+        return dict(kind=self.kind, sha256=self.sha256, context=self.context())
+
+    def forced(self):
+        """Option force=1 : retraiter un fichier déjà importé à l'identique."""
+        return self.option("force") in ("1", "true", "yes")
+
+    def previous_result(self):
+        """Résultat enregistré si ce fichier (mêmes options) a déjà été importé, sauf force=1."""
+        if self.forced():
+            return None
+        done = ImportLedger.objects.filter(**self.ledger_key()).first()
+        if not done:
+            return None
+        done.save(update_fields=["last_seen_at"])
+        return {**done.result, "unchanged_file": True}
+
+    def start(self):
+        try:
+            self.open()
+        except ImportFailed:
+            if self.reader:
+                self.reader.close()
+            raise
+
+    def cleaned(self):
+        """Paquets lus en flux puis nettoyés (le lecteur est fermé à la fin)."""
+        for df in self.reader.chunks():
+            yield self.clean(df)
+
+    def run(self, progress=None):
+        done = self.previous_result()
+        if done:
+            return done
+        self.start()
+        return self.write(progress)
+
+    def write(self, progress=None, chunks=None):
+        """chunks : paquets déjà nettoyés (pool d'ingestion.batch) ; défaut = self.cleaned()."""
+        ledger_key = self.ledger_key()
+        with transaction.atomic():
+            self.begin()
+            for data in self.cleaned() if chunks is None else chunks:
+                self.process(data)
+                if progress:
+                    progress(self)
+            self.finish()
+            result = self.result()
+            ImportLedger.objects.update_or_create(
+                **ledger_key,
+                defaults=dict(filename=self.filename, rows_written=self.written, result=result),
+            )
+            if self.template:
+                templates.used(self.template)
+            elif self.layout and (self.written or self.unchanged):
+                templates.learn(self.kind, self.layout, self.filename)
+        return result
@@ -0,0 +1,78 @@
+# ingestion/management/commands/import_batch.py
+"""
+Import par lots de fichiers locaux (lecture parallèle, écriture fichier par fichier).
+
+    python manage.py import_batch pq exports/*.xlsx
+    python manage.py import_batch rectifiers juillet.zip --workers 8 --option override_country=SEN
+    python manage.py import_batch pwm rapports/ --force
+"""
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from ingestion.batch import IMPORT_EXTENSIONS, run_batch, spool_files
+from ingestion.importers import IMPORTERS
+
+
+def _option(value):
+    key, sep, val = value.partition("=")
+    if not sep or not key:
+        raise CommandError(f"Option attendue au format cle=valeur : {value}")
+    return key, val
+
+
+def _files(paths):
+    """Chemins (fichiers ou répertoires, non récursif) -> fichiers importables, triés."""
+    found = []
+    for p in paths:
+        if os.path.isdir(p):
+            found += sorted(
+                os.path.join(p, n) for n in os.listdir(p)
+                if n.lower().endswith(IMPORT_EXTENSIONS + (".zip",)) and not n.startswith(".")
+            )
+        elif os.path.isfile(p):
+            found.append(p)
+        else:
+            raise CommandError(f"Fichier introuvable : {p}")
+    return found
+
+
+class Command(BaseCommand):
+    help = "Importe plusieurs fichiers (.xlsx, .csv, .zip) d'un même type en parallèle."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS))
+        parser.add_argument("paths", nargs="+", help="Fichiers, archives .zip ou répertoires.")
+        parser.add_argument("--workers", type=int, help="Processus de lecture (défaut : IMPORT_WORKERS ou nb de CPU).")
+        parser.add_argument("--country", help="Pays par défaut des lignes sans pays.")
+        parser.add_argument("--option", action="append", type=_option, default=[], help="Option d'import cle=valeur (répétable).")
+        parser.add_argument("--force", action="store_true", help="Réimporte les fichiers déjà importés à l'identique.")
+
+    def handle(self, *args, **opts):
+        options = dict(opts["option"])
+        if opts["force"]:
+            options["force"] = "1"
+
+        spooled = []
+        for path in _files(opts["paths"]):
+            with open(path, "rb") as fh:
+                spooled += spool_files([File(fh, name=os.path.basename(path))])
+        if not spooled:
+            raise CommandError("Aucun fichier importable.")
+
+        result = run_batch(
+            opts["kind"], spooled, options=options, user_country=opts["country"], workers=opts["workers"],
+            progress=lambda done, total: self.stderr.write(f"\r{done}/{total} fichier(s)", ending=""),
+        )
+        self.stderr.write("")
+        for e in result["files"]:
+            name = f"{e['filename']} [{e['sheet']}]" if e["sheet"] else e["filename"]
+            line = f"{e['status']:<9} {name}"
+            if e["status"] == "failed":
+                self.stdout.write(self.style.ERROR(f"{line} : {e['detail']}"))
+            else:
+                self.stdout.write(f"{line} : {e.get('rows_written', 0)} ligne(s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['rows_written']} ligne(s) écrite(s), {result['failed']} échec(s) sur {len(result['files'])}."
+        ))
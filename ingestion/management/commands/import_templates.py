@@ -0,0 +1,44 @@
+# ingestion/management/commands/import_templates.py
+"""
+Modèles de fichiers appris par les imports (ingestion.templates).
+
+    python manage.py import_templates                 # liste
+    python manage.py import_templates --kind pwm
+    python manage.py import_templates --delete 12     # à réapprendre au prochain import
+    python manage.py import_templates --clear --kind pq
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from ingestion.models import ImportTemplate
+
+
+class Command(BaseCommand):
+    help = "Liste ou supprime les modèles de fichiers d'import appris."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", help="Type d'import (pq, pwm...).")
+        parser.add_argument("--delete", type=int, action="append", default=[], help="Id du modèle à supprimer (répétable).")
+        parser.add_argument("--clear", action="store_true", help="Supprime tous les modèles (du --kind donné).")
+
+    def handle(self, *args, **opts):
+        qs = ImportTemplate.objects.order_by("kind", "-hits")
+        if opts["kind"]:
+            qs = qs.filter(kind=opts["kind"])
+
+        if opts["delete"] or opts["clear"]:
+            if opts["delete"]:
+                qs = qs.filter(pk__in=opts["delete"])
+            n, _ = qs.delete()
+            if not n:
+                raise CommandError("Aucun modèle correspondant.")
+            self.stdout.write(self.style.SUCCESS(f"{n} modèle(s) supprimé(s)."))
+            return
+
+        for t in qs:
+            unmapped = sum(c is None for c in t.columns.values())
+            self.stdout.write(
+                f"{t.pk:>5} {t.kind:<16} en-tête ligne {t.header_idx + 1:<3} "
+                f"{len(t.columns)} champ(s), {unmapped} non trouvé(s), "
+                f"{len([c for c in t.meta_cells.values() if c])} cellule(s) de métadonnées, "
+                f"{t.hits} usage(s) — {t.filename}"
+            )
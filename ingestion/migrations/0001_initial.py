@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=32)),
+                ('sha256', models.CharField(max_length=64)),
+                ('context', models.CharField(max_length=64)),
+                ('filename', models.CharField(max_length=255)),
+                ('rows_written', models.IntegerField(default=0)),
+                ('result', models.JSONField(default=dict)),
+                ('imported_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'sha256', 'context'), name='uniq_import_ledger')],
+            },
+        ),
+    ]
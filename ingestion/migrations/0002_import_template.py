@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=32)),
+                ('signature', models.CharField(max_length=64)),
+                ('header_idx', models.PositiveIntegerField()),
+                ('header_rows', models.PositiveSmallIntegerField(default=1)),
+                ('columns', models.JSONField(default=dict)),
+                ('meta_cells', models.JSONField(default=dict)),
+                ('filename', models.CharField(max_length=255)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'signature'), name='uniq_import_template')],
+            },
+        ),
+    ]
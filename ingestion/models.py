@@ -0,0 +1,52 @@
+# ingestion/models.py
+from django.db import models
+
+
+class ImportLedger(models.Model):
+    """
+    Registre des fichiers importés : (type, sha256 du contenu, contexte) -> résultat.
+    Un fichier identique réimporté avec les mêmes options n'est pas retraité.
+    """
+    kind = models.CharField(max_length=32)          # ex: "pq", "sonatel-billing"
+    sha256 = models.CharField(max_length=64)
+    context = models.CharField(max_length=64)       # empreinte des options (pays, année...)
+    filename = models.CharField(max_length=255)
+    rows_written = models.IntegerField(default=0)
+    result = models.JSONField(default=dict)         # réponse de l'import d'origine
+    imported_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(auto_now=True)  # dernier dépôt (même ignoré)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "sha256", "context"], name="uniq_import_ledger"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.filename} ({self.sha256[:12]})"
+
+
+class ImportTemplate(models.Model):
+    """
+    Modèle de fichier appris au premier import réussi (voir ingestion.templates) :
+    position de l'en-tête, colonnes résolues et cellules du pré-en-tête d'où
+    viennent les métadonnées (pays, dates...). Les fichiers suivants de même
+    structure sont importés sans recherche d'en-tête ni analyse du pré-en-tête.
+    """
+    kind = models.CharField(max_length=32)
+    signature = models.CharField(max_length=64)     # sha256 de la structure des lignes jusqu'à l'en-tête
+    header_idx = models.PositiveIntegerField()
+    header_rows = models.PositiveSmallIntegerField(default=1)
+    columns = models.JSONField(default=dict)        # champ -> libellé de colonne (ou null)
+    meta_cells = models.JSONField(default=dict)     # métadonnée -> [ligne, colonne]
+    filename = models.CharField(max_length=255)     # fichier d'apprentissage
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "signature"], name="uniq_import_template"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.signature[:12]} (en-tête ligne {self.header_idx + 1})"
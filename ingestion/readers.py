@@ -0,0 +1,188 @@
+# ingestion/readers.py
+"""
+Lecture en flux (mémoire bornée) des fichiers d'import .xlsx / .csv.
+
+Au lieu de `pd.read_excel(f, header=None)` qui matérialise tout le classeur
+avant même de chercher l'en-tête, `SheetReader` :
+  - ouvre le .xlsx en mode openpyxl read-only (ou le .csv avec le module csv) ;
+  - ne garde en mémoire que les premières lignes (`preview`) pour trouver
+    l'en-tête et lire les métadonnées du pré-en-tête ;
+  - fournit ensuite les lignes de données par paquets (`chunks()`) sous forme
+    de DataFrames de `chunk_size` lignes, à typer avec `ingestion.cleaning`.
+
+Le pic mémoire dépend donc de la taille d'un paquet, pas de celle du fichier.
+"""
+import csv
+import io
+from itertools import islice
+
+import pandas as pd
+from django.conf import settings
+from openpyxl import load_workbook
+
+
+DEFAULT_CHUNK_SIZE = getattr(settings, "IMPORT_CHUNK_SIZE", 5000)
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xls")
+
+
+class HeaderNotFound(Exception):
+    pass
+
+
+def sheet_names(f, filename=None):
+    """Feuilles d'un classeur (liste vide pour un .csv) ; f est rembobiné."""
+    name = (filename or getattr(f, "name", "") or "").lower()
+    if name and not name.endswith(EXCEL_EXTENSIONS):
+        return []
+    wb = load_workbook(f, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+        f.seek(0)
+
+
+def _iter_excel_rows(f, sheet=None):
+    wb = load_workbook(f, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.active
+        try:
+            yield ws.max_row  # lu dans la balise <dimension>, peut être absent
+        except Exception:
+            yield None
+        for row in ws.iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def _count_lines(f, block_size=1 << 20):
+    """Compte les fins de ligne (passe binaire rapide, sans parsing) puis rembobine."""
+    if not f.seekable():
+        return None
+    n = 0
+    for block in iter(lambda: f.read(block_size), b""):
+        n += block.count(b"\n")
+    f.seek(0)
+    return n
+
+
+def _iter_csv_rows(f, sample_size=64 * 1024):
+    total = _count_lines(f)
+    stream = io.TextIOWrapper(f, encoding="utf-8-sig", errors="replace", newline="")
+    sample = stream.read(sample_size)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    stream.seek(0)
+    yield total  # approximatif si des champs contiennent des retours à la ligne
+    try:
+        for row in csv.reader(stream, dialect):
+            yield [c if c != "" else None for c in row]
+    finally:
+        stream.detach()
+
+
+class SheetReader:
+    """
+    reader = SheetReader(f, f.name, is_header=lambda cells: "site id" in cells, normalize=normalize)
+    reader.head      -> lignes brutes avant l'en-tête (pré-en-tête : pays, dates...)
+    reader.header    -> ligne(s) d'en-tête brutes (header_rows lignes)
+    reader.columns   -> libellés de colonnes (dernière ligne d'en-tête, strippés) ;
+                        peut être remplacé avant chunks() (en-têtes sur 2 lignes)
+    reader.chunks()  -> DataFrames (object) de chunk_size lignes de données
+
+    is_header reçoit la ligne normalisée (liste de str) ; None = 1ère ligne.
+    known_header(preview) -> index de l'en-tête d'un modèle connu, ou None (recherche).
+    sheet : nom de la feuille (.xlsx) ; défaut = feuille active.
+    Lève HeaderNotFound si l'en-tête n'est pas dans les `scan_max` premières lignes.
+    """
+
+    def __init__(self, f, filename=None, is_header=None, normalize=str, scan_max=40,
+                 header_rows=1, chunk_size=None, sheet=None, known_header=None):
+        name = (filename or getattr(f, "name", "") or "").lower()
+        if not name or name.endswith(EXCEL_EXTENSIONS):
+            rows = _iter_excel_rows(f, sheet)
+        else:
+            rows = _iter_csv_rows(f)
+        self.total_rows = next(rows)
+        self._rows = rows
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+
+        self.preview = list(islice(rows, scan_max + header_rows))
+        self.header_idx = known_header(self.preview) if known_header else None
+        for i, row in enumerate(self.preview[:scan_max] if self.header_idx is None else []):
+            if is_header is None or is_header([normalize(str(x)) for x in row]):
+                self.header_idx = i
+                break
+        if self.header_idx is None:
+            self.close()
+            raise HeaderNotFound()
+
+        self.head = self.preview[:self.header_idx]
+        self.header = self.preview[self.header_idx:self.header_idx + header_rows]
+        self.columns = [str(c).strip() for c in self.header[-1]]
+        self._pending = self.preview[self.header_idx + header_rows:]
+        self.rows_read = 0
+
+    @property
+    def data_rows(self):
+        """Nb (estimé) de lignes de données après l'en-tête ; None si inconnu."""
+        if self.total_rows is None:
+            return None
+        return max(self.total_rows - self.header_idx - len(self.header), 0)
+
+    def head_text(self, n):
+        """Texte des n premières lignes du fichier (comme df_raw.head(n) concaténé)."""
+        return " ".join(
+            " ".join("" if c is None else str(c) for c in row)
+            for row in self.preview[:n]
+        )
+
+    def cell_text(self, row, col):
+        """Texte d'une cellule des premières lignes ("" si hors limites ou vide)."""
+        try:
+            value = self.preview[row][col]
+        except IndexError:
+            return ""
+        return "" if value is None else str(value)
+
+    def locate(self, extract, value):
+        """[ligne, colonne] de la 1re cellule du pré-en-tête dont extract(texte) == value, ou None."""
+        for r, row in enumerate(self.head):
+            for c, cell in enumerate(row):
+                if cell is not None and extract(str(cell)) == value:
+                    return [r, c]
+        return None
+
+    def _data_rows(self):
+        yield from self._pending
+        self._pending = []
+        yield from self._rows
+
+    def chunks(self, chunk_size=None):
+        size = chunk_size or self.chunk_size
+        width = len(self.columns)
+        rows = self._data_rows()
+        try:
+            while True:
+                batch = [
+                    (tuple(r) + (None,) * (width - len(r)))[:width]
+                    for r in islice(rows, size)
+                ]
+                if not batch:
+                    break
+                start = self.rows_read
+                self.rows_read += len(batch)
+                df = pd.DataFrame.from_records(batch, columns=range(width), coerce_float=False)
+                df = df.astype(object)
+                df.columns = self.columns
+                df.index = range(start, start + len(batch))
+                yield df
+        finally:
+            self.close()
+
+    def close(self):
+        self._rows.close()
+
@@ -0,0 +1,69 @@
+# ingestion/storage.py
+"""
+Dépôt des fichiers d'import en attente de traitement asynchrone.
+
+Le fichier uploadé est écrit dans le stockage "imports" (STORAGES, disque
+partagé web/worker par défaut, remplaçable par un stockage objet) ; seule sa
+référence (chemin + sha256) transite par le broker Celery, jamais son contenu.
+"""
+import hashlib
+import pickle
+import uuid
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.utils.text import get_valid_filename
+
+
+def import_storage():
+    return storages["imports"]
+
+
+class SpoolError(Exception):
+    pass
+
+
+def sha256sum(f):
+    """Empreinte sha256 d'un fichier lu par blocs (f est rembobiné ensuite)."""
+    digest = hashlib.sha256()
+    for block in f.chunks():
+        digest.update(block)
+    f.seek(0)
+    return digest.hexdigest()
+
+
+def spool_upload(f):
+    """Enregistre l'upload ; retourne (chemin dans le stockage des imports, sha256)."""
+    digest = sha256sum(f)
+    name = f"{uuid.uuid4().hex}-{get_valid_filename(f.name)}"
+    return import_storage().save(name, f), digest
+
+
+def open_spooled(path, sha256=None):
+    """Ouvre (en flux, binaire) un fichier déposé ; vérifie son empreinte si fournie."""
+    f = import_storage().open(path, "rb")
+    if sha256 and sha256sum(f) != sha256:
+        f.close()
+        raise SpoolError(f"Empreinte sha256 différente pour {path} (fichier altéré ou remplacé).")
+    return f
+
+
+def discard(path):
+    """Supprime un fichier traité (sans erreur s'il a déjà disparu)."""
+    storage = import_storage()
+    if storage.exists(path):
+        storage.delete(path)
+
+
+def spool_object(obj, name):
+    """Dépose un objet Python (pickle) : paquets nettoyés par le pool d'ingestion.batch."""
+    data = ContentFile(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+    return import_storage().save(f"{uuid.uuid4().hex}-{get_valid_filename(name)}.pickle", data)
+
+
+def load_spooled(path):
+    """Relit un objet déposé par spool_object, puis le supprime."""
+    with import_storage().open(path, "rb") as f:
+        obj = pickle.load(f)
+    discard(path)
+    return obj
@@ -0,0 +1,75 @@
+# ingestion/tasks.py
+import time
+
+from celery import shared_task
+
+from .batch import batch_report, import_file
+from .importers import get_importer
+from .storage import discard, open_spooled
+
+
+# Nb de dernières erreurs renvoyées dans la progression
+PROGRESS_ERRORS = 20
+
+
+class ImportProgress:
+    """
+    Callback d'avancement : publie l'état PROGRESS de la tâche après chaque paquet
+    (lu par ImportStatusView).
+    """
+
+    def __init__(self, task, kind, filename):
+        self.task = task
+        self.kind = kind
+        self.filename = filename
+        self.started = time.monotonic()
+
+    def meta(self, importer):
+        processed = importer.reader.rows_read
+        total = importer.reader.data_rows
+        elapsed = time.monotonic() - self.started
+        rate = processed / elapsed if elapsed > 0 else None
+        eta = None
+        if rate and total is not None:
+            eta = round(max(total - processed, 0) / rate, 1)
+        return {
+            "kind": self.kind,
+            "filename": self.filename,
+            "rows_processed": processed,
+            "rows_total": total,
+            "rows_per_sec": round(rate, 1) if rate else None,
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": eta,
+            "errors_count": len(importer.errors),
+            "errors": importer.errors[-PROGRESS_ERRORS:],
+        }
+
+    def __call__(self, importer):
+        self.task.update_state(state="PROGRESS", meta=self.meta(importer))
+
+
+@shared_task(bind=True)
+def run_import(self, kind, path, filename, sha256=None, options=None, user_country=None):
+    """Traite un fichier déposé par spool_upload() puis le supprime du stockage."""
+    importer_cls = get_importer(kind)
+    try:
+        with open_spooled(path, sha256) as f:
+            importer = importer_cls(f, filename, options=options, user_country=user_country, sha256=sha256)
+            return importer.run(progress=ImportProgress(self, kind, filename))
+    finally:
+        discard(path)
+
+
+@shared_task
+def run_batch_file(kind, path, filename, sha256=None, options=None, user_country=None):
+    """Un fichier d'un import par lots (toutes ses feuilles) ; entrées du rapport, fichier supprimé."""
+    try:
+        return import_file(kind, path, filename, sha256, options, user_country)
+    finally:
+        discard(path)
+
+
+@shared_task
+def finish_batch_import(reports, kind):
+    """Rappel du chord : rapport de l'import par lots (voir ingestion.batch)."""
+    return batch_report(kind, [entry for report in reports for entry in report])
@@ -0,0 +1,111 @@
+# ingestion/templates.py
+"""
+Registre des modèles de fichiers (ImportTemplate).
+
+Un modèle est identifié par la signature de la structure des lignes qui
+précèdent et forment l'en-tête :
+  - pré-en-tête : forme des cellules (vide, nombre, date, texte avec chiffres)
+    et textes sans chiffres ("Country", "PQ report"...) ;
+  - en-tête : libellés exacts.
+Les dates et valeurs du pré-en-tête ne comptent donc pas : deux rapports du
+même gabarit pour des mois différents ont la même signature.
+
+Au premier import réussi d'une structure inconnue, l'importeur enregistre
+l'index de l'en-tête, les colonnes résolues et la cellule d'où vient chaque
+métadonnée (BaseImporter.head_value) ; les imports suivants lisent directement
+ces positions.
+"""
+import datetime
+import hashlib
+import json
+import re
+import time
+from decimal import Decimal
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ImportTemplate
+
+
+# Délai (s) avant de relire les modèles en base (appris par d'autres processus)
+REFRESH_SECONDS = 60
+
+_DIGITS = re.compile(r"\d")
+_loaded = {}  # kind -> (instant de lecture, [ImportTemplate])
+
+
+def _shape(value):
+    if value is None:
+        return ""
+    if isinstance(value, (int, float, Decimal)):
+        return "#"
+    if isinstance(value, (datetime.date, datetime.time)):
+        return "@"
+    text = str(value).strip()
+    return "~" if _DIGITS.search(text) else text.lower()
+
+
+def _label(value):
+    return "" if value is None else str(value).strip()
+
+
+def signature(rows, header_idx, header_rows=1):
+    """sha256 de la structure des lignes 0..en-tête (voir module)."""
+    parts = []
+    for i, row in enumerate(rows[:header_idx + header_rows]):
+        cells = [(_label if i >= header_idx else _shape)(c) for c in row]
+        while cells and cells[-1] == "":
+            cells.pop()
+        parts.append(cells)
+    raw = json.dumps([header_idx, header_rows, parts], ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def load(kind, refresh=False):
+    """Modèles connus pour ce type d'import (cache par processus, relu après REFRESH_SECONDS)."""
+    loaded_at, templates = _loaded.get(kind, (None, None))
+    if refresh or templates is None or time.monotonic() - loaded_at > REFRESH_SECONDS:
+        templates = list(ImportTemplate.objects.filter(kind=kind).order_by("-hits"))
+        _loaded[kind] = (time.monotonic(), templates)
+    return templates
+
+
+def preload(kind, known):
+    """Processus sans accès base (pool d'ingestion.batch) : modèles lus par le parent, jamais relus."""
+    _loaded[kind] = (float("inf"), known)
+
+
+def forget(kind=None):
+    if kind is None:
+        _loaded.clear()
+    else:
+        _loaded.pop(kind, None)
+
+
+def match(kind, preview, header_rows=1):
+    """Modèle dont la signature correspond aux premières lignes du fichier, ou None."""
+    for template in load(kind):
+        if template.header_rows != header_rows or template.header_idx + header_rows > len(preview):
+            continue
+        if signature(preview, template.header_idx, header_rows) == template.signature:
+            return template
+    return None
+
+
+def learn(kind, layout, filename):
+    """Enregistre un modèle découvert (layout : voir BaseImporter.read) ; sans effet s'il existe."""
+    template, created = ImportTemplate.objects.get_or_create(
+        kind=kind, signature=layout["signature"],
+        defaults=dict(
+            header_idx=layout["header_idx"], header_rows=layout["header_rows"],
+            columns=layout["columns"], meta_cells=layout["meta_cells"], filename=filename,
+        ),
+    )
+    if created:
+        forget(kind)
+    return template
+
+
+def used(template):
+    ImportTemplate.objects.filter(pk=template.pk).update(hits=F("hits") + 1, last_used_at=timezone.now())
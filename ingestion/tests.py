@@ -0,0 +1,179 @@
+# ingestion/tests.py
+import datetime
+import io
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.core.files import File
+from django.test import TestCase
+from openpyxl import Workbook
+
+from ingestion import batch, readers
+from ingestion.models import ImportLedger
+from ingestion.storage import import_storage
+from rectifiers.importers import RectifierImporter
+from rectifiers.models import RectifierReading
+
+
+HEADER = ["Country", "Site ID", "Param Name", "Param Value", "Measure", "Date"]
+
+
+def workbook(*sheets):
+    """Classeur .xlsx : [(nom de feuille, lignes)] ; en-tête redresseurs ajouté sauf lignes = None."""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets:
+        ws = wb.create_sheet(name)
+        if rows is None:
+            ws.append(["rien"])
+            continue
+        ws.append(HEADER)
+        for row in rows:
+            ws.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+
+def readings(site, n, value=1):
+    t0 = datetime.datetime(2025, 8, 1)
+    return [["Senegal", site, "p", value + i, "A", t0 + datetime.timedelta(hours=i)] for i in range(n)]
+
+
+class SpoolTestCase(TestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        storages = {**settings.STORAGES, "imports": {**settings.STORAGES["imports"], "OPTIONS": {"location": location}}}
+        override = self.settings(STORAGES=storages)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def spool(self, name, *sheets):
+        (spooled,) = batch.spool_files([File(workbook(*sheets), name=name)])
+        return spooled
+
+    def spooled_files(self):
+        return import_storage().listdir("")[1]
+
+
+class PoolWriteTests(SpoolTestCase):
+    """parse_file (processus du pool) puis write_parsed (processus principal), appelés ici en direct."""
+
+    def test_write_parsed_does_not_reread_workbook(self):
+        path, name, sha256 = self.spool("r.xlsx", ("Sheet", readings("S1", 5)))
+        with mock.patch.object(readers, "DEFAULT_CHUNK_SIZE", 2):
+            parsed = batch.parse_file("rectifiers", path, name, sha256, {}, None)
+        (sheet, importer, spilled), = pickle.loads(pickle.dumps(parsed))  # retour du pool
+        self.assertEqual(len(spilled), 3)  # un dépôt par paquet nettoyé
+
+        batch.discard(path)
+        with mock.patch.object(readers.SheetReader, "__init__", side_effect=AssertionError("classeur relu")):
+            entry = batch.write_parsed(path, sheet, importer, spilled, name)
+
+        self.assertEqual((entry["status"], entry["rows_written"]), ("imported", 5))
+        self.assertEqual(RectifierReading.objects.count(), 5)
+        self.assertEqual(self.spooled_files(), [])
+
+    def test_parse_errors_are_reported_per_sheet(self):
+        path, name, sha256 = self.spool("m.xlsx", ("A", readings("S1", 2)), ("B", []), ("Notes", None))
+        parsed = {sheet: (importer, spilled) for sheet, importer, spilled in
+                  batch.parse_file("rectifiers", path, name, sha256, {}, None)}
+        self.assertEqual(len(parsed["A"][1]), 1)
+        self.assertEqual(parsed["B"][1], [])  # en-tête seul : aucun paquet
+        self.assertEqual(parsed["Notes"], (RectifierImporter.header_error, None))
+
+        entries = [batch.write_parsed(path, sheet, *parsed[sheet], name) for sheet in parsed]
+        self.assertEqual([e["status"] for e in entries], ["imported", "imported", "failed"])
+        self.assertEqual(RectifierReading.objects.count(), 2)
+
+    def test_already_imported_sheets_are_not_read(self):
+        path, name, sha256 = self.spool("r.xlsx", ("Sheet", readings("S1", 3)))
+        batch.import_file("rectifiers", path, name, sha256, {}, None)
+        done = set(ImportLedger.objects.values_list("sha256", "context"))
+
+        with mock.patch.object(readers.SheetReader, "__init__", side_effect=AssertionError("classeur relu")):
+            (sheet, importer, spilled), = batch.parse_file("rectifiers", path, name, sha256, {}, None, done)
+            self.assertIsNone(spilled)
+            entry = batch.write_parsed(path, sheet, importer, spilled, name)
+        self.assertEqual(entry["status"], "unchanged")
+
+        # entrée du registre supprimée entre-temps : le fichier est lu par le processus principal
+        ImportLedger.objects.all().delete()
+        RectifierReading.objects.all().delete()
+        entry = batch.write_parsed(path, sheet, importer, spilled, name)
+        self.assertEqual((entry["status"], entry["rows_written"]), ("imported", 3))
+
+
+class IdempotentImportTests(TestCase):
+    def run_import(self, rows, **options):
+        return RectifierImporter(File(workbook(("Sheet", rows)), name="r.xlsx"), "r.xlsx", options).run()
+
+    def test_same_file_is_not_reimported(self):
+        first = self.run_import(readings("S1", 3))
+        self.assertEqual((first["upserted"], first["created"], first["unchanged"]), (3, 3, 0))
+
+        with mock.patch.object(readers.SheetReader, "__init__", side_effect=AssertionError("classeur relu")):
+            again = self.run_import(readings("S1", 3))
+        self.assertEqual(again, {**first, "unchanged_file": True})
+        self.assertEqual(RectifierReading.objects.count(), 3)
+        self.assertEqual(ImportLedger.objects.count(), 1)
+
+        # force=1 : fichier relu, lignes identiques (empreinte) non réécrites
+        forced = self.run_import(readings("S1", 3), force="1")
+        self.assertEqual((forced["upserted"], forced["unchanged"]), (0, 3))
+        self.assertNotIn("unchanged_file", forced)
+
+    def test_only_changed_rows_are_written(self):
+        self.run_import(readings("S1", 3))
+        rows = readings("S1", 4)
+        rows[1][3] = 99
+        result = self.run_import(rows)
+        self.assertEqual((result["upserted"], result["created"], result["unchanged"]), (2, 1, 2))
+        self.assertEqual(RectifierReading.objects.filter(param_value=99).count(), 1)
+
+
+class BatchReportTests(SpoolTestCase):
+    def setUp(self):
+        super().setUp()
+        self.old = self.spool("old.xlsx", ("Sheet", readings("S9", 2)))
+        batch.import_file("rectifiers", *self.old, {}, None)
+        self.spooled = [
+            self.spool("good.xlsx", ("A", readings("S1", 2)), ("B", readings("S2", 3))),
+            self.spool("bad.xlsx", ("Notes", None)),
+            self.old,
+        ]
+
+    def summary(self, report):
+        return [(e["filename"], e["sheet"], e["status"], e.get("rows_written")) for e in report["files"]]
+
+    def test_run_batch_report(self):
+        progress = mock.Mock()
+        # pool de threads : base de test en mémoire, non partagée avec des processus fils
+        with mock.patch.object(batch, "ProcessPoolExecutor", ThreadPoolExecutor), \
+                mock.patch.object(batch.connections, "close_all"):
+            report = batch.run_batch("rectifiers", self.spooled, workers=2, progress=progress)
+
+        self.assertEqual(self.summary(report), [
+            ("bad.xlsx", None, "failed", None),
+            ("good.xlsx", "A", "imported", 2),
+            ("good.xlsx", "B", "imported", 3),
+            ("old.xlsx", None, "unchanged", 0),
+        ])
+        self.assertEqual(report["files"][0]["detail"], RectifierImporter.header_error)
+        self.assertEqual((report["kind"], report["rows_written"], report["failed"]), ("rectifiers", 5, 1))
+        self.assertEqual([c.args for c in progress.call_args_list], [(1, 3), (2, 3), (3, 3)])
+        self.assertEqual(RectifierReading.objects.count(), 7)
+        self.assertEqual(self.spooled_files(), [])
+
+    def test_task_entries_give_the_same_report(self):
+        # chemin Celery : une tâche import_file par fichier, rapport assemblé par batch_report
+        entries = [e for spooled in self.spooled for e in batch.import_file("rectifiers", *spooled, {}, None)]
+        report = batch.batch_report("rectifiers", entries)
+        self.assertEqual([s[2:] for s in self.summary(report)], [("failed", None), ("imported", 2), ("imported", 3), ("unchanged", 0)])
+        self.assertEqual((report["rows_written"], report["failed"]), (5, 1))
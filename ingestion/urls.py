@@ -0,0 +1,9 @@
+# ingestion/urls.py
+from django.urls import path
+
+from .views import BatchImportView, ImportStatusView
+
+urlpatterns = [
+    path("imports/batch/", BatchImportView.as_view(), name="import-batch"),
+    path("imports/status/<str:task_id>/", ImportStatusView.as_view(), name="import-status"),
+]
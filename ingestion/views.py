@@ -0,0 +1,150 @@
+# ingestion/views.py
+import traceback
+import zipfile
+
+from celery import chord
+from celery.result import AsyncResult, GroupResult
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
+
+from .batch import spool_files
+from .importers import IMPORTERS, ImportFailed
+from .storage import discard, spool_upload
+from .tasks import finish_batch_import, run_batch_file, run_import
+
+
+def import_options(request):
+    """Champs texte du formulaire d'import (country, year, month...), sans le fichier."""
+    return {k: v for k, v in request.data.items() if isinstance(v, str)}
+
+
+def user_country(request):
+    return getattr(getattr(request, "user", None), "pays", None)
+
+
+class ImportViewMixin:
+    """
+    Ajoute à un ViewSet les actions :
+      POST .../import/        -> import synchrone (réponse = résultat de l'importeur)
+      POST .../import-async/  -> dépôt du fichier + tâche Celery (202 + task_id)
+    Les sous-classes définissent importer_class (voir ingestion.importers.IMPORTERS).
+    """
+    importer_class = None
+    file_required_detail = "file is required"
+
+    def get_importer(self, f):
+        return self.importer_class(
+            f, f.name, options=import_options(self.request), user_country=user_country(self.request)
+        )
+
+    def import_response(self, importer, result):
+        return Response(result, status=status.HTTP_201_CREATED if importer.written else status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"], url_path="import", parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        f = request.FILES.get("file")
+        if not f:
+            return Response({"detail": self.file_required_detail}, status=400)
+
+        importer = self.get_importer(f)
+        try:
+            result = importer.run()
+        except ImportFailed as e:
+            return Response({"detail": e.detail}, status=400)
+        return self.import_response(importer, result)
+
+    @action(detail=False, methods=["post"], url_path="import-async", parser_classes=[MultiPartParser])
+    def import_async(self, request):
+        f = request.FILES.get("file")
+        if not f:
+            return Response({"detail": self.file_required_detail}, status=400)
+
+        path, sha256 = spool_upload(f)
+        task = run_import.delay(
+            self.importer_class.kind, path, f.name, sha256=sha256,
+            options=import_options(request), user_country=user_country(request),
+        )
+        return Response({
+            "task_id": task.id,
+            "status_url": reverse("import-status", args=[task.id], request=request),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class BatchImportView(APIView):
+    """
+    POST /api/imports/batch/  (multipart: kind=pq|pwm|..., files=..., files=... [, country=...])
+    Fichiers d'un même type, archives .zip acceptées ; chaque feuille d'un
+    classeur est importée séparément. Une tâche par fichier, rapport assemblé
+    par un chord -> 202 + task_id (suivi : files_done / files_total).
+    """
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        kind = request.data.get("kind")
+        if kind not in IMPORTERS:
+            return Response({"detail": f"kind must be one of: {', '.join(IMPORTERS)}"}, status=400)
+        files = request.FILES.getlist("files") + request.FILES.getlist("file")
+        if not files:
+            return Response({"detail": "files is required"}, status=400)
+
+        try:
+            spooled = spool_files(files)
+        except zipfile.BadZipFile:
+            return Response({"detail": "Invalid zip archive"}, status=400)
+        if not spooled:
+            return Response({"detail": "No importable file (.xlsx / .csv)"}, status=400)
+
+        options = {k: v for k, v in import_options(request).items() if k != "kind"}
+        uc = user_country(request)
+        try:
+            task = chord(
+                run_batch_file.s(kind, path, name, sha256=sha256, options=options, user_country=uc)
+                for path, name, sha256 in spooled
+            )(finish_batch_import.s(kind))
+            if task.parent is not None:
+                task.parent.save()  # GroupResult relu par ImportStatusView (?group=)
+        except Exception:
+            for path, _, _ in spooled:
+                discard(path)
+            raise
+        status_url = reverse("import-status", args=[task.id], request=request)
+        if task.parent is not None:
+            status_url += f"?group={task.parent.id}"
+        return Response({
+            "task_id": task.id,
+            "status_url": status_url,
+            "files": [name for _, name, _ in spooled],
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class ImportStatusView(APIView):
+    """
+    État d'une tâche d'import. Pendant le traitement (PROGRESS) : lignes traitées,
+    lignes/s, erreurs rencontrées et temps restant estimé ; import par lots
+    (?group=) : fichiers traités / total.
+    """
+
+    def get(self, request, task_id):
+        result = AsyncResult(task_id)
+        if result.ready():
+            data = result.result
+            # Si c'est une exception, convertis en texte complet (traceback)
+            if isinstance(data, Exception):
+                data = ''.join(traceback.format_exception_only(type(data), data))
+            return Response({
+                "status": result.status,
+                "result": data
+            })
+        if result.status == "PROGRESS":
+            return Response({"status": result.status, "progress": result.info})
+        group = request.query_params.get("group")
+        files = GroupResult.restore(group) if group else None
+        if files is not None:
+            return Response({"status": "PROGRESS", "progress": {
+                "files_done": files.completed_count(), "files_total": len(files),
+            }})
+        return Response({"status": result.status})
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('invoices', '0002_facture_categorie_facture_societe_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteInvoiceMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('invoices_count', models.IntegerField(default=0)),
+                ('montant_ht_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('montant_ht_count', models.IntegerField(default=0)),
+                ('montant_ttc_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('montant_ttc_count', models.IntegerField(default=0)),
+                ('consommation_kwh_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('consommation_kwh_count', models.IntegerField(default=0)),
+                ('montant_tco_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('montant_tco_count', models.IntegerField(default=0)),
+                ('montant_redevance_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('montant_redevance_count', models.IntegerField(default=0)),
+                ('montant_tva_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('montant_tva_count', models.IntegerField(default=0)),
+                ('montant_htva_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('montant_htva_count', models.IntegerField(default=0)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_months', to='core.site')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='invoices_si_year_6f8e3d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('site', 'year', 'month'), name='uniq_site_invoice_month')],
+            },
+        ),
+    ]
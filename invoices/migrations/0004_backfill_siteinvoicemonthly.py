@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+FIELDS = [
+    "montant_ht", "montant_ttc", "consommation_kwh",
+    "montant_tco", "montant_redevance", "montant_tva", "montant_htva",
+]
+
+
+def backfill(apps, schema_editor):
+    Facture = apps.get_model("invoices", "Facture")
+    SiteInvoiceMonthly = apps.get_model("invoices", "SiteInvoiceMonthly")
+
+    aggregates = {"invoices_count": Count("id")}
+    for f in FIELDS:
+        aggregates[f"{f}_sum"] = Sum(f)
+        aggregates[f"{f}_count"] = Count(f)
+
+    rows = (
+        Facture.objects
+        .annotate(year=ExtractYear("date_facture"), month=ExtractMonth("date_facture"))
+        .values("site_id", "year", "month")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    objs = []
+    for r in rows:
+        for f in FIELDS:
+            r[f"{f}_sum"] = r[f"{f}_sum"] or 0
+        objs.append(SiteInvoiceMonthly(**r))
+    SiteInvoiceMonthly.objects.bulk_create(objs, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("invoices", "0003_siteinvoicemonthly"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -57,3 +57,46 @@ class Facture(models.Model):
 
     def __str__(self):
         return f"{self.facture_number} ({self.site.site_id})"
+
+
+SUM = dict(max_digits=16, decimal_places=2, default=0)
+
+
+class SiteInvoiceMonthly(models.Model):
+    """
+    Agrégat factures par site × (année, mois de date_facture), maintenu à chaque import.
+    Sommes + nb de valeurs non nulles : moyenne sur une période = Σ sommes / Σ nb.
+    """
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name='invoice_months')
+    year = models.IntegerField()
+    month = models.IntegerField()
+
+    invoices_count = models.IntegerField(default=0)
+
+    montant_ht_sum = models.DecimalField(**SUM)
+    montant_ht_count = models.IntegerField(default=0)
+    montant_ttc_sum = models.DecimalField(**SUM)
+    montant_ttc_count = models.IntegerField(default=0)
+    consommation_kwh_sum = models.DecimalField(**SUM)
+    consommation_kwh_count = models.IntegerField(default=0)
+
+    # Champs supplémentaires lus par /stats
+    montant_tco_sum = models.DecimalField(**SUM)
+    montant_tco_count = models.IntegerField(default=0)
+    montant_redevance_sum = models.DecimalField(**SUM)
+    montant_redevance_count = models.IntegerField(default=0)
+    montant_tva_sum = models.DecimalField(**SUM)
+    montant_tva_count = models.IntegerField(default=0)
+    montant_htva_sum = models.DecimalField(**SUM)
+    montant_htva_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['site', 'year', 'month'], name='uniq_site_invoice_month'),
+        ]
+        indexes = [
+            models.Index(fields=['year', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.site_id} {self.year}-{self.month:02d}"
@@ -0,0 +1,105 @@
+# invoices/services.py
+import datetime
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .models import Facture, SiteInvoiceMonthly
+
+
+# Champs Facture agrégés dans SiteInvoiceMonthly (<champ>_sum / <champ>_count)
+ROLLUP_FIELDS = [
+    "montant_ht", "montant_ttc", "consommation_kwh",
+    "montant_tco", "montant_redevance", "montant_tva", "montant_htva",
+]
+ROLLUP_UPDATE_FIELDS = ["invoices_count"] + [
+    f"{f}_{suffix}" for f in ROLLUP_FIELDS for suffix in ("sum", "count")
+]
+
+
+def month_key(site_id, date_facture):
+    return (site_id, date_facture.year, date_facture.month)
+
+
+def refresh_site_invoice_monthly(keys):
+    """
+    keys = {(site_id, year, month), ...} touchées par un import.
+    Recalcule ces lignes depuis Facture (1 requête groupée), upsert, et supprime
+    celles qui n'ont plus de facture. Retourne le nb de lignes écrites.
+    """
+    keys = set(keys)
+    if not keys:
+        return 0
+
+    months = sorted({(y, m) for _, y, m in keys})
+    start = datetime.date(months[0][0], months[0][1], 1)
+    end = datetime.date(months[-1][0], months[-1][1], 1) + relativedelta(months=1)
+
+    aggregates = {"invoices_count": Count("id")}
+    for f in ROLLUP_FIELDS:
+        aggregates[f"{f}_sum"] = Sum(f)
+        aggregates[f"{f}_count"] = Count(f)
+
+    rows = (
+        Facture.objects
+        .filter(site_id__in={k[0] for k in keys}, date_facture__gte=start, date_facture__lt=end)
+        .annotate(year=ExtractYear("date_facture"), month=ExtractMonth("date_facture"))
+        .values("site_id", "year", "month")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    objs = []
+    for r in rows:
+        if (r["site_id"], r["year"], r["month"]) not in keys:
+            continue
+        for f in ROLLUP_FIELDS:
+            r[f"{f}_sum"] = r[f"{f}_sum"] or 0
+        objs.append(SiteInvoiceMonthly(**r))
+
+    SiteInvoiceMonthly.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["site", "year", "month"],
+        update_fields=ROLLUP_UPDATE_FIELDS,
+    )
+
+    # Mois qui n'ont plus aucune facture (facture déplacée de site / de date)
+    stale = keys - {(o.site_id, o.year, o.month) for o in objs}
+    if stale:
+        candidates = SiteInvoiceMonthly.objects.filter(
+            site_id__in={k[0] for k in stale},
+            year__in={k[1] for k in stale},
+            month__in={k[2] for k in stale},
+        ).values_list("pk", "site_id", "year", "month")
+        SiteInvoiceMonthly.objects.filter(
+            pk__in=[pk for pk, *key in candidates if tuple(key) in stale]
+        ).delete()
+    return len(objs)
+
+
+def month_range(start=None, end=None, prefix=""):
+    """
+    Q sur (year, month) de SiteInvoiceMonthly : du mois de start au mois de end inclus.
+    prefix permet de filtrer depuis Site ("invoice_months__").
+    """
+    q = Q()
+    if start:
+        q &= Q(**{f"{prefix}year__gt": start.year}) | Q(**{f"{prefix}year": start.year, f"{prefix}month__gte": start.month})
+    if end:
+        q &= Q(**{f"{prefix}year__lt": end.year}) | Q(**{f"{prefix}year": end.year, f"{prefix}month__lte": end.month})
+    return q
+
+
+def is_month_aligned(start=None, end=None):
+    """Vrai si les bornes tombent sur des mois entiers (1er du mois / dernier jour)."""
+    if start and start.day != 1:
+        return False
+    if end and (end + datetime.timedelta(days=1)).day != 1:
+        return False
+    return True
+
+
+def rollup_avg(total, count):
+    """Moyenne Avg() reconstituée depuis <champ>_sum / <champ>_count (None si aucune valeur)."""
+    return total / count if count else None
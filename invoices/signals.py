@@ -0,0 +1,36 @@
+# invoices/signals.py
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Facture
+from .services import month_key, refresh_site_invoice_monthly
+
+
+# (site, année, mois) des factures supprimées, par base, en attente du COMMIT
+_local = threading.local()
+
+
+def _pending(using):
+    if not hasattr(_local, "keys"):
+        _local.keys = {}
+    return _local.keys.setdefault(using, set())
+
+
+def _refresh(using):
+    # 1er rappel après COMMIT : tous les mois touchés en une fois ; les suivants n'ont plus rien.
+    # (transaction annulée : clés laissées en attente, recalculées au COMMIT suivant, sans effet)
+    keys = getattr(_local, "keys", {}).pop(using, None)
+    if keys:
+        refresh_site_invoice_monthly(keys)
+
+
+@receiver(post_delete, sender=Facture)
+def facture_deleted(sender, instance, using, **kwargs):
+    # toute suppression (API, admin, cascade depuis Site, queryset.delete()) : cumul mensuel à jour,
+    # recalculé une fois par transaction après commit (comme billing.signals)
+    if instance.site_id and instance.date_facture:
+        _pending(using).add(month_key(instance.site_id, instance.date_facture))
+        transaction.on_commit(lambda: _refresh(using), using=using)
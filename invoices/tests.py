@@ -1,3 +1,145 @@
+import datetime
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.db.models import Avg
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Site
+from invoices import signals
+from invoices.models import Facture, SiteInvoiceMonthly
+from invoices.services import refresh_site_invoice_monthly
+from invoices.views import FactureViewSet
+from users.models import CustomUser
+
+
+D = datetime.date
+
+
+class InvoiceFixture(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.s1 = Site.objects.create(site_id="S1", name="S1")
+        cls.s2 = Site.objects.create(site_id="S2", name="S2")
+
+    def facture(self, site, date, ht, ttc=None, conso=None):
+        return Facture.objects.create(
+            site=site, police_number="P", contrat_number="C", facture_number=f"F{Facture.objects.count()}",
+            date_facture=date, montant_ht=Decimal(ht),
+            montant_ttc=None if ttc is None else Decimal(ttc),
+            consommation_kwh=None if conso is None else Decimal(conso),
+        )
+
+    def refresh_all(self):
+        refresh_site_invoice_monthly({(f.site_id, f.date_facture.year, f.date_facture.month) for f in Facture.objects.all()})
+
+    def rollup(self):
+        return sorted(SiteInvoiceMonthly.objects.values_list("site_id", "year", "month", "invoices_count", "montant_ht_sum"))
+
+
+class DeleteSignalTests(InvoiceFixture):
+    def setUp(self):
+        for day in (1, 15, 28):
+            self.facture(self.s1, D(2025, 7, day), "10")
+            self.facture(self.s1, D(2025, 8, day), "20")
+        self.facture(self.s2, D(2025, 8, 3), "5")
+        self.refresh_all()
+
+    def test_queryset_delete_refreshes_once_after_commit(self):
+        with mock.patch.object(signals, "refresh_site_invoice_monthly", wraps=refresh_site_invoice_monthly) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                Facture.objects.filter(site=self.s1, date_facture__day__gte=15).delete()
+                refresh.assert_not_called()  # rien avant le COMMIT
+        refresh.assert_called_once_with({(self.s1.pk, 2025, 7), (self.s1.pk, 2025, 8)})
+        self.assertEqual(self.rollup(), [
+            (self.s1.pk, 2025, 7, 1, Decimal("10")),
+            (self.s1.pk, 2025, 8, 1, Decimal("20")),
+            (self.s2.pk, 2025, 8, 1, Decimal("5")),
+        ])
+
+    def test_last_invoice_of_a_month_removes_the_row(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Facture.objects.get(site=self.s2).delete()
+        self.assertFalse(SiteInvoiceMonthly.objects.filter(site=self.s2).exists())
+
+    def test_site_cascade(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.s1.delete()
+        self.assertEqual(self.rollup(), [(self.s2.pk, 2025, 8, 1, Decimal("5"))])
+
+
+class KpiStatsTests(InvoiceFixture):
+    """kpi_stats et /stats/ lus dans le cumul mensuel : même JSON que les Avg() sur Facture."""
+
+    TODAY = D(2025, 10, 17)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="u", pays="sen")
+        for site in (self.s1, self.s2):
+            site.country = "sen"
+            site.save()
+        Site.objects.create(site_id="S3", name="S3", country="sen")  # sans facture : 0 partout
+        for date, ht, ttc, conso in [
+            (D(2024, 3, 5), "100", "118", "40"), (D(2024, 12, 31), "50", None, "10"),
+            (D(2025, 2, 10), "30", "35.40", None), (D(2025, 7, 1), "12.50", "14.75", "5"),
+            (D(2025, 9, 30), "7.50", "8.85", "3"), (D(2025, 10, 2), "20", "23.60", "8"),
+            (D(2025, 10, 20), "999", "999", "999"),  # postérieure à aujourd'hui : exclue
+        ]:
+            self.facture(self.s1, date, ht, ttc, conso)
+        self.facture(self.s2, D(2025, 8, 14), "60", "70.80", "25")
+        self.facture(self.s2, D(2024, 8, 14), "40", "47.20", "15")
+        self.refresh_all()
+
+    def assertSameJSON(self, actual, expected):
+        # Avg() SQLite arrondi à 15 chiffres significatifs, la division du cumul non : écart au-delà de 1e-10
+        def norm(value):
+            if isinstance(value, float):
+                return round(value, 10)
+            if isinstance(value, list):
+                return [norm(v) for v in value]
+            if isinstance(value, dict):
+                return {k: norm(v) for k, v in value.items()}
+            return value
+        self.assertEqual(norm(json.loads(actual)), norm(json.loads(expected)))
+
+    def get(self, name, **params):
+        request = APIRequestFactory().get("/", params)
+        force_authenticate(request, self.user)
+        with mock.patch.object(timezone, "now", return_value=datetime.datetime(2025, 10, 17, 12, tzinfo=datetime.timezone.utc)):
+            response = FactureViewSet.as_view({"get": name})(request)
+        self.assertEqual(response.status_code, 200)
+        return JSONRenderer().render(response.data)
+
+    def expected_kpi(self):
+        # calcul d'origine : Avg() sur Facture, fenêtre par fenêtre et site par site
+        windows = {
+            "kpi_last_3_months": (D(2025, 7, 1), self.TODAY),
+            "kpi_current_year": (D(2025, 1, 1), self.TODAY),
+            "kpi_previous_year": (D(2024, 1, 1), D(2024, 12, 31)),
+        }
+        results = []
+        for site in Site.objects.filter(country="sen"):
+            row = {"site_id": site.id, "site_name": site.name}
+            for window, (start, end) in windows.items():
+                qs = Facture.objects.filter(site=site, date_facture__gte=start, date_facture__lte=end)
+                row[window] = {
+                    key: qs.aggregate(avg=Avg(field))["avg"] or 0
+                    for key, field in [("avg_montant_ht", "montant_ht"), ("avg_montant_ttc", "montant_ttc"),
+                                       ("avg_consommation_kwh", "consommation_kwh")]
+                }
+            results.append(row)
+        return JSONRenderer().render(results)
+
+    def test_kpi_stats_matches_raw_average(self):
+        self.assertSameJSON(self.get("kpi_stats"), self.expected_kpi())
 
-# Create your tests here.
+    def test_stats_rollup_matches_raw_average(self):
+        # bornes en mois entiers (cumul) puis décalées d'un jour sans facture (Avg sur Facture)
+        rollup = self.get("stats", start_date="2024-08-01", end_date="2025-09-30")
+        raw = self.get("stats", start_date="2024-08-02", end_date="2025-09-30")
+        self.assertNotEqual(rollup, b"[]")
+        self.assertSameJSON(rollup, raw)
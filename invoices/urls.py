@@ -1,5 +1,6 @@
 from rest_framework.routers import DefaultRouter
-from .views import FactureAsyncImportView, FactureImportView, FactureViewSet, ImportStatusView
+from ingestion.views import ImportStatusView
+from .views import FactureAsyncImportView, FactureImportView, FactureViewSet
 from django.urls import path, include
 
 router = DefaultRouter()
@@ -4,6 +4,8 @@ import datetime
 import pandas as pd
 from django.utils.dateparse import parse_date
 
+from ingestion import cleaning
+
 
 
 def safe_decimal(val):
@@ -69,4 +71,80 @@ def safe_date(val):
 def safe_str(val):
     if val is None or (isinstance(val, float) and pd.isna(val)):
         return None
-    return str(val).strip()
\ No newline at end of file
+    return str(val).strip()
+
+# --- Parsing vectorisé du fichier factures (colonne par colonne) ---
+
+def _str(s):
+    return cleaning.text(s)
+
+def _dec(s):
+    return cleaning.decimals(s, codes=None, decimal_comma=True)
+
+def _float(s):
+    return cleaning.numbers(s, codes=None, thousands=None)
+
+def _int(s):
+    return cleaning.integers(s, codes=None)
+
+def _date(s):
+    return cleaning.dates(s, codes=None, serial_range=None).dt.date
+
+
+# champ Facture -> (colonne du fichier, convertisseur)
+FACTURE_COLUMNS = {
+    'police_number': ('N° POLICE', _str),
+    'contrat_number': ('N°COMPTE CONTRAT', _str),
+    'typologie': ('TYPOLOGIE', _str),
+    'categorie': ('CATEGORIE', _str),
+    'societe': ('SOCIÉTÉ', _str),
+    'type_police': ('TYPE POLICE', _str),
+    'date_facture': ('DATE FACTURE', _date),
+    'date_echeance': ('ÉCHÉANCE', _date),
+    'montant_ht': ('MONTANT HT', _dec),
+    'montant_tco': ('MONTANT TCO', _dec),
+    'montant_redevance': ('MONTANT REDEVANCE', _dec),
+    'montant_tva': ('MONTANT TVA', _dec),
+    'montant_ttc': ('MONTANT TTC', _dec),
+    'montant_htva': ('MONTANT HTVA', _dec),
+    'montant_energie': ('MONTANT ENERGIE', _dec),
+    'montant_cosphi': ('MONTANT COSPHI', _dec),
+    'date_ai': ('DATE AI', _date),
+    'date_ni': ('DATE NI', _date),
+    'index_ai_k1': ('INDEX AI K1', _int),
+    'index_ai_k2': ('INDEX AI K2', _int),
+    'index_ni_k1': ('INDEX NI K1', _int),
+    'index_ni_k2': ('INDEX NI K2', _int),
+    'consommation_kwh': ('CONS FACTURÉE', _dec),
+    'rappel_majoration': ('RAPPEL MAJORATION', _dec),
+    'nb_jours': ('NOMBRE DE JOURS', _int),
+    'ps': ('PS', _float),
+    'max_relevee': ('MAX RELEVEE', _float),
+    'statut': ('STATUT', _str),
+    'observation': ('OBSERVATION', _str),
+    'prime_fixe': ('PRIME FIXE', _dec),
+    'conso_reactif': ('CONSO REACTIF', _dec),
+    'cos_phi': ('COS PHI', _float),
+    'mois_echeance': ('MOIS ECHEANCE', _str),
+    'annee_echeance': ('ANNEE ECHEANCE', _int),
+    'mois_business': ('MOIS BUSINESS', _str),
+    'annee_business': ('ANNÉE', _int),
+    'type_tarif': ('TYPE DE TARIF', _str),
+    'type_compte': ('TYPE COMPTE', _str),
+    'numero_compteur': ('N° COMPTEUR', _str),
+}
+
+
+def parse_factures(df):
+    """
+    DataFrame brut du fichier factures -> (numéros de facture, sites bruts, lignes).
+    `lignes` est une liste de dicts {champ: valeur Python} (sans site ni numéro).
+    Les colonnes absentes du fichier donnent None.
+    """
+    columns = {}
+    for field, (src, convert) in FACTURE_COLUMNS.items():
+        col = df[src] if src in df.columns else cleaning.missing(len(df), df.index)
+        columns[field] = convert(col)
+    numbers = cleaning.values(_str(df['FACTURE']))
+    sites = cleaning.values(df['SITE'])
+    return numbers, sites, cleaning.records(columns)
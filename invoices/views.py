@@ -1,29 +1,40 @@
 import datetime
 import math
-from celery.result import AsyncResult
 from rest_framework import viewsets
 
+from enertrack_backend.exports import ExportMixin, model_fields
+from invoices.services import (
+    is_month_aligned, month_key, month_range, refresh_site_invoice_monthly, rollup_avg,
+)
 from invoices.tasks import import_factures_task
-from invoices.utils.parsers import safe_date, safe_decimal, safe_float, safe_int, safe_str
-from .models import Facture
+from invoices.utils.parsers import parse_factures
+from ingestion.readers import SheetReader
+from ingestion.storage import spool_upload
+from .models import Facture, SiteInvoiceMonthly
 from .serializers import FactureSerializer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser
 from django.utils.dateparse import parse_date
+from dateutil.relativedelta import relativedelta
 from rest_framework import status
 from rest_framework.decorators import action
-from django.db.models import Avg, Count
-import pandas as pd
+from django.db.models import Avg, Count, Sum
 from core.models import Site
 import decimal
-import traceback
 from django.utils import timezone
 
 
-class FactureViewSet(viewsets.ModelViewSet):
+class FactureViewSet(ExportMixin, viewsets.ModelViewSet):
     queryset = Facture.objects.all().order_by('-date_facture')
     serializer_class = FactureSerializer
+    # GET /api/invoices/export/?output=csv|ndjson&start_date=&end_date= (remplace /between/ pour les exports Excel)
+    export_name = "factures"
+    export_fields = [
+        ("site_id", "site__site_id"), ("site_name", "site__name"),
+        *model_fields(Facture, exclude=["site"]),
+    ]
+    export_ordering = ('site__name', '-date_facture')  # même tri que /between/
 
     def get_queryset(self):
         user_country = self.request.user.pays
@@ -35,6 +46,21 @@ class FactureViewSet(viewsets.ModelViewSet):
         if end_date:
             qs = qs.filter(date_facture__lte=parse_date(end_date))
         return qs
+
+    # Maintien du cumul SiteInvoiceMonthly (ancien et nouveau mois de la facture)
+    def _refresh_months(self, *factures):
+        refresh_site_invoice_monthly(
+            {month_key(f.site_id, f.date_facture) for f in factures if f.site_id and f.date_facture}
+        )
+
+    def perform_create(self, serializer):
+        self._refresh_months(serializer.save())
+
+    def perform_update(self, serializer):
+        old = Facture(site_id=serializer.instance.site_id, date_facture=serializer.instance.date_facture)
+        self._refresh_months(old, serializer.save())
+
+    # suppression : voir invoices.signals (post_delete)
     
 
 
@@ -47,61 +73,97 @@ class FactureViewSet(viewsets.ModelViewSet):
         user_country = self.request.user.pays
         today = timezone.now().date()
         start_year = today.replace(month=1, day=1)
-        start_3_months = (today.replace(day=1) - datetime.timedelta(days=1)).replace(day=1)  # 1er du mois dernier
-        start_3_months = (start_3_months - datetime.timedelta(days=2*30)).replace(day=1)  # Environ 3 mois avant
+        # 1er jour du mois, 3 mois calendaires avant le mois en cours (ex: 17/10 -> 01/07)
+        start_3_months = today.replace(day=1) - relativedelta(months=3)
 
         prev_year_start = (today.replace(year=today.year - 1, month=1, day=1))
         prev_year_end = start_year - datetime.timedelta(days=1)
 
+        # Mois entiers lus dans le cumul mensuel ; le mois en cours est lu dans
+        # Facture jusqu'à aujourd'hui (date_facture <= today, factures à venir exclues)
+        month_start = today.replace(day=1)
+        last_month_end = month_start - datetime.timedelta(days=1)
+        windows = {
+            "kpi_last_3_months": (start_3_months, last_month_end),
+            "kpi_current_year": (start_year, last_month_end),
+            "kpi_previous_year": (prev_year_start, prev_year_end),
+        }
+        to_today = {"kpi_last_3_months", "kpi_current_year"}
+        metrics = {
+            "avg_montant_ht": "montant_ht",
+            "avg_montant_ttc": "montant_ttc",
+            "avg_consommation_kwh": "consommation_kwh",
+        }
+
+        # Une seule requête sur le cumul mensuel SiteInvoiceMonthly (fenêtres en mois entiers)
+        annotations = {}
+        for window, (start, end) in windows.items():
+            in_window = month_range(start, end, prefix="invoice_months__")
+            for key, field in metrics.items():
+                annotations[f"{window}__{key}__sum"] = Sum(f"invoice_months__{field}_sum", filter=in_window)
+                annotations[f"{window}__{key}__count"] = Sum(f"invoice_months__{field}_count", filter=in_window)
+
+        rows = (
+            Site.objects.filter(country=user_country)
+            .values("id", "name")
+            .annotate(**annotations)
+        )
+        current = {
+            row["site_id"]: row
+            for row in Facture.objects.filter(
+                site__country=user_country, date_facture__gte=month_start, date_facture__lte=today,
+            )
+            .values("site_id")
+            .annotate(**{
+                f"{key}__{agg}": fn(field)
+                for key, field in metrics.items()
+                for agg, fn in (("sum", Sum), ("count", Count))
+            })
+            .order_by()
+        }
+
+        def avg(row, window, key):
+            total, count = row[f"{window}__{key}__sum"] or 0, row[f"{window}__{key}__count"] or 0
+            extra = current.get(row["id"]) if window in to_today else None
+            if extra:
+                total += extra[f"{key}__sum"] or 0
+                count += extra[f"{key}__count"]
+            return rollup_avg(total, count) or 0
+
         # Prépare le résultat
-        results = []
-        sites = Site.objects.filter(country=user_country)
-
-        for site in sites:
-            qs = Facture.objects.filter(site=site)
-
-            # 3 derniers mois
-            last_3m = qs.filter(date_facture__gte=start_3_months, date_facture__lte=today)
-            # Année en cours
-            current_year = qs.filter(date_facture__gte=start_year, date_facture__lte=today)
-            # Année précédente
-            previous_year = qs.filter(date_facture__gte=prev_year_start, date_facture__lte=prev_year_end)
-
-            results.append({
-                "site_id": site.id,
-                "site_name": site.name,
-                "kpi_last_3_months": {
-                    "avg_montant_ht": last_3m.aggregate(avg=Avg("montant_ht"))["avg"] or 0,
-                    "avg_montant_ttc": last_3m.aggregate(avg=Avg("montant_ttc"))["avg"] or 0,
-                    "avg_consommation_kwh": last_3m.aggregate(avg=Avg("consommation_kwh"))["avg"] or 0,
-                },
-                "kpi_current_year": {
-                    "avg_montant_ht": current_year.aggregate(avg=Avg("montant_ht"))["avg"] or 0,
-                    "avg_montant_ttc": current_year.aggregate(avg=Avg("montant_ttc"))["avg"] or 0,
-                    "avg_consommation_kwh": current_year.aggregate(avg=Avg("consommation_kwh"))["avg"] or 0,
+        results = [
+            {
+                "site_id": row["id"],
+                "site_name": row["name"],
+                **{
+                    window: {
+                        key: avg(row, window, key)
+                        for key in metrics
+                    }
+                    for window in windows
                 },
-                "kpi_previous_year": {
-                    "avg_montant_ht": previous_year.aggregate(avg=Avg("montant_ht"))["avg"] or 0,
-                    "avg_montant_ttc": previous_year.aggregate(avg=Avg("montant_ttc"))["avg"] or 0,
-                    "avg_consommation_kwh": previous_year.aggregate(avg=Avg("consommation_kwh"))["avg"] or 0,
-                },
-            })
+            }
+            for row in rows
+        ]
 
-      
         return Response(results)
 
 
     @action(detail=False, methods=["get"], url_path="stats")
     def stats(self, request):
         user_country = self.request.user.pays
-        qs = Facture.objects.filter(site__country=user_country)
+        start_date = parse_date(self.request.query_params.get("start_date") or "")
+        end_date = parse_date(self.request.query_params.get("end_date") or "")
 
-        start_date = self.request.query_params.get("start_date")
-        end_date = self.request.query_params.get("end_date")
+        # Mois entiers : lecture du cumul mensuel, sans parcourir les factures
+        if is_month_aligned(start_date, end_date):
+            return Response(self._stats_from_rollup(user_country, start_date, end_date))
+
+        qs = Facture.objects.filter(site__country=user_country)
         if start_date:
-            qs = qs.filter(date_facture__gte=parse_date(start_date))
+            qs = qs.filter(date_facture__gte=start_date)
         if end_date:
-            qs = qs.filter(date_facture__lte=parse_date(end_date))
+            qs = qs.filter(date_facture__lte=end_date)
 
         # Statistiques groupées par site
         stats = qs.values(
@@ -121,6 +183,44 @@ class FactureViewSet(viewsets.ModelViewSet):
 
         return Response(list(stats))
 
+    # clé de /stats/ -> champ cumulé dans SiteInvoiceMonthly
+    STATS_ROLLUP = {
+        "avg_montant_ht": "montant_ht",
+        "avg_montant_tco": "montant_tco",
+        "avg_montant_redevance": "montant_redevance",
+        "avg_montant_tva": "montant_tva",
+        "avg_montant_ttc": "montant_ttc",
+        "avg_montant_htva": "montant_htva",
+        "avg_consommation": "consommation_kwh",
+    }
+
+    def _stats_from_rollup(self, user_country, start_date, end_date):
+        annotations = {"count": Sum("invoices_count")}
+        for key, field in self.STATS_ROLLUP.items():
+            annotations[f"{key}__sum"] = Sum(f"{field}_sum")
+            annotations[f"{key}__count"] = Sum(f"{field}_count")
+
+        rows = (
+            SiteInvoiceMonthly.objects
+            .filter(month_range(start_date, end_date), site__country=user_country)
+            .values('site', 'site__name', 'site__site_id')
+            .annotate(**annotations)
+            .order_by('site__name')
+        )
+        return [
+            {
+                'site': row['site'],
+                'site__name': row['site__name'],
+                'site__site_id': row['site__site_id'],
+                **{
+                    key: rollup_avg(row[f"{key}__sum"], row[f"{key}__count"])
+                    for key in self.STATS_ROLLUP
+                },
+                'count': row['count'],
+            }
+            for row in rows
+        ]
+
     @action(detail=False, methods=["get"], url_path="between")
     def between(self, request):
         """
@@ -152,69 +252,45 @@ class FactureImportView(APIView):
         if not file:
             return Response({"error": "No file provided."}, status=400)
 
-        df = pd.read_excel(file)
+        try:
+            reader = SheetReader(file, file.name)
+        except Exception as e:
+            return Response({"error": f"Read error: {e}"}, status=400)
         created = 0
 
-        for _, row in df.iterrows():
-            try:
-                site = Site.objects.get(name=row['SITE'])
-            except Site.DoesNotExist:
-                continue
-
-            date_facture = safe_date(row.get('DATE FACTURE'))
-            if not date_facture:
-
-                # Option 1 : on saute la ligne
-                continue
-
-            Facture.objects.update_or_create(
-                facture_number=safe_str(row['FACTURE']),
-                defaults={
-                    'site': site,
-                    'police_number': safe_str(row.get('N° POLICE')),
-                    'contrat_number': safe_str(row.get('N°COMPTE CONTRAT')),
-                    "typologie": safe_str(row.get('TYPOLOGIE')),
-                    "categorie": safe_str(row.get('CATEGORIE')),
-                    "societe": safe_str(row.get('SOCIÉTÉ')),
-                    "type_police": safe_str(row.get('TYPE POLICE')),
-                    'date_facture': safe_date(row.get('DATE FACTURE')),
-                    'date_echeance': safe_date(row.get('ÉCHÉANCE')),
-                    'montant_ht': safe_decimal(row.get('MONTANT HT')),
-                    'montant_tco': safe_decimal(row.get('MONTANT TCO')),
-                    'montant_redevance': safe_decimal(row.get('MONTANT REDEVANCE')),
-                    'montant_tva': safe_decimal(row.get('MONTANT TVA')),
-                    'montant_ttc': safe_decimal(row.get('MONTANT TTC')),
-                    'montant_htva': safe_decimal(row.get('MONTANT HTVA')),
-                    'montant_energie': safe_decimal(row.get('MONTANT ENERGIE')),
-                    'montant_cosphi': safe_decimal(row.get('MONTANT COSPHI')),
-                    'date_ai': safe_date(row.get('DATE AI')),
-                    'date_ni': safe_date(row.get('DATE NI')),
-                    'index_ai_k1': safe_int(row.get('INDEX AI K1')),
-                    'index_ai_k2': safe_int(row.get('INDEX AI K2')),
-                    'index_ni_k1': safe_int(row.get('INDEX NI K1')),
-                    'index_ni_k2': safe_int(row.get('INDEX NI K2')),
-                    'consommation_kwh': safe_decimal(row.get('CONS FACTURÉE')),
-                    'rappel_majoration': safe_decimal(row.get('RAPPEL MAJORATION')),
-                    'nb_jours': safe_int(row.get('NOMBRE DE JOURS')),
-                    'ps': safe_float(row.get('PS')),
-                    'max_relevee': safe_float(row.get('MAX RELEVEE')),
-                    'statut': safe_str(row.get('STATUT')),
-                    'observation': safe_str(row.get('OBSERVATION')),
-                    'prime_fixe': safe_decimal(row.get('PRIME FIXE')),
-                    'conso_reactif': safe_decimal(row.get('CONSO REACTIF')),
-                    'cos_phi': safe_float(row.get('COS PHI')),
-                    'mois_echeance': safe_str(row.get('MOIS ECHEANCE')),
-                    'annee_echeance': safe_int(row.get('ANNEE ECHEANCE')),
-                    'mois_business': safe_str(row.get('MOIS BUSINESS')),
-                    'annee_business': safe_int(row.get('ANNÉE')),
-                    'type_tarif': safe_str(row.get('TYPE DE TARIF')),
-                    'type_compte': safe_str(row.get('TYPE COMPTE')),
-                    'numero_compteur': safe_str(row.get('N° COMPTEUR')),
-                }
+        sites = {s.name: s for s in Site.objects.all()}
+        touched = set()  # mois SiteInvoiceMonthly à recalculer
+
+        for df in reader.chunks():
+            numbers, raw_sites, rows = parse_factures(df)
+            # anciens (site, mois) des factures déjà en base
+            touched.update(
+                month_key(site_id, d)
+                for site_id, d in Facture.objects.filter(facture_number__in=numbers)
+                .values_list('site_id', 'date_facture')
+                if d
             )
 
-            created += 1
+            for facture_number, raw_site, defaults in zip(numbers, raw_sites, rows):
+                site = sites.get(raw_site)
+                if not site:
+                    continue
+
+                if not defaults['date_facture']:
 
+                    # Option 1 : on saute la ligne
+                    continue
+
+                defaults['site'] = site
+                Facture.objects.update_or_create(
+                    facture_number=facture_number,
+                    defaults=defaults,
+                )
+                touched.add(month_key(site.id, defaults['date_facture']))
+
+                created += 1
+
+        refresh_site_invoice_monthly(touched)
         return Response({"message": f"{created} factures importées."}, status=201)
 
 
@@ -225,20 +301,7 @@ class FactureAsyncImportView(APIView):
         file = request.FILES.get('file')
         if not file:
             return Response({"error": "No file provided"}, status=400)
-        task = import_factures_task.delay(file.read())
+        # Seule la référence du fichier (chemin + sha256) passe par le broker
+        path, sha256 = spool_upload(file)
+        task = import_factures_task.delay(path, sha256, file.name)
         return Response({"task_id": task.id}, status=202)
-
-
-class ImportStatusView(APIView):
-    def get(self, request, task_id):
-        result = AsyncResult(task_id)
-        if result.ready():
-            data = result.result
-            # Si c'est une exception, convertis en texte complet (traceback)
-            if isinstance(data, Exception):
-                data = ''.join(traceback.format_exception_only(type(data), data))
-            return Response({
-                "status": result.status,
-                "result": data
-            })
-        return Response({"status": result.status})
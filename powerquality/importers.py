@@ -0,0 +1,234 @@
+# powerquality/importers.py
+import datetime
+
+import pandas as pd
+from django.utils import timezone
+
+from energy.models import Country, Site
+from ingestion import cleaning
+from ingestion.headers import HeaderSpec, normalize
+from ingestion.importers import BaseImporter
+from .measures import long_storage, write_measures
+from .models import PQReport
+
+
+# Colonnes clefs
+KEY_COLUMNS = {
+    "country": ["country"],
+    "site_id": ["site id"],
+    "begin": ["begin period 00h00", "begin period"],
+    "end": ["end period 23h59", "end period"],
+    "extract": ["extract date"],
+}
+
+# Mesures : libellés combinés "groupe + sous-libellé" (voir open())
+MEASURE_COLUMNS = {
+    # Mono
+    "mono_vmin_v": ["monophase vmin v"],
+    "mono_vavg_v": ["monophase vavg v"],
+    "mono_vmax_v": ["monophase vmax v"],
+    "mono_imin_a": ["monophase imin a"],
+    "mono_iavg_a": ["monophase iavg a"],
+    "mono_imax_a": ["monophase imax a"],
+    "mono_pmin_kw": ["monophase pmin kw"],
+    "mono_pavg_kw": ["monophase pavg kw"],
+    "mono_pmax_kw": ["monophase pmax kw"],
+    "mono_total_energy_kwh": ["monophase total energy kwh"],
+    "mono_energy_consumed_kwh": ["monophase energy consumed kwh"],
+
+    # Tri (synonymes pour 'consumed/produced')
+    "tri_vmin_u1_v": ["triphase vmin u1 v"],
+    "tri_vavg_u1_v": ["triphase vavg u1 v"],
+    "tri_vmax_u1_v": ["triphase vmax u1 v"],
+    "tri_vmin_u2_v": ["triphase vmin u2 v"],
+    "tri_vavg_u2_v": ["triphase vavg u2 v"],
+    "tri_vmax_u2_v": ["triphase vmax u2 v"],
+    "tri_vmin_u3_v": ["triphase vmin u3 v"],
+    "tri_vavg_u3_v": ["triphase vavg u3 v"],
+    "tri_vmax_u3_v": ["triphase vmax u3 v"],
+    "tri_imin_i1_a": ["triphase imin i1 a"],
+    "tri_iavg_i1_a": ["triphase iavg i1 a"],
+    "tri_imax_i1_a": ["triphase imax i1 a"],
+    "tri_imin_i2_a": ["triphase imin i2 a"],
+    "tri_iavg_i2_a": ["triphase iavg i2 a"],
+    "tri_imax_i2_a": ["triphase imax i2 a"],
+    "tri_imin_i3_a": ["triphase imin i3 a"],
+    "tri_iavg_i3_a": ["triphase iavg i3 a"],
+    "tri_imax_i3_a": ["triphase imax i3 a"],
+    "tri_pmin_kw": ["triphase pmin kw"],
+    "tri_pavg_kw": ["triphase pavg kw"],
+    "tri_pmax_kw": ["triphase pmax kw"],
+    "tri_total_energy_kwh": ["triphase total energy kwh"],
+    "tri_active_energy_kwh": ["triphase active energy consumed kwh", "triphase active energy kwh"],
+    "tri_reactive_energy_kvarh": ["triphase reactive energy consumed kvarh", "triphase reactive energy kvarh"],
+    "tri_apparent_energy_kvah": ["triphase apparent energy produced kvah", "triphase apparent energy kvah"],
+
+    # Tri 2
+    "tri2_vmin_u1_v": ["triphase 2 vmin u1 v"],
+    "tri2_vavg_u1_v": ["triphase 2 vavg u1 v"],
+    "tri2_vmax_u1_v": ["triphase 2 vmax u1 v"],
+    "tri2_vmin_u2_v": ["triphase 2 vmin u2 v"],
+    "tri2_vavg_u2_v": ["triphase 2 vavg u2 v"],
+    "tri2_vmax_u2_v": ["triphase 2 vmax u2 v"],
+    "tri2_vmin_u3_v": ["triphase 2 vmin u3 v"],
+    "tri2_vavg_u3_v": ["triphase 2 vavg u3 v"],
+    "tri2_vmax_u3_v": ["triphase 2 vmax u3 v"],
+    "tri2_imin_i1_a": ["triphase 2 imin i1 a"],
+    "tri2_iavg_i1_a": ["triphase 2 iavg i1 a"],
+    "tri2_imax_i1_a": ["triphase 2 imax i1 a"],
+    "tri2_imin_i2_a": ["triphase 2 imin i2 a"],
+    "tri2_iavg_i2_a": ["triphase 2 iavg i2 a"],
+    "tri2_imax_i2_a": ["triphase 2 imax i2 a"],
+    "tri2_imin_i3_a": ["triphase 2 imin i3 a"],
+    "tri2_iavg_i3_a": ["triphase 2 iavg i3 a"],
+    "tri2_imax_i3_a": ["triphase 2 imax i3 a"],
+    "tri2_pmin_kw": ["triphase 2 pmin kw"],
+    "tri2_pavg_kw": ["triphase 2 pavg kw"],
+    "tri2_pmax_kw": ["triphase 2 pmax kw"],
+    "tri2_total_energy_kwh": ["triphase 2 total energy kwh"],
+    "tri2_active_energy_kwh": ["triphase 2 active energy consumed kwh", "triphase 2 active energy kwh"],
+    "tri2_reactive_energy_kvarh": ["triphase 2 reactive energy consumed kvarh", "triphase 2 reactive energy kvarh"],
+    "tri2_apparent_energy_kvah": ["triphase 2 apparent energy produced kvah", "triphase 2 apparent energy kvah"],
+}
+
+# compilé une fois ; repli "contient tous les jetons" (unités retirées des libellés)
+HEADER = HeaderSpec({**KEY_COLUMNS, **MEASURE_COLUMNS}, contains=True)
+
+
+def _is_header(row_norm):
+    return "country" in row_norm and "site id" in row_norm and (
+        "begin period 00h00" in row_norm or "begin period" in row_norm
+    )
+
+
+class PQImporter(BaseImporter):
+    """Rapport Power Quality : une ligne par site et par période (en-tête sur 2 lignes)."""
+    kind = "pq"
+    header_error = "Entête introuvable (Country / Site ID / Begin Period)."
+
+    def open(self):
+        # --- Lecture en flux : en-tête = ligne "Country / Site ID / Begin Period" + ligne suivante
+        reader = self.read(is_header=_is_header, normalize=normalize, scan_max=35, header_rows=2)
+
+        # --- Construit colonnes à partir de 2 lignes d'en-tête (groupe & libellés)
+        h0, h1 = (
+            pd.Series(row, dtype=object).astype(str).replace({"nan": "", "None": ""}).str.strip()
+            for row in reader.header
+        )
+
+        # Propage 'MonoPhase' / 'TriPhase' / 'TriPhase 2' vers la droite
+        group = h0.replace("", pd.NA).ffill()
+
+        # Concat groupe + sous-libellé → "monophase vavg v", "triphase active energy consumed kwh", ...
+        combined = (group + " " + h1).str.strip()
+        combined = combined.where(combined != "", h1)
+        combined = combined.fillna("")
+
+        # Les paquets de données prennent ces libellés combinés
+        reader.columns = [str(c) for c in combined]
+
+        # Mapping robuste (résolution mise en cache par modèle d'en-tête)
+        cols = self.resolve_columns(HEADER, reader.columns)
+        self.c_country = cols["country"]
+        self.c_siteid = cols["site_id"]
+        self.c_begin = cols["begin"]
+        self.c_end = cols["end"]
+        self.c_extract = cols["extract"]
+
+        self.fields = {field: cols[field] for field in MEASURE_COLUMNS}
+        # Optionnel: log des colonnes non mappées (utile pour débogage)
+        self.unmapped = [f for f in cols.unmapped if f in MEASURE_COLUMNS]
+        self.created = 0
+
+    def clean(self, df):
+        """
+        Nettoyage vectorisé d'un paquet :
+        [(site, pays, début, fin, extraction, début brut, fin brute, mesures, empreinte)].
+        """
+        codes = cleaning.PQ_NULL_CODES
+
+        def col(name):
+            return df[name] if name else cleaning.missing(len(df), df.index)
+
+        sids = cleaning.text(col(self.c_siteid))
+        keep = sids.notna()
+        df, sids = df[keep], sids[keep]
+
+        measures = {
+            field: cleaning.numbers(col(c), decimals=6, codes=codes)
+            for field, c in self.fields.items()
+        }
+        countries = cleaning.text(col(self.c_country)).fillna(self.user_country or "Unknown")
+        begins = cleaning.datetimes(col(self.c_begin), codes=codes)
+        ends = cleaning.datetimes(col(self.c_end), codes=codes)
+        extracts = cleaning.datetimes(col(self.c_extract), codes=codes)
+        fingerprints = cleaning.fingerprints({"country": countries, "extract_date": extracts, **measures})
+
+        return list(zip(
+            cleaning.values(sids),
+            cleaning.values(countries),
+            cleaning.values(begins),
+            cleaning.values(ends),
+            cleaning.values(extracts),
+            cleaning.values(col(self.c_begin)),
+            cleaning.values(col(self.c_end)),
+            cleaning.records(measures),
+            fingerprints.tolist(),
+        ))
+
+    def process(self, rows):
+        # empreintes des rapports déjà en base pour ces sites / débuts de période
+        known = self.known_fingerprints(
+            PQReport.objects.filter(
+                site__site_id__in={row[0] for row in rows},
+                begin_period__in={timezone.make_aware(row[2], datetime.timezone.utc) for row in rows if row[2]},
+            ),
+            ["site__site_id", "begin_period", "end_period"],
+        )
+
+        long = long_storage()
+        measured = []
+        for sid, country_name, b, e, xdate, raw_b, raw_e, values, fingerprint in rows:
+            if b and e and known.get((sid, b, e)) == fingerprint:
+                self.unchanged += 1
+                continue
+
+            country, _ = Country.objects.get_or_create(name=country_name)
+
+            site, _ = Site.objects.get_or_create(
+                site_id=sid, defaults={"country": country, "site_name": sid}
+            )
+            if site.country_id != country.id:
+                site.country = country
+                site.save()
+
+            if not b or not e:
+                self.errors.append(f"{sid}: période invalide -> {raw_b} / {raw_e}")
+                continue
+
+            defaults = dict(
+                country=country,
+                extract_date=xdate,
+                source_filename=self.filename,
+                row_fingerprint=fingerprint,
+                # stockage long : mesures dans PQMeasurement, colonnes laissées vides
+                **(dict.fromkeys(values) if long else values),
+            )
+
+            report, _ = PQReport.objects.update_or_create(
+                site=site, begin_period=b, end_period=e, defaults=defaults
+            )
+            if long:
+                measured.append((report, values))
+            self.written += 1
+
+        write_measures(measured)
+
+    def result(self):
+        return {
+            "upserted": self.written,
+            "created": self.created,
+            "unchanged": self.unchanged,
+            "errors": self.errors,
+            "unmapped_fields": self.unmapped,  # utile pour voir ce qui manque, peut être retiré
+        }
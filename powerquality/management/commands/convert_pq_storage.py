@@ -0,0 +1,25 @@
+# powerquality/management/commands/convert_pq_storage.py
+"""
+Bascule les mesures PQ existantes entre colonnes de PQReport et table PQMeasurement.
+
+    python manage.py convert_pq_storage long     # puis PQ_MEASURE_STORAGE=long
+    python manage.py convert_pq_storage wide     # retour arrière (PQ_MEASURE_STORAGE=wide)
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from powerquality.measures import convert
+
+
+class Command(BaseCommand):
+    help = "Convertit les mesures PQ vers le stockage long (PQMeasurement) ou large (colonnes PQReport)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("to", choices=["long", "wide"])
+        parser.add_argument("--batch", type=int, default=2000, help="Rapports par transaction (défaut : 2000).")
+
+    def handle(self, *args, **opts):
+        n = convert(opts["to"], batch_size=opts["batch"])
+        self.stdout.write(self.style.SUCCESS(f"{n} rapport(s) convertis vers le stockage {opts['to']}."))
+        if settings.PQ_MEASURE_STORAGE != opts["to"]:
+            self.stdout.write(self.style.WARNING(f"Pensez à définir PQ_MEASURE_STORAGE={opts['to']}."))
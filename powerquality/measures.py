@@ -0,0 +1,150 @@
+# powerquality/measures.py
+"""
+Stockage des mesures PQ en format long (PQMeasurement) plutôt qu'en colonnes.
+
+    PQ_MEASURE_STORAGE = "wide"   ~70 colonnes de PQReport (défaut)
+    PQ_MEASURE_STORAGE = "long"   une ligne PQMeasurement par valeur présente,
+                                  colonnes de mesure de PQReport laissées NULL
+
+Chaque colonne correspond à un canal (bloc, grandeur, phase, statistique) :
+    tri_vmin_u1_v         -> ("tri", "voltage", "u1", "min")
+    mono_total_energy_kwh -> ("mono", "energy", "", "total")
+
+La forme de l'API ne change pas : les valeurs sont replacées sur les instances
+(attach_measures) ou les lignes (measure_rows) avant sérialisation et export.
+`manage.py convert_pq_storage long|wide` bascule les données existantes.
+"""
+import re
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import PQMeasurement, PQReport
+
+
+QUANTITIES = {"v": "voltage", "i": "current", "p": "power"}
+_STAT_RE = re.compile(r"(mono|tri2|tri)_([vip])(min|avg|max)(?:_([ui]\d))?_(?:v|a|kw)")
+_ENERGY_RE = re.compile(r"(mono|tri2|tri)_(?:(total|active|reactive|apparent)_energy|energy_(consumed))_(?:kwh|kvarh|kvah)")
+
+
+def _channel(name):
+    m = _STAT_RE.fullmatch(name)
+    if m:
+        block, quantity, stat, phase = m.groups()
+        return block, QUANTITIES[quantity], phase or "", stat
+    m = _ENERGY_RE.fullmatch(name)
+    if m:
+        block, stat, consumed = m.groups()
+        return block, "energy", "", stat or consumed
+    return None
+
+
+# colonne de PQReport -> canal, et inverse
+CHANNELS = {
+    f.name: _channel(f.name) for f in PQReport._meta.concrete_fields if _channel(f.name)
+}
+FIELDS = {channel: name for name, channel in CHANNELS.items()}
+
+
+def long_storage():
+    return settings.PQ_MEASURE_STORAGE == "long"
+
+
+def _decimal(value):
+    # même type que les colonnes DecimalField(16, 6)
+    return None if value is None else round(Decimal(repr(value)), 6)
+
+
+def write_measures(reports):
+    """
+    reports = [(PQReport enregistré, {colonne: valeur})] : remplace les mesures
+    de ces rapports (les canaux absents du fichier disparaissent).
+    """
+    if not reports:
+        return 0
+    PQMeasurement.objects.filter(report__in=[r.pk for r, _ in reports]).delete()
+    objs = [
+        PQMeasurement(
+            report_id=report.pk, site_id=report.site_id, begin_period=report.begin_period,
+            block=block, quantity=quantity, phase=phase, stat=stat, value=float(value),
+        )
+        for report, values in reports
+        for name, value in values.items()
+        if value is not None and name in CHANNELS
+        for block, quantity, phase, stat in [CHANNELS[name]]
+    ]
+    PQMeasurement.objects.bulk_create(objs, batch_size=settings.IMPORT_CHUNK_SIZE)
+    return len(objs)
+
+
+def measure_rows(report_ids, fields=None):
+    """{report_id: {colonne: Decimal}} pour ces rapports (fields : colonnes voulues, défaut toutes)."""
+    qs = PQMeasurement.objects.filter(report__in=report_ids)
+    if fields is not None:
+        wanted = [CHANNELS[f] for f in fields if f in CHANNELS]
+        if not wanted:
+            return {}
+        qs = qs.filter(block__in={c[0] for c in wanted}, quantity__in={c[1] for c in wanted})
+    rows = {}
+    for report_id, *channel, value in qs.values_list("report_id", "block", "quantity", "phase", "stat", "value"):
+        name = FIELDS.get(tuple(channel))
+        if name and (fields is None or name in fields):
+            rows.setdefault(report_id, {})[name] = _decimal(value)
+    return rows
+
+
+def attach_measures(reports, fields=None):
+    """Replace sur les instances les valeurs lues dans PQMeasurement (None si absentes)."""
+    names = [f for f in (CHANNELS if fields is None else fields) if f in CHANNELS]
+    measures = measure_rows([r.pk for r in reports], names)
+    for report in reports:
+        values = measures.get(report.pk, {})
+        for name in names:
+            setattr(report, name, values.get(name))
+    return reports
+
+
+def series(site_ids, field, start=None, end=None):
+    """[(site_id, begin_period, valeur)] d'une colonne, quel que soit le stockage."""
+    if long_storage():
+        block, quantity, phase, stat = CHANNELS[field]
+        qs = PQMeasurement.objects.filter(block=block, quantity=quantity, phase=phase, stat=stat)
+        value = "value"
+    else:
+        qs = PQReport.objects.filter(**{f"{field}__isnull": False})
+        value = field
+    qs = qs.filter(site_id__in=site_ids)
+    if start:
+        qs = qs.filter(begin_period__gte=start)
+    if end:
+        qs = qs.filter(begin_period__lt=end)
+    return [
+        (site_id, begin, _decimal(v) if long_storage() else v)
+        for site_id, begin, v in qs.order_by("site_id", "begin_period").values_list("site_id", "begin_period", value)
+    ]
+
+
+def convert(to, batch_size=2000):
+    """Bascule les rapports existants vers le stockage `to` ("long" / "wide"), par lots. Retourne le nb de rapports."""
+    names = list(CHANNELS)
+    done, last = 0, 0
+    while True:
+        with transaction.atomic():
+            reports = list(PQReport.objects.filter(pk__gt=last).order_by("pk")[:batch_size])
+            if not reports:
+                return done
+            ids = [r.pk for r in reports]
+            if to == "long":
+                write_measures([(r, {n: getattr(r, n) for n in names}) for r in reports])
+                PQReport.objects.filter(pk__in=ids).update(**dict.fromkeys(names))
+            else:
+                measures = measure_rows(ids)
+                for r in reports:
+                    values = measures.get(r.pk, {})
+                    for n in names:
+                        setattr(r, n, values.get(n, getattr(r, n)))
+                PQReport.objects.bulk_update(reports, names)
+                PQMeasurement.objects.filter(report__in=ids).delete()
+        done += len(reports)
+        last = ids[-1]
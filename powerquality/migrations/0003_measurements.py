@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0003_alter_siteenergymonthlystat_pwc_availability_pct_and_more'),
+        ('powerquality', '0002_row_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PQMeasurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('begin_period', models.DateTimeField()),
+                ('block', models.CharField(choices=[('mono', 'MonoPhase'), ('tri', 'TriPhase'), ('tri2', 'TriPhase 2')], max_length=4)),
+                ('quantity', models.CharField(choices=[('voltage', 'V'), ('current', 'A'), ('power', 'kW'), ('energy', 'Énergie')], max_length=8)),
+                ('phase', models.CharField(blank=True, default='', max_length=2)),
+                ('stat', models.CharField(choices=[('min', 'Min'), ('avg', 'Moyenne'), ('max', 'Max'), ('total', 'Totale'), ('consumed', 'Consommée'), ('active', 'Active'), ('reactive', 'Réactive'), ('apparent', 'Apparente')], max_length=8)),
+                ('value', models.FloatField()),
+                ('report', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='measurements', to='powerquality.pqreport')),
+                ('site', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='energy.site')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['site', 'block', 'quantity', 'phase', 'stat', 'begin_period'], include=('value',), name='pq_measurement_series')],
+                'constraints': [models.UniqueConstraint(fields=('report', 'block', 'quantity', 'phase', 'stat'), name='uniq_pq_measurement')],
+            },
+        ),
+    ]
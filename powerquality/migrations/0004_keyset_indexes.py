@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0004_keyset_indexes'),
+        ('powerquality', '0003_measurements'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pqreport',
+            index=models.Index(fields=['-begin_period', 'site', 'id'], name='powerqualit_begin_p_67e4bc_idx'),
+        ),
+    ]
@@ -60,6 +60,7 @@ class PQReport(models.Model):
     # traces
     source_filename = models.CharField(max_length=255, blank=True, default="")
     imported_at     = models.DateTimeField(auto_now_add=True)
+    row_fingerprint = models.BigIntegerField(null=True, blank=True, editable=False)  # empreinte des valeurs importées
 
     class Meta:
         unique_together = ("site", "begin_period", "end_period")
@@ -68,8 +69,50 @@ class PQReport(models.Model):
             models.Index(fields=["end_period"]),
             models.Index(fields=["site", "begin_period"]),
             models.Index(fields=["country", "begin_period"]),
+            # pagination par curseur (-begin_period, site, id)
+            models.Index(fields=["-begin_period", "site", "id"]),
         ]
         ordering = ["-begin_period", "site__site_id"]
 
     def __str__(self):
         return f"{self.site.site_id} {self.begin_period:%Y-%m-%d}→{self.end_period:%Y-%m-%d}"
+
+
+class PQMeasurement(models.Model):
+    """
+    Mesure d'un rapport en format long (PQ_MEASURE_STORAGE = "long", voir
+    powerquality.measures) : une ligne par valeur présente, aucune colonne NULL.
+    site / begin_period sont recopiés du rapport : une série (site, grandeur)
+    se lit dans l'index seul (valeur incluse).
+    """
+    BLOCKS = [("mono", "MonoPhase"), ("tri", "TriPhase"), ("tri2", "TriPhase 2")]
+    QUANTITIES = [("voltage", "V"), ("current", "A"), ("power", "kW"), ("energy", "Énergie")]
+    STATS = [
+        ("min", "Min"), ("avg", "Moyenne"), ("max", "Max"),
+        ("total", "Totale"), ("consumed", "Consommée"),
+        ("active", "Active"), ("reactive", "Réactive"), ("apparent", "Apparente"),
+    ]
+
+    report   = models.ForeignKey(PQReport, on_delete=models.CASCADE, related_name="measurements", db_index=False)
+    site     = models.ForeignKey(Site, on_delete=models.CASCADE, related_name="+", db_index=False)
+    begin_period = models.DateTimeField()
+    block    = models.CharField(max_length=4, choices=BLOCKS)
+    quantity = models.CharField(max_length=8, choices=QUANTITIES)
+    phase    = models.CharField(max_length=2, blank=True, default="")  # u1..u3 / i1..i3, "" = global
+    stat     = models.CharField(max_length=8, choices=STATS)
+    value    = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["report", "block", "quantity", "phase", "stat"], name="uniq_pq_measurement"),
+        ]
+        indexes = [
+            # séries par site et grandeur (PostgreSQL : index-only scan grâce à INCLUDE)
+            models.Index(
+                fields=["site", "block", "quantity", "phase", "stat", "begin_period"],
+                include=["value"], name="pq_measurement_series",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.report_id} {self.block} {self.quantity} {self.phase} {self.stat} = {self.value}"
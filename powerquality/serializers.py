@@ -3,6 +3,20 @@ from energy.models import Country, Site
 from powerquality.models import PQReport
 
 
+# Champs toujours servis (identification de la ligne) ; le reste est sélectionnable
+BASE_FIELDS = ["id", "site", "country", "begin_period", "end_period"]
+# Colonnes internes à l'import, jamais servies
+INTERNAL_FIELDS = ["row_fingerprint"]
+SELECTABLE_FIELDS = [
+    f.name for f in PQReport._meta.concrete_fields if f.name not in BASE_FIELDS + INTERNAL_FIELDS
+]
+# Blocs de mesures (?group=mono|tri|tri2)
+MEASURE_GROUPS = {
+    group: [name for name in SELECTABLE_FIELDS if name.startswith(group + "_")]
+    for group in ("mono", "tri", "tri2")
+}
+
+
 class CountryRefSerializer(serializers.ModelSerializer):
     class Meta:
         model = Country
@@ -18,8 +32,15 @@ class SiteRefSerializer(serializers.ModelSerializer):
 
 
 class PQReportSerializer(serializers.ModelSerializer):
+    """fields=[...] : restreint la sortie à ces champs (voir PQReportViewSet, ?fields= / ?group=)."""
     site = SiteRefSerializer(read_only=True)
 
     class Meta:
         model = PQReport
-        fields = "__all__"
+        exclude = INTERNAL_FIELDS
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
@@ -1,3 +1,62 @@
-from django.test import TestCase
+import datetime
+import io
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from energy.models import Country, Site
+from powerquality import measures
+from powerquality.models import PQMeasurement, PQReport
+
+
+UTC = datetime.timezone.utc
+
+
+class ConvertStorageTests(TestCase):
+    def setUp(self):
+        country = Country.objects.create(name="Senegal")
+        self.sites = [Site.objects.create(site_id=f"S{i}", site_name=f"S{i}", country=country) for i in range(2)]
+        t0 = datetime.datetime(2025, 8, 1, tzinfo=UTC)
+        for n in range(5):
+            begin = t0 + datetime.timedelta(days=n)
+            PQReport.objects.create(
+                country=country, site=self.sites[n % 2], begin_period=begin, end_period=begin + datetime.timedelta(days=1),
+                mono_vmin_v=Decimal("210.5") + n, mono_vavg_v=Decimal("229.123456"), mono_energy_consumed_kwh=Decimal(n),
+                tri_vmax_u2_v=Decimal("-0.000001") if n == 3 else None, tri2_reactive_energy_kvarh=Decimal("98765.4321"),
+            )
+        self.wide = self.snapshot()
+
+    def snapshot(self):
+        return {r.pk: {name: getattr(r, name) for name in measures.CHANNELS} for r in PQReport.objects.all()}
+
+    def convert(self, to):
+        out = io.StringIO()
+        call_command("convert_pq_storage", to, batch=2, stdout=out)
+        return out.getvalue()
+
+    def test_round_trip(self):
+        present = sum(v is not None for values in self.wide.values() for v in values.values())
+        self.assertIn("5 rapport(s) convertis vers le stockage long", self.convert("long"))
+
+        self.assertEqual(PQMeasurement.objects.count(), present)
+        self.assertTrue(all(v is None for values in self.snapshot().values() for v in values.values()))
+        long_values = measures.measure_rows(list(self.wide))
+        self.assertEqual(
+            long_values,
+            {pk: {k: v for k, v in values.items() if v is not None} for pk, values in self.wide.items()},
+        )
+
+        self.convert("wide")
+        self.assertEqual(self.snapshot(), self.wide)
+        self.assertFalse(PQMeasurement.objects.exists())
+
+    def test_series_is_the_same_in_both_storages(self):
+        site_ids = [s.pk for s in self.sites]
+        for field in ("mono_vmin_v", "tri_vmax_u2_v", "tri2_reactive_energy_kvarh"):
+            with override_settings(PQ_MEASURE_STORAGE="wide"):
+                wide = measures.series(site_ids, field)
+            self.convert("long")
+            with override_settings(PQ_MEASURE_STORAGE="long"):
+                self.assertEqual(measures.series(site_ids, field), wide, field)
+            self.convert("wide")
@@ -1,80 +1,76 @@
 # powerquality/views.py
-import math
-import re
-import pandas as pd
-from dateutil.parser import parse as parse_date
+import datetime
 
-from django.db import transaction
 from django.db.models import Q
-from rest_framework import viewsets, status
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 
-from energy.models import Country, Site
+from energy.models import Site
+from enertrack_backend.exports import ExportMixin, model_fields
+from enertrack_backend.pagination import KeysetPagination, StreamAllMixin
+from ingestion.views import ImportViewMixin
+from powerquality.importers import PQImporter
+from powerquality.measures import CHANNELS, attach_measures, long_storage, measure_rows, series as measure_series
 from powerquality.models import PQReport
-from powerquality.serializers import PQReportSerializer
+from powerquality.serializers import BASE_FIELDS, MEASURE_GROUPS, SELECTABLE_FIELDS, PQReportSerializer
 
 
-# -----------------------------
-# Helpers
-# -----------------------------
-def _norm(s: str) -> str:
-    """Normalise un libellé de colonne (retire unités [..], accents,
-    ponctuation, espaces multiples)."""
-    s = str(s or "")
-    s = s.lower()
-    s = re.sub(r"\[[^\]]+\]", "", s)         # retire [unités]
-    s = s.replace("°", "")
-    s = re.sub(r"[^a-z0-9]+", " ", s)
-    return re.sub(r"\s+", " ", s).strip()
+# Colonnes fixes du format compact : (en-tête, lookup values())
+COMPACT_COLUMNS = [
+    ("id", "pk"), ("site_id", "site__site_id"), ("site_name", "site__site_name"),
+    ("country", "country__name"), ("begin_period", "begin_period"), ("end_period", "end_period"),
+]
+# Colonnes lues pour le serializer restreint (site imbriqué, tri de la pagination)
+ONLY_FIELDS = ["site__site_id", "site__site_name", "site__country__name", "country", "begin_period", "end_period"]
 
 
-def to_none(v):
-    """Convertit codes 'N/A', 'No Last Value', vide, NaN en None."""
-    if v is None:
-        return None
-    s = str(v).strip().upper()
-    if s in {
-        "N/A", "NA", "N A", "N A.", "N A/", "N/A/", "",
-        "NO LAST VALUE", "N A N", "NAN"
-    }:
-        return None
-    return v
+def _split(value):
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
 
 
-def num(v, decimals=6):
-    """Parse nombre tolérant (virgules, N/A)."""
-    v = to_none(v)
-    if v is None or (isinstance(v, float) and math.isnan(v)):
-        return None
+def _instant(value, name):
+    """'2025-08-01' ou '2025-08-01T10:00[:00][+00:00]' -> datetime aware (comme rectifiers.views)."""
     try:
-        return round(float(str(v).replace(",", "")), decimals)
-    except Exception:
-        return None
+        dt = parse_datetime(value)
+        if dt is None:
+            d = parse_date(value)
+            dt = d and datetime.datetime.combine(d, datetime.time.min)
+    except ValueError:
+        dt = None
+    if dt is None:
+        raise ValidationError({"detail": f"{name} attendu au format AAAA-MM-JJ[THH:MM]"})
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
 
 
-def dt(v):
-    """Parse date/jour-mois-année tolérant."""
-    v = to_none(v)
-    if v is None:
-        return None
-    try:
-        return parse_date(str(v), dayfirst=True)
-    except Exception:
-        return None
+def _columns(fields):
+    """Colonnes de PQReport à lire : en stockage long, les mesures viennent de PQMeasurement."""
+    return [f for f in fields if f not in CHANNELS] if long_storage() else list(fields)
 
 
 # -----------------------------
 # ViewSet
 # -----------------------------
-class PQReportViewSet(viewsets.ReadOnlyModelViewSet):
+class PQReportViewSet(ExportMixin, StreamAllMixin, ImportViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     GET  /api/pq/?q=&site_id=&country=&date_from=&date_to=
+    GET  /api/pq/?group=mono|tri|tri2&fields=extract_date,...   (colonnes de mesure servies, cumulables)
+    GET  /api/pq/?layout=compact  -> {"next", "columns": [...], "rows": [[...], ...]}
+    GET  /api/pq/series/?site_id=A,B&field=tri_vmin_u1_v&date_from=&date_to=
+    GET  /api/pq/export/?output=csv|ndjson  (mêmes filtres, en flux)
     POST /api/pq/import/ (file=.xlsx/.csv)
+    POST /api/pq/import-async/ (idem, en tâche de fond -> task_id)
     """
     queryset = PQReport.objects.select_related("site", "site__country", "country")
     serializer_class = PQReportSerializer
+    pagination_class = KeysetPagination
+    export_name = "pq"
+    export_fields = [("site_id", "site__site_id"), ("site_name", "site__site_name"), ("country", "country__name"), *model_fields(PQReport, exclude=["site", "country"])]
+    importer_class = PQImporter
     parser_classes = [MultiPartParser]
 
     def get_queryset(self):
@@ -97,233 +93,100 @@ class PQReportViewSet(viewsets.ReadOnlyModelViewSet):
         if p.get("date_to"):
             qs = qs.filter(end_period__lte=p["date_to"])
 
-        return qs.order_by("-begin_period", "site__site_id")
-
-    @action(detail=False, methods=["post"], url_path="import", parser_classes=[MultiPartParser])
-    def import_file(self, request):
-        f = request.FILES.get("file")
-        if not f:
-            return Response({"detail": "file is required"}, status=400)
-
-        # --- Lecture brute
-        try:
-            if f.name.lower().endswith((".xlsx", ".xls")):
-                df_raw = pd.read_excel(f, header=None, engine="openpyxl")
-            else:
-                df_raw = pd.read_csv(f, header=None, sep=None, engine="python")
-        except Exception as e:
-            return Response({"detail": f"Read error: {e}"}, status=400)
-
-        # --- Trouver la ligne qui contient "Country / Site ID / Begin Period"
-        header_idx = None
-        scan_max = min(35, len(df_raw))
-        for i in range(scan_max):
-            row_norm = [_norm(x) for x in df_raw.iloc[i].astype(str).tolist()]
-            if "country" in row_norm and "site id" in row_norm and (
-                "begin period 00h00" in row_norm or "begin period" in row_norm
-            ):
-                header_idx = i
-                break
-
-        if header_idx is None:
-            return Response(
-                {"detail": "Entête introuvable (Country / Site ID / Begin Period)."},
-                status=400,
-            )
-
-        # --- Construit colonnes à partir de 2 lignes d'en-tête
-        dfb = df_raw.iloc[header_idx:].reset_index(drop=True)
-        # Lignes 0 et 1 = en-têtes (groupe & libellés)
-        h0 = dfb.iloc[0].astype(str).replace({"nan": "", "None": ""}).str.strip()
-        h1 = dfb.iloc[1].astype(str).replace({"nan": "", "None": ""}).str.strip()
-
-        # Propage 'MonoPhase' / 'TriPhase' / 'TriPhase 2' vers la droite
-        group = h0.replace("", pd.NA).fillna(method="ffill")
-
-        # Concat groupe + sous-libellé → "monophase vavg v", "triphase active energy consumed kwh", ...
-        combined = (group + " " + h1).str.strip()
-        combined = combined.where(combined != "", h1)
-        combined = combined.fillna("")
-
-        # Données
-        df = dfb.iloc[2:].copy()  # saute les 2 lignes d’en-tête
-        df.columns = [str(c) for c in combined]
-        df = df.where(pd.notna(df), None)
-
-        # Mapping robuste
-        ncols = {c: _norm(c) for c in df.columns}
-
-        def col_like(*cands):
-            """Match exact normalisé; sinon fallback 'contains all tokens'."""
-            # exact
-            for real, normed in ncols.items():
-                for cand in cands:
-                    if normed == cand:
-                        return real
-            # contains all tokens
-            for real, normed in ncols.items():
-                for cand in cands:
-                    toks = cand.split()
-                    if all(t in normed for t in toks):
-                        return real
-            return None
-
-        # Colonnes clefs
-        C_COUNTRY = col_like("country")
-        C_SITEID = col_like("site id")
-        C_BEGIN = col_like("begin period 00h00", "begin period")
-        C_END = col_like("end period 23h59", "end period")
-        C_EXTRACT = col_like("extract date")
-
-        # Mono
-        M = {
-            "mono_vmin_v":               col_like("monophase vmin v"),
-            "mono_vavg_v":               col_like("monophase vavg v"),
-            "mono_vmax_v":               col_like("monophase vmax v"),
-            "mono_imin_a":               col_like("monophase imin a"),
-            "mono_iavg_a":               col_like("monophase iavg a"),
-            "mono_imax_a":               col_like("monophase imax a"),
-            "mono_pmin_kw":              col_like("monophase pmin kw"),
-            "mono_pavg_kw":              col_like("monophase pavg kw"),
-            "mono_pmax_kw":              col_like("monophase pmax kw"),
-            "mono_total_energy_kwh":     col_like("monophase total energy kwh"),
-            "mono_energy_consumed_kwh":  col_like("monophase energy consumed kwh"),
-        }
-
-        # Tri (synonymes pour 'consumed/produced')
-        T = dict(
-            tri_vmin_u1_v = col_like("triphase vmin u1 v"),
-            tri_vavg_u1_v = col_like("triphase vavg u1 v"),
-            tri_vmax_u1_v = col_like("triphase vmax u1 v"),
-            tri_vmin_u2_v = col_like("triphase vmin u2 v"),
-            tri_vavg_u2_v = col_like("triphase vavg u2 v"),
-            tri_vmax_u2_v = col_like("triphase vmax u2 v"),
-            tri_vmin_u3_v = col_like("triphase vmin u3 v"),
-            tri_vavg_u3_v = col_like("triphase vavg u3 v"),
-            tri_vmax_u3_v = col_like("triphase vmax u3 v"),
-            tri_imin_i1_a = col_like("triphase imin i1 a"),
-            tri_iavg_i1_a = col_like("triphase iavg i1 a"),
-            tri_imax_i1_a = col_like("triphase imax i1 a"),
-            tri_imin_i2_a = col_like("triphase imin i2 a"),
-            tri_iavg_i2_a = col_like("triphase iavg i2 a"),
-            tri_imax_i2_a = col_like("triphase imax i2 a"),
-            tri_imin_i3_a = col_like("triphase imin i3 a"),
-            tri_iavg_i3_a = col_like("triphase iavg i3 a"),
-            tri_imax_i3_a = col_like("triphase imax i3 a"),
-            tri_pmin_kw   = col_like("triphase pmin kw"),
-            tri_pavg_kw   = col_like("triphase pavg kw"),
-            tri_pmax_kw   = col_like("triphase pmax kw"),
-            tri_total_energy_kwh      = col_like("triphase total energy kwh"),
-            tri_active_energy_kwh     = col_like(
-                "triphase active energy consumed kwh",
-                "triphase active energy kwh"),
-            tri_reactive_energy_kvarh = col_like(
-                "triphase reactive energy consumed kvarh",
-                "triphase reactive energy kvarh"),
-            tri_apparent_energy_kvah  = col_like(
-                "triphase apparent energy produced kvah",
-                "triphase apparent energy kvah"),
-        )
-
-        # Tri 2
-        T2 = dict(
-            tri2_vmin_u1_v = col_like("triphase 2 vmin u1 v"),
-            tri2_vavg_u1_v = col_like("triphase 2 vavg u1 v"),
-            tri2_vmax_u1_v = col_like("triphase 2 vmax u1 v"),
-            tri2_vmin_u2_v = col_like("triphase 2 vmin u2 v"),
-            tri2_vavg_u2_v = col_like("triphase 2 vavg u2 v"),
-            tri2_vmax_u2_v = col_like("triphase 2 vmax u2 v"),
-            tri2_vmin_u3_v = col_like("triphase 2 vmin u3 v"),
-            tri2_vavg_u3_v = col_like("triphase 2 vavg u3 v"),
-            tri2_vmax_u3_v = col_like("triphase 2 vmax u3 v"),
-            tri2_imin_i1_a = col_like("triphase 2 imin i1 a"),
-            tri2_iavg_i1_a = col_like("triphase 2 iavg i1 a"),
-            tri2_imax_i1_a = col_like("triphase 2 imax i1 a"),
-            tri2_imin_i2_a = col_like("triphase 2 imin i2 a"),
-            tri2_iavg_i2_a = col_like("triphase 2 iavg i2 a"),
-            tri2_imax_i2_a = col_like("triphase 2 imax i2 a"),
-            tri2_imin_i3_a = col_like("triphase 2 imin i3 a"),
-            tri2_iavg_i3_a = col_like("triphase 2 iavg i3 a"),
-            tri2_imax_i3_a = col_like("triphase 2 imax i3 a"),
-            tri2_pmin_kw   = col_like("triphase 2 pmin kw"),
-            tri2_pavg_kw   = col_like("triphase 2 pavg kw"),
-            tri2_pmax_kw   = col_like("triphase 2 pmax kw"),
-            tri2_total_energy_kwh      = col_like("triphase 2 total energy kwh"),
-            tri2_active_energy_kwh     = col_like(
-                "triphase 2 active energy consumed kwh",
-                "triphase 2 active energy kwh"),
-            tri2_reactive_energy_kvarh = col_like(
-                "triphase 2 reactive energy consumed kvarh",
-                "triphase 2 reactive energy kvarh"),
-            tri2_apparent_energy_kvah  = col_like(
-                "triphase 2 apparent energy produced kvah",
-                "triphase 2 apparent energy kvah"),
-        )
-
-        # Optionnel: log des colonnes non mappées (utile pour débogage)
-        unmapped = [k for k, v in {**M, **T, **T2}.items() if v is None]
-        # print("Unmapped fields:", unmapped)
-
-        created = 0
-        upserted = 0
-        errors = []
-
-        with transaction.atomic():
-            for _, row in df.iterrows():
-                sid = (row.get(C_SITEID) or "").strip()
-                if not sid:
-                    continue
-
-                country_name = (
-                    (row.get(C_COUNTRY) or "").strip()
-                    or getattr(getattr(request, "user", None), "pays", None)
-                    or "Unknown"
-                )
-                country, _ = Country.objects.get_or_create(name=country_name)
-
-                site, _ = Site.objects.get_or_create(
-                    site_id=sid, defaults={"country": country, "site_name": sid}
-                )
-                if site.country_id != country.id:
-                    site.country = country
-                    site.save()
-
-                b = dt(row.get(C_BEGIN))
-                e = dt(row.get(C_END))
-                if not b or not e:
-                    errors.append(
-                        f"{sid}: période invalide -> {row.get(C_BEGIN)} / {row.get(C_END)}"
-                    )
-                    continue
-                xdate = dt(row.get(C_EXTRACT))
-
-                defaults = dict(
-                    country=country,
-                    extract_date=xdate,
-                    source_filename=f.name,
-                )
-
-                # Mono
-                for field, col in M.items():
-                    defaults[field] = num(row.get(col)) if col else None
-                # Tri
-                for field, col in T.items():
-                    defaults[field] = num(row.get(col)) if col else None
-                # Tri 2
-                for field, col in T2.items():
-                    defaults[field] = num(row.get(col)) if col else None
-
-                PQReport.objects.update_or_create(
-                    site=site, begin_period=b, end_period=e, defaults=defaults
-                )
-                upserted += 1
-
-        return Response(
-            {
-                "upserted": upserted,
-                "created": created,
-                "errors": errors,
-                "unmapped_fields": unmapped,  # utile pour voir ce qui manque, peut être retiré
-            },
-            status=status.HTTP_201_CREATED if upserted else status.HTTP_200_OK,
-        )
+        # tri sur colonnes locales : même ordre que l'index de pagination (Meta.indexes)
+        qs = qs.order_by("-begin_period", "site_id")
+        selection = self.get_field_selection()
+        if self.action == "list" and not self.is_compact():
+            if selection is not None:
+                # seules les colonnes servies sont lues (le pays de la ligne est servi par son id)
+                qs = qs.select_related(None).select_related("site__country").only(*ONLY_FIELDS, *_columns(selection))
+            elif long_storage():
+                qs = qs.defer(*CHANNELS)
+        return qs
+
+    def get_field_selection(self):
+        """Champs hors BASE_FIELDS demandés par ?group= / ?fields= (None : tous)."""
+        if not hasattr(self, "_selection"):
+            p = self.request.query_params
+            groups, fields = _split(p.get("group")), _split(p.get("fields"))
+            unknown = [g for g in groups if g not in MEASURE_GROUPS]
+            if unknown:
+                raise ValidationError({"detail": f"group doit valoir : {', '.join(MEASURE_GROUPS)}"})
+            unknown = [f for f in fields if f not in SELECTABLE_FIELDS and f not in BASE_FIELDS]
+            if unknown:
+                raise ValidationError({"detail": f"Champ(s) inconnu(s) : {', '.join(unknown)}"})
+            selection = [name for g in groups for name in MEASURE_GROUPS[g]] + [f for f in fields if f in SELECTABLE_FIELDS]
+            self._selection = list(dict.fromkeys(selection)) if groups or fields else None
+        return self._selection
+
+    def is_compact(self):
+        return self.request.query_params.get("layout") == "compact"
+
+    def get_serializer(self, *args, **kwargs):
+        selection = self.get_field_selection()
+        if selection is not None:
+            kwargs.setdefault("fields", BASE_FIELDS + selection)
+        if args and long_storage():
+            # page, paquet (?all=1) ou instance seule : une requête PQMeasurement
+            attach_measures(list(args[0]) if kwargs.get("many") else [args[0]], selection)
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_compact():
+            return super().list(request, *args, **kwargs)
+        # tableau de tableaux lu par values() : ni instances ni serializer ;
+        # mesures en nombres JSON (et non en texte comme dans le format par défaut)
+        selection = self.get_field_selection()
+        columns = COMPACT_COLUMNS + [(name, name) for name in (selection if selection is not None else SELECTABLE_FIELDS)]
+        # + site_id : clé de tri de la pagination
+        lookups = _columns(lookup for _, lookup in columns) + ["site_id"]
+        qs = self.filter_queryset(self.get_queryset()).values(*dict.fromkeys(lookups))
+        page = self.paginate_queryset(qs)
+        if long_storage():
+            measures = measure_rows([row["pk"] for row in page], [name for name, _ in columns])
+            page = [{**row, **measures.get(row["pk"], {})} for row in page]
+        return Response({
+            "next": self.paginator.get_next_link(),
+            "columns": [header for header, _ in columns],
+            "rows": [[row.get(lookup) for _, lookup in columns] for row in page],
+        })
+
+    def export_rows(self, qs, lookups):
+        if not long_storage():
+            return super().export_rows(qs, lookups)
+        return self._long_rows(qs, lookups)
+
+    def _long_rows(self, qs, lookups):
+        read = ["pk", *_columns(lookups)]
+        for batch in self._batches(super().export_rows(qs, read)):
+            measures = measure_rows([row[0] for row in batch], lookups)
+            for row in batch:
+                values = {**dict(zip(read, row)), **measures.get(row[0], {})}
+                yield tuple(values.get(lookup) for lookup in lookups)
+
+    @action(detail=False, methods=["get"], url_path="series")
+    def series(self, request):
+        """Série d'une colonne de mesure par site : {"field", "series": [{"site_id", "points": [[début, valeur]]}]}."""
+        p = request.query_params
+        field = p.get("field")
+        if field not in CHANNELS:
+            return Response({"detail": "field doit être une colonne de mesure (ex. tri_vmin_u1_v)"}, status=400)
+        site_ids = _split(p.get("site_id"))
+        if not site_ids:
+            return Response({"detail": "site_id is required"}, status=400)
+
+        sites = Site.objects.filter(site_id__in=site_ids)
+        user = getattr(request, "user", None)
+        if user and getattr(user, "pays", None):
+            sites = sites.filter(country__name=user.pays)
+        start = _instant(p["date_from"], "date_from") if p.get("date_from") else None
+        end = _instant(p["date_to"], "date_to") if p.get("date_to") else None
+        codes = dict(sites.values_list("pk", "site_id"))
+
+        points = {}
+        for site_pk, begin, value in measure_series(list(codes), field, start, end):
+            points.setdefault(site_pk, []).append([begin, value])
+        return Response({
+            "field": field,
+            "series": [{"site_id": codes[pk], "points": pts} for pk, pts in points.items()],
+        })
@@ -0,0 +1,229 @@
+# pwmreport/importers.py
+import re
+from functools import partial
+
+import pandas as pd
+from dateutil.parser import parse as parse_date
+
+from energy.models import Country
+from energy.services import resolve_sites
+from ingestion import cleaning
+from ingestion.headers import HeaderSpec, normalize
+from ingestion.importers import BaseImporter
+from .models import PwmReport
+
+
+# champ -> libellés normalisés acceptés (compilé une fois)
+HEADER = HeaderSpec({
+    "site_id": ["site id"],
+    "site_name": ["site name"],
+    "site_class": ["site class"],
+    "grid_status": ["grid"],
+    "dg_status": ["dg"],
+    "solar_status": ["solar"],
+    "typology_power_w": ["typology power w"],
+    "grid_act_pwm_avg_w": ["grid act pwm average power w"],
+    "total_pwm_min_w": ["total pwm minimum power"],
+    "total_pwm_avg_w": ["total pwm average power"],
+    "total_pwm_max_w": ["total pwm maximum power"],
+    "total_pwc_avg_load_w": ["total pwc average load power"],
+    "dc_pwm_avg_uptime_pct": ["dc pwm average up time", "dc pwm average up time pct"],
+    "pwc_uptime_pct": ["pwc up time", "pwc up time pct"],
+    "router_uptime_pct": ["router up time", "router up time pct"],
+    "typology_load_vs_pwm_real_load_pct": ["typology load power vs pwm real load power"],
+    "grid_availability_pct": ["grid availability"],
+    "number_grid_cuts": ["number of grid cuts cuts", "number of grid cuts"],
+    "total_grid_cuts_minutes": ["total grid cuts duration hh mm", "total grid cuts duration"],
+    # DC1..DC12
+    **{f"dc{k}_pwm_avg_w": [f"dc{k} pwm average power"] for k in range(1, 13)},
+})
+DC_FIELDS = [f"dc{k}_pwm_avg_w" for k in range(1, 13)]
+# colonnes réécrites quand le rapport (site, période) existe déjà
+UPDATE_FIELDS = [
+    "country", "report_date", "source_filename", "row_fingerprint", "site_name",
+    *[field for field in HEADER.fields if field not in ("site_id", "site_name")],
+]
+
+def to_none(v):
+    if v is None: return None
+    s = str(v).strip().upper()
+    if s in {"NI", "NM", "NC", "N/A", "NA", "N A", "NO LAST VALUE", "", "NAN"}:
+        return None
+    return v
+
+def dmy(v):
+    v = to_none(v)
+    if v is None: return None
+    try:
+        # dans vos fichiers: 01-09-2024 etc.
+        return parse_date(str(v), dayfirst=True)
+    except Exception:
+        return None
+
+def _report_date_in(text):
+    m = re.search(r"report\s*date[: ]+([0-9/\- :apmAPM]+)", text, re.I)
+    return dmy(m.group(1)) if m else None
+
+def _start_date_in(text):
+    m = re.search(r"start\s*date[: ]+([0-9/\- :]+)", text, re.I)
+    return dmy(m.group(1)) if m else None
+
+def _end_date_in(text):
+    m = re.search(r"end\s*date[: ]+([0-9/\- :]+)", text, re.I)
+    return dmy(m.group(1)) if m else None
+
+def _country_in(text):
+    m = re.search(r"\bcountry\b[\s:]+([A-Za-z ]+)", text, re.I)
+    return (m.group(1).strip() or None) if m else None
+
+def _iso(d):
+    return d.isoformat() if hasattr(d, "isoformat") else str(d) if d else None
+
+
+class PwmImporter(BaseImporter):
+    """Rapport PWM : une ligne par site, période lue dans le pré-en-tête."""
+    kind = "pwm"
+    header_error = "En-tête du tableau introuvable (colonne 'Site ID' / 'GRID ACT PWM Average Power')."
+
+    def open(self):
+        # lecture en flux ; en-tête du tableau dans les 40 premières lignes
+        reader = self.read(
+            normalize=normalize, scan_max=40,
+            is_header=lambda rown: "site id" in rown and "grid act pwm average power" in rown,
+        )
+
+        # -------- entête (report/start/end/country) --------
+        # ex: "Report Date: 23-07-2025 19:58   Start Date: 01-09-2024 End Date: 30-09-2024  Country Senegal"
+        # (cellules mémorisées par le modèle de fichier, sinon 15 premières lignes)
+        self.report_date = self.head_value("report_date", _report_date_in, 15)
+        self.start_date  = self.head_value("start_date", _start_date_in, 15)
+        self.end_date    = self.head_value("end_date", _end_date_in, 15)
+        country_name = self.head_value("country", _country_in, 15)
+        # fallback pays utilisateur
+        self.country_name = country_name or self.user_country or "Unknown"
+
+        # période du rapport : lue une seule fois dans l'en-tête
+        self.period = (
+            self.start_date.date() if self.start_date else None,
+            self.end_date.date() if self.end_date else None,
+        )
+
+        # mapping des colonnes (résolution mise en cache par modèle d'en-tête)
+        cols = self.resolve_columns(HEADER, reader.columns)
+
+        codes = cleaning.PWM_NULL_CODES
+        num = partial(cleaning.numbers, decimals=6, codes=codes)
+        integers = partial(cleaning.integers, codes=codes)
+
+        self.c_siteid = cols["site_id"]
+        self.c_sitename = cols["site_name"]
+        # champ -> (colonne réelle, nettoyage)
+        self.fields = dict(
+            site_class=(cols["site_class"], cleaning.text),
+            grid_status=(cols["grid_status"], cleaning.statuses),
+            dg_status=(cols["dg_status"], cleaning.statuses),
+            solar_status=(cols["solar_status"], cleaning.statuses),
+            typology_power_w=(cols["typology_power_w"], integers),
+            grid_act_pwm_avg_w=(cols["grid_act_pwm_avg_w"], num),
+            total_pwm_min_w=(cols["total_pwm_min_w"], num),
+            total_pwm_avg_w=(cols["total_pwm_avg_w"], num),
+            total_pwm_max_w=(cols["total_pwm_max_w"], num),
+            total_pwc_avg_load_w=(cols["total_pwc_avg_load_w"], num),
+            dc_pwm_avg_uptime_pct=(cols["dc_pwm_avg_uptime_pct"], num),
+            pwc_uptime_pct=(cols["pwc_uptime_pct"], num),
+            router_uptime_pct=(cols["router_uptime_pct"], num),
+            typology_load_vs_pwm_real_load_pct=(cols["typology_load_vs_pwm_real_load_pct"], num),
+            grid_availability_pct=(cols["grid_availability_pct"], num),
+            number_grid_cuts=(cols["number_grid_cuts"], integers),
+            total_grid_cuts_minutes=(cols["total_grid_cuts_minutes"], partial(cleaning.hhmm_minutes, codes=codes)),
+            **{field: (cols[field], num) for field in DC_FIELDS},
+        )
+        # DC non trouvées dans l'en-tête
+        self.unmapped = [f for f in cols.unmapped if f in DC_FIELDS]
+        self.created = 0
+
+    def begin(self):
+        # objets pays & période
+        self.country = Country.objects.get_or_create(name=self.country_name)[0]
+
+    def clean(self, df):
+        """Nettoyage vectorisé d'un paquet : [(site, valeurs, empreinte)]."""
+        def col(name):
+            return df[name] if name else cleaning.missing(len(df), df.index)
+
+        sids = cleaning.text(col(self.c_siteid))
+        keep = sids.notna() & ~sids.str.lower().isin({"#", "nan"})
+        df, sids = df[keep], sids[keep]
+
+        columns = {"site_name": cleaning.text(col(self.c_sitename)).fillna(sids)}
+        columns.update(
+            (field, clean(col(name))) for field, (name, clean) in self.fields.items()
+        )
+
+        # l'en-tête (pays, date du rapport) fait partie du contenu de chaque ligne
+        header = {
+            "country": pd.Series(self.country_name, index=df.index),
+            "report_date": pd.Series(_iso(self.report_date), index=df.index, dtype=object),
+        }
+        fingerprints = cleaning.fingerprints({**columns, **header}, index=df.index)
+        return list(zip(cleaning.values(sids), cleaning.records(columns), fingerprints.tolist()))
+
+    def process(self, cleaned):
+        b, e = self.period
+        country = self.country
+        known = self.known_fingerprints(
+            PwmReport.objects.filter(site__site_id__in={sid for sid, _, _ in cleaned}, period_start=b, period_end=e),
+            ["site__site_id"],
+        ) if b and e else {}
+
+        # --- Lignes à écrire (la dernière occurrence d'un site l'emporte)
+        rows = {}
+        for sid, values, fingerprint in cleaned:
+            # si des colonnes "Begin/End" existe dans ce type, on pourrait les prendre ici.
+            if not b or not e:
+                self.errors.append(f"{sid}: période introuvable depuis l’en-tête")
+                continue
+            if known.get((sid,)) == fingerprint:
+                self.unchanged += 1
+                continue
+            values.update(
+                country=country,
+                report_date=self.report_date,
+                source_filename=self.filename,
+                row_fingerprint=fingerprint,
+            )
+            rows[sid] = values
+        if not rows:
+            return
+
+        # --- Écriture ensembliste du paquet (nb de requêtes constant par paquet)
+        # sites créés avec leur nom, pays réaligné ; nom des sites existants conservé
+        site_ids, _ = resolve_sites(
+            {sid: (country.id, values["site_name"]) for sid, values in rows.items()}, rename=False,
+        )
+        PwmReport.objects.bulk_create(
+            [
+                PwmReport(site_id=site_ids[sid], period_start=b, period_end=e, **values)
+                for sid, values in rows.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["site", "period_start", "period_end"],
+            update_fields=UPDATE_FIELDS,
+        )
+        self.created += sum((sid,) not in known for sid in rows)
+        self.written += len(rows)
+
+    def result(self):
+        return {
+            "upserted": self.written,
+            "created": self.created,
+            "unchanged": self.unchanged,
+            "errors": self.errors,
+            "unmapped_fields": sorted(self.unmapped) if self.written else [],  # juste pour debug
+            "header": {
+                "country": self.country_name,
+                "report_date": _iso(self.report_date),
+                "start": _iso(self.start_date),
+                "end": _iso(self.end_date),
+            }
+        }
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0004_keyset_indexes'),
+        ('pwmreport', '0002_row_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pwmreport',
+            index=models.Index(fields=['-period_start', 'site', 'id'], name='pwmreport_p_period__915a5d_idx'),
+        ),
+    ]
@@ -12,6 +12,7 @@ class PwmReport(models.Model):
     period_start = models.DateField()
     period_end = models.DateField()
     source_filename = models.CharField(max_length=255, null=True, blank=True)
+    row_fingerprint = models.BigIntegerField(null=True, blank=True, editable=False)  # empreinte des valeurs importées
 
     # infos site
     site_name = models.CharField(max_length=255, null=True, blank=True)
@@ -52,6 +53,8 @@ class PwmReport(models.Model):
         indexes = [
             models.Index(fields=["period_start", "period_end"]),
             models.Index(fields=["country", "site"]),
+            # pagination par curseur (-period_start, site, id)
+            models.Index(fields=["-period_start", "site", "id"]),
         ]
 
     def __str__(self):
@@ -9,4 +9,4 @@ class PwmReportSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = PwmReport
-        fields = "__all__"
+        exclude = ["row_fingerprint"]
@@ -1,3 +1,73 @@
+import io
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
 from django.test import TestCase
+from openpyxl import Workbook
+
+from pwmreport.importers import PwmImporter
+from pwmreport.models import PwmReport
+
+
+HEADER = [
+    "#", "Country", "Site ID", "Site Name", "Site Class", "GRID", "DG", "Solar", "Typology Power [W]",
+    "GRID ACT PWM Average Power [W]", *(f"DC{k} PWM Average Power [W]" for k in range(1, 11)),
+    "Total PWM Minimum Power [W]", "Total PWM Average Power [W]", "Total PWM Maximum Power [W]",
+    "Total PWC Average Load Power [W]", "DC PWM Average Up Time [%]", "PWC Up Time [%]", "Router Up Time [%]",
+    "Typology Load Power vs PWM Real Load Power [%]", "GRID Availability [%]", "Number of GRID Cuts [cuts]",
+    "Total GRID Cuts Duration [hh:mm]",
+]
+
+
+def pwm_file(rows, period=("01-09-2024", "30-09-2024"), report_date="23-07-2025 19:58"):
+    wb = Workbook()
+    ws = wb.active
+    ws.append([f"Report Date: {report_date}"])
+    ws.append([f"Start Date: {period[0]}", f"End Date: {period[1]}"])
+    ws.append(["Country Senegal"])
+    ws.append([])
+    ws.append(HEADER)
+    for i, (site_id, avg) in enumerate(rows):
+        ws.append([i, "Senegal", site_id, f"name {site_id}", "A", "YES", "0DG", "NI", "1,500", 123.4,
+                   *(k * 1.5 for k in range(1, 11)), 1, avg, 3, "NA", 99.5, "NM", 100, 50, 97.2, "3", "12:30"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return ContentFile(buf.getvalue(), name="pwm.xlsx")
+
+
+class PwmImportTests(TestCase):
+    def run_import(self, rows, options=None, **kwargs):
+        f = pwm_file(rows, **kwargs)
+        return PwmImporter(f, f.name, options).run()
+
+    def counts(self, result):
+        return result["upserted"], result["created"], result["unchanged"]
+
+    def test_created_updated_unchanged_counts(self):
+        rows = [("P1", 10), ("P2", 20), ("P3", 30)]
+        result = self.run_import(rows)
+        self.assertEqual(self.counts(result), (3, 3, 0))
+        self.assertEqual(result["errors"], [])
+
+        # P1 modifié, P4 nouveau, P2 / P3 identiques
+        result = self.run_import([("P1", 11), ("P2", 20), ("P3", 30), ("P4", 40)])
+        self.assertEqual(self.counts(result), (2, 1, 2))
+        self.assertEqual(
+            dict(PwmReport.objects.values_list("site__site_id", "total_pwm_avg_w")),
+            {"P1": Decimal("11"), "P2": Decimal("20"), "P3": Decimal("30"), "P4": Decimal("40")},
+        )
+
+        # même fichier forcé : tout est inchangé
+        result = self.run_import([("P1", 11), ("P2", 20), ("P3", 30), ("P4", 40)], {"force": "1"})
+        self.assertEqual(self.counts(result), (0, 0, 4))
+
+    def test_report_date_is_part_of_the_content(self):
+        self.run_import([("P1", 10)])
+        result = self.run_import([("P1", 10)], report_date="24-07-2025 08:00")
+        self.assertEqual(self.counts(result), (1, 0, 0))
 
-# Create your tests here.
+    def test_other_period_creates_rows(self):
+        self.run_import([("P1", 10)])
+        result = self.run_import([("P1", 10)], period=("01-10-2024", "31-10-2024"))
+        self.assertEqual(self.counts(result), (1, 1, 0))
+        self.assertEqual(PwmReport.objects.count(), 2)
@@ -0,0 +1,194 @@
+# rectifiers/importers.py
+import datetime
+
+from django.utils import timezone
+
+from energy.models import Country, Site
+from ingestion import cleaning
+from ingestion.headers import HeaderSpec, normalize_units
+from ingestion.importers import BaseImporter, ImportFailed
+from . import loader
+from .models import RectifierReading
+from .rollups import refresh_rollups, truncate
+
+
+HEADER = HeaderSpec({
+    "country": ["country"],
+    "site_id": ["site id"],
+    "param": ["param name"],
+    "value": ["param value", "value"],
+    "measure": ["measure", "unit"],
+    "date": ["date", "timestamp", "time"],
+}, normalize=normalize_units)
+
+
+class RectifierImporter(BaseImporter):
+    """Relevés redresseurs au format long : une ligne par (site, paramètre, date)."""
+    kind = "rectifiers"
+    header_error = "En-tête introuvable (attendu: Country, Site ID, Param Name, Param Value, Measure, Date)."
+
+    def open(self):
+        # Lecture Excel/CSV en flux ; en-tête = ligne contenant 'Country', 'Site ID' et 'Param Name'
+        reader = self.read(
+            normalize=normalize_units, scan_max=30,
+            is_header=lambda row: "country" in row and "site id" in row and "param name" in row,
+        )
+
+        # map colonnes
+        cols = self.resolve_columns(HEADER, reader.columns)
+        self.c_country = cols["country"]
+        self.c_site_id = cols["site_id"]
+        self.c_param   = cols["param"]
+        self.c_value   = cols["value"]
+        self.c_measure = cols["measure"]
+        self.c_date    = cols["date"]
+
+        required = [self.c_site_id, self.c_param, self.c_value, self.c_date]
+        if any(c is None for c in required):
+            raise ImportFailed("Colonnes essentielles manquantes (Site ID, Param Name, Param Value, Date).")
+
+        self.override_country = self.option("country")
+        self.limit = loader.value_limit()
+        self.max_lengths = loader.max_lengths()
+        self.created = 0
+        self.touched = set()  # (site, paramètre, heure) écrits -> agrégats à recalculer
+        self.rollups = {}
+
+    def begin(self):
+        self.countries = {}  # nom -> Country
+        self.sites = {}      # site_id -> Site
+        loader.create_stage()
+
+    def resolve_countries(self, names):
+        missing = set(names) - self.countries.keys()
+        if missing:
+            self.countries.update((c.name, c) for c in Country.objects.filter(name__in=missing))
+            for name in missing - self.countries.keys():
+                self.countries[name] = Country.objects.get_or_create(name=name)[0]
+
+    def resolve_sites(self, site_countries):
+        """
+        site_countries = {site_id: nom du pays de sa dernière ligne}. Sites absents
+        créés, pays des sites existants réaligné (comme ligne à ligne auparavant).
+        """
+        missing = site_countries.keys() - self.sites.keys()
+        if missing:
+            self.sites.update((s.site_id, s) for s in Site.objects.filter(site_id__in=missing))
+            new = [
+                Site(site_id=sid, site_name=sid, country=self.countries[site_countries[sid]])
+                for sid in missing - self.sites.keys()
+            ]
+            Site.objects.bulk_create(new)
+            self.sites.update((s.site_id, s) for s in Site.objects.filter(site_id__in=[s.site_id for s in new]))
+
+        moves = {}
+        for sid, name in site_countries.items():
+            site, country = self.sites[sid], self.countries[name]
+            if site.country_id != country.id:
+                site.country = country
+                moves.setdefault(country.id, []).append(site.pk)
+        for country_id, pks in moves.items():
+            Site.objects.filter(pk__in=pks).update(country_id=country_id)
+
+    def clean(self, df):
+        """
+        Nettoyage vectorisé d'un paquet : [(site, pays, paramètre, valeur, unité,
+        date, valeur brute, date brute, empreinte, hors bornes, texte trop long)].
+        """
+        def col(name):
+            return df[name] if name else cleaning.missing(len(df), df.index)
+
+        sids = cleaning.text(col(self.c_site_id))
+        keep = sids.notna()
+        df, sids = df[keep], sids[keep]
+
+        countries = cleaning.text(col(self.c_country)).fillna(self.user_country or "Unknown")
+        if self.override_country:
+            countries[:] = self.override_country
+        params = cleaning.text(col(self.c_param)).fillna("")
+        values = cleaning.numbers(col(self.c_value), decimals=6)
+        measures = cleaning.text(col(self.c_measure)).fillna("")
+        dates = cleaning.values(cleaning.datetimes(col(self.c_date), dayfirst=False, codes=None))
+        fingerprints = cleaning.fingerprints({"country": countries, "param_value": values, "measure": measures})
+        # hors bornes du DecimalField(16, 6) : rejetées d'avance (plus de DataError en base)
+        overflow = cleaning.values(values.abs() >= self.limit)
+        # textes plus longs que leur colonne : idem, 1er champ en défaut (ou None) par ligne
+        too_long = cleaning.missing(len(df), df.index)
+        texts = {"site_id": sids, "country": countries, "param_name": params, "measure": measures}
+        for field, s in reversed(texts.items()):
+            too_long[(s.str.len() > self.max_lengths[field]).fillna(False)] = field
+
+        return list(zip(
+            cleaning.values(sids),
+            cleaning.values(countries),
+            cleaning.values(params),
+            cleaning.values(values),
+            cleaning.values(measures),
+            dates,
+            cleaning.values(col(self.c_value)),
+            cleaning.values(col(self.c_date)),
+            fingerprints.tolist(),
+            overflow,
+            cleaning.values(too_long),
+        ))
+
+    def process(self, rows):
+        # empreintes des relevés déjà en base sur ces sites et cette plage de dates
+        known = {}
+        stamps = [row[5] for row in rows if row[5]]
+        if stamps:
+            bounds = [timezone.make_aware(d, datetime.timezone.utc) for d in (min(stamps), max(stamps))]
+            known = self.known_fingerprints(
+                RectifierReading.objects.filter(
+                    site__site_id__in={row[0] for row in rows}, measured_at__range=bounds,
+                ),
+                ["site__site_id", "param_name", "measured_at"],
+            )
+
+        pending = {}         # (site_id, param, date) -> ligne ; la dernière occurrence l'emporte
+        site_countries = {}  # site_id -> pays de sa dernière ligne
+        for sid, country_name, param_name, param_value, measure, measured_at, raw_value, raw_date, fingerprint, too_big, too_long in rows:
+            key = (sid, param_name, measured_at)
+            if measured_at and known.get(key) == fingerprint:
+                self.unchanged += 1
+                continue
+            if too_long:
+                # avant la création du site / pays
+                self.errors.append(f"{sid} {measured_at}: {too_long} trop long (max {self.max_lengths[too_long]} caractères)")
+                continue
+            site_countries[sid] = country_name
+            if not measured_at:
+                self.errors.append(f"{sid}: date illisible -> {raw_date}")
+                continue
+            if too_big:
+                self.errors.append(f"{sid} {measured_at}: overflow/invalid value -> {raw_value}")
+                continue
+            pending[key] = (country_name, param_value, measure, fingerprint)
+
+        self.resolve_countries(site_countries.values())
+        self.resolve_sites(site_countries)
+
+        batch = []
+        for (sid, param_name, measured_at), (country_name, param_value, measure, fingerprint) in pending.items():
+            site = self.sites[sid]
+            batch.append((
+                site.pk, self.countries[country_name].pk, param_name, param_value,
+                measure, measured_at, self.filename, fingerprint,
+            ))
+            self.touched.add((site.pk, param_name, truncate(measured_at, "hour")))
+            if (sid, param_name, measured_at) not in known:
+                self.created += 1
+        loader.merge(batch)
+        self.written += len(batch)
+
+    def finish(self):
+        self.rollups = refresh_rollups(self.touched)
+
+    def result(self):
+        return {
+            "upserted": self.written,
+            "created": self.created,
+            "unchanged": self.unchanged,
+            "rollups_refreshed": self.rollups,
+            "errors": self.errors,
+        }
@@ -0,0 +1,115 @@
+# rectifiers/loader.py
+"""
+Écriture en masse des relevés redresseurs (upsert sur site, param_name, measured_at).
+
+PostgreSQL : les lignes d'un paquet sont envoyées par COPY dans une table de
+transit temporaire, puis fusionnées par un seul
+`INSERT ... SELECT ... ON CONFLICT (site_id, param_name, measured_at) DO UPDATE`.
+Autres moteurs (sqlite en dev) : bulk_create(update_conflicts=True).
+
+Les valeurs sont contrôlées en amont (RectifierImporter : bornes de
+param_value, longueur des textes) : aucune ligne ne peut faire échouer l'instruction.
+"""
+import csv
+import datetime
+import io
+
+from django.db import connection
+from django.utils import timezone
+
+from energy.models import Country, Site
+from .models import RectifierReading
+
+
+STAGE = "rectifier_reading_stage"
+# colonnes écrites par l'import, dans l'ordre du COPY
+COLUMNS = [
+    "site_id", "country_id", "param_name", "param_value",
+    "measure", "measured_at", "source_filename", "row_fingerprint",
+]
+NULLABLE = "param_value, row_fingerprint"
+UPDATE_COLUMNS = ["country_id", "param_value", "measure", "source_filename", "row_fingerprint"]
+# textes lus dans le fichier -> (modèle, champ) dont la longueur est bornée
+TEXT_FIELDS = {
+    "site_id": (Site, "site_id"),
+    "country": (Country, "name"),
+    "param_name": (RectifierReading, "param_name"),
+    "measure": (RectifierReading, "measure"),
+}
+
+
+def value_limit(model=RectifierReading, field="param_value"):
+    """Borne (exclue) des valeurs absolues admises par le DecimalField(max_digits, decimal_places)."""
+    f = model._meta.get_field(field)
+    return 10 ** (f.max_digits - f.decimal_places)
+
+
+def max_lengths():
+    """{texte: max_length du CharField} (voir TEXT_FIELDS)."""
+    return {name: model._meta.get_field(field).max_length for name, (model, field) in TEXT_FIELDS.items()}
+
+
+def _aware(dt):
+    return timezone.make_aware(dt, datetime.timezone.utc) if timezone.is_naive(dt) else dt
+
+
+def create_stage():
+    """Table de transit de la transaction d'import (supprimée au COMMIT)."""
+    if connection.vendor != "postgresql":
+        return
+    table = connection.ops.quote_name(RectifierReading._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGE} ON COMMIT DROP AS "
+            f"SELECT {', '.join(COLUMNS)} FROM {table} WITH NO DATA"
+        )
+
+
+def merge(rows):
+    """rows = [(site_id, country_id, param_name, param_value, measure, measured_at, source_filename, row_fingerprint)]"""
+    if not rows:
+        return 0
+    if connection.vendor == "postgresql":
+        return _copy_merge(rows)
+    return _bulk_merge(rows)
+
+
+def _copy_merge(rows):
+    buf = io.StringIO()
+    # textes quotés ("" = chaîne vide) ; None -> "" remis à NULL par FORCE_NULL
+    writer = csv.writer(buf, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+    for row in rows:
+        row = list(row)
+        row[5] = _aware(row[5]).isoformat()
+        writer.writerow(row)
+    buf.seek(0)
+
+    q = connection.ops.quote_name
+    table = q(RectifierReading._meta.db_table)
+    cols = ", ".join(COLUMNS)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in UPDATE_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {STAGE}")
+        cursor.cursor.copy_expert(f"COPY {STAGE} ({cols}) FROM STDIN WITH (FORMAT csv, FORCE_NULL ({NULLABLE}))", buf)
+        cursor.execute(
+            f"""
+            INSERT INTO {table} ({cols}, imported_at)
+            SELECT {cols}, now() FROM {STAGE}
+            ON CONFLICT (site_id, param_name, measured_at) DO UPDATE SET {updates}
+            """
+        )
+        return cursor.rowcount
+
+
+def _bulk_merge(rows):
+    objs = [
+        RectifierReading(**dict(zip(COLUMNS, row[:5] + (_aware(row[5]),) + row[6:])))
+        for row in rows
+    ]
+    RectifierReading.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["site", "param_name", "measured_at"],
+        update_fields=[c.removesuffix("_id") for c in UPDATE_COLUMNS],
+    )
+    return len(objs)
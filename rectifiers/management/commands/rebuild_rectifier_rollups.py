@@ -0,0 +1,51 @@
+# rectifiers/management/commands/rebuild_rectifier_rollups.py
+"""
+Reconstruit les agrégats horaires / journaliers / mensuels des relevés redresseurs.
+
+    python manage.py rebuild_rectifier_rollups                       # tout l'historique
+    python manage.py rebuild_rectifier_rollups --from 2025-01 --to 2025-06 --site SITE_1
+"""
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from energy.models import Site
+from rectifiers.models import RectifierReading
+from rectifiers.rollups import next_bucket, rebuild_rollups, truncate
+
+
+def _year_month(value):
+    try:
+        year, month = (int(x) for x in value.split("-"))
+        return datetime.datetime(year, month, 1, tzinfo=datetime.timezone.utc)
+    except ValueError:
+        raise CommandError(f"Mois attendu au format AAAA-MM : {value}")
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les agrégats RectifierHourly / RectifierDaily / RectifierMonthly depuis les relevés."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", type=_year_month, help="Premier mois (AAAA-MM), défaut : premier relevé.")
+        parser.add_argument("--to", dest="end", type=_year_month, help="Dernier mois inclus (AAAA-MM), défaut : dernier relevé.")
+        parser.add_argument("--site", action="append", help="Site ID (répétable) ; défaut : tous les sites.")
+
+    def handle(self, *args, **opts):
+        bounds = RectifierReading.objects.aggregate(first=Min("measured_at"), last=Max("measured_at"))
+        start = opts["start"] or bounds["first"]
+        end = opts["end"] or bounds["last"]
+        if start is None or end is None:
+            self.stdout.write("Aucun relevé.")
+            return
+
+        site_ids = None
+        if opts["site"]:
+            site_ids = list(Site.objects.filter(site_id__in=opts["site"]).values_list("pk", flat=True))
+            if not site_ids:
+                raise CommandError("Aucun site correspondant.")
+
+        written = rebuild_rollups(start, next_bucket(truncate(end, "month"), "month"), site_ids)
+        for grain, n in written.items():
+            self.stdout.write(f"{grain}: {n} ligne(s)")
+        self.stdout.write(self.style.SUCCESS("Agrégats reconstruits."))
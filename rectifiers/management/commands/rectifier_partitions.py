@@ -0,0 +1,64 @@
+# rectifiers/management/commands/rectifier_partitions.py
+"""
+Maintenance des partitions mensuelles de RectifierReading (à planifier, ex. cron mensuel).
+
+    python manage.py rectifier_partitions                     # crée les 3 prochains mois
+    python manage.py rectifier_partitions --ahead 6 --from 2024-01
+    python manage.py rectifier_partitions --retain 24         # détache les mois > 24 mois (archives)
+    python manage.py rectifier_partitions --retain 24 --drop  # ... et les supprime
+    python manage.py rectifier_partitions --list
+"""
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rectifiers import partitions
+
+
+def _year_month(value):
+    try:
+        year, month = (int(x) for x in value.split("-"))
+        return datetime.date(year, month, 1)
+    except ValueError:
+        raise CommandError(f"Mois attendu au format AAAA-MM : {value}")
+
+
+def _add_months(d, n):
+    y, m = divmod(d.year * 12 + d.month - 1 + n, 12)
+    return datetime.date(y, m + 1, 1)
+
+
+class Command(BaseCommand):
+    help = "Crée les partitions mensuelles à venir de RectifierReading et détache / supprime les anciennes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=3, help="Mois à pré-créer après le mois courant (défaut 3).")
+        parser.add_argument("--from", dest="start", type=_year_month, help="Premier mois à créer (AAAA-MM), défaut : mois courant.")
+        parser.add_argument("--retain", type=int, help="Nb de mois conservés ; les partitions plus anciennes sont détachées.")
+        parser.add_argument("--drop", action="store_true", help="Supprime les partitions détachées au lieu de les archiver.")
+        parser.add_argument("--list", action="store_true", help="Liste les partitions existantes.")
+
+    def handle(self, *args, **opts):
+        if not partitions.is_partitioned():
+            raise CommandError("RectifierReading n'est pas partitionnée (PostgreSQL requis, migration rectifiers 0003).")
+
+        if opts["list"]:
+            for name, (y, m) in sorted(partitions.partitions().items(), key=lambda kv: kv[1]):
+                self.stdout.write(f"{y:04d}-{m:02d}  {name}")
+            return
+
+        this_month = datetime.date.today().replace(day=1)
+        start = opts["start"] or this_month
+        created = partitions.ensure_partitions(start, _add_months(this_month, opts["ahead"]))
+        for name in created:
+            self.stdout.write(f"créée : {name}")
+
+        if opts["retain"] is not None:
+            oldest = _add_months(this_month, -opts["retain"])
+            cutoff = (oldest.year, oldest.month)
+            for name, ym in sorted(partitions.partitions().items(), key=lambda kv: kv[1]):
+                if ym < cutoff:
+                    partitions.detach_partition(*ym, drop=opts["drop"])
+                    self.stdout.write(f"{'supprimée' if opts['drop'] else 'détachée'} : {name}")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partition(s) créée(s)."))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rectifiers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rectifierreading',
+            name='row_fingerprint',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
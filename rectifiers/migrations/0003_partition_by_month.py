@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from rectifiers.partitions import rebuild_table
+    rebuild_table(partitioned=True, using=schema_editor.connection)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from rectifiers.partitions import rebuild_table
+    rebuild_table(partitioned=False, using=schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rectifiers', '0002_row_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0003_alter_siteenergymonthlystat_pwc_availability_pct_and_more'),
+        ('rectifiers', '0003_partition_by_month'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RectifierDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('param_name', models.CharField(max_length=120)),
+                ('bucket', models.DateTimeField()),
+                ('value_count', models.IntegerField(default=0)),
+                ('value_sum', models.DecimalField(decimal_places=6, default=0, max_digits=24)),
+                ('value_min', models.DecimalField(blank=True, decimal_places=6, max_digits=16, null=True)),
+                ('value_max', models.DecimalField(blank=True, decimal_places=6, max_digits=16, null=True)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='energy.country')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='energy.site')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['param_name', 'site', 'bucket'], name='rectifiers__param_n_2e294e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('site', 'country', 'param_name', 'bucket'), name='uniq_rectifier_daily')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RectifierHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('param_name', models.CharField(max_length=120)),
+                ('bucket', models.DateTimeField()),
+                ('value_count', models.IntegerField(default=0)),
+                ('value_sum', models.DecimalField(decimal_places=6, default=0, max_digits=24)),
+                ('value_min', models.DecimalField(blank=True, decimal_places=6, max_digits=16, null=True)),
+                ('value_max', models.DecimalField(blank=True, decimal_places=6, max_digits=16, null=True)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='energy.country')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='energy.site')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['param_name', 'site', 'bucket'], name='rectifiers__param_n_a90738_idx')],
+                'constraints': [models.UniqueConstraint(fields=('site', 'country', 'param_name', 'bucket'), name='uniq_rectifier_hourly')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RectifierMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('param_name', models.CharField(max_length=120)),
+                ('bucket', models.DateTimeField()),
+                ('value_count', models.IntegerField(default=0)),
+                ('value_sum', models.DecimalField(decimal_places=6, default=0, max_digits=24)),
+                ('value_min', models.DecimalField(blank=True, decimal_places=6, max_digits=16, null=True)),
+                ('value_max', models.DecimalField(blank=True, decimal_places=6, max_digits=16, null=True)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='energy.country')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='energy.site')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['param_name', 'site', 'bucket'], name='rectifiers__param_n_fa56d6_idx')],
+                'constraints': [models.UniqueConstraint(fields=('site', 'country', 'param_name', 'bucket'), name='uniq_rectifier_monthly')],
+            },
+        ),
+    ]
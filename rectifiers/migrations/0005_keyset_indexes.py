@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0004_keyset_indexes'),
+        ('rectifiers', '0004_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rectifierreading',
+            index=models.Index(fields=['-measured_at', 'site', 'id'], name='rectifiers__measure_486b22_idx'),
+        ),
+    ]
@@ -20,6 +20,7 @@ class RectifierReading(models.Model):
     # traces
     source_filename = models.CharField(max_length=255, blank=True, default="")
     imported_at     = models.DateTimeField(auto_now_add=True)
+    row_fingerprint = models.BigIntegerField(null=True, blank=True, editable=False)  # empreinte des valeurs importées
 
     class Meta:
         unique_together = ("site", "param_name", "measured_at")
@@ -28,8 +29,56 @@ class RectifierReading(models.Model):
             models.Index(fields=["param_name"]),
             models.Index(fields=["site", "measured_at"]),
             models.Index(fields=["country", "measured_at"]),
+            # pagination par curseur (-measured_at, site, id)
+            models.Index(fields=["-measured_at", "site", "id"]),
         ]
         ordering = ["-measured_at", "site__site_id"]
 
     def __str__(self) -> str:
         return f"{self.site.site_id} {self.param_name} @ {self.measured_at:%Y-%m-%d}"
+
+
+class RectifierRollup(models.Model):
+    """
+    Agrégat des relevés par site × paramètre × seau de temps (début du seau, UTC),
+    tenu à jour à chaque import (rectifiers.rollups). Moyenne = value_sum / value_count.
+    """
+    country     = models.ForeignKey(Country, on_delete=models.PROTECT, related_name="+")
+    site        = models.ForeignKey(Site,    on_delete=models.CASCADE, related_name="+")
+    param_name  = models.CharField(max_length=120)
+    bucket      = models.DateTimeField()
+
+    value_count = models.IntegerField(default=0)  # nb de valeurs non nulles
+    value_sum   = models.DecimalField(max_digits=24, decimal_places=6, default=0)
+    value_min   = models.DecimalField(max_digits=16, decimal_places=6, null=True, blank=True)
+    value_max   = models.DecimalField(max_digits=16, decimal_places=6, null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self) -> str:
+        return f"{self.site_id} {self.param_name} @ {self.bucket:%Y-%m-%d %H:%M}"
+
+
+class RectifierHourly(RectifierRollup):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["site", "country", "param_name", "bucket"], name="uniq_rectifier_hourly"),
+        ]
+        indexes = [models.Index(fields=["param_name", "site", "bucket"])]
+
+
+class RectifierDaily(RectifierRollup):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["site", "country", "param_name", "bucket"], name="uniq_rectifier_daily"),
+        ]
+        indexes = [models.Index(fields=["param_name", "site", "bucket"])]
+
+
+class RectifierMonthly(RectifierRollup):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["site", "country", "param_name", "bucket"], name="uniq_rectifier_monthly"),
+        ]
+        indexes = [models.Index(fields=["param_name", "site", "bucket"])]
@@ -0,0 +1,194 @@
+# rectifiers/partitions.py
+"""
+Partitionnement mensuel (PostgreSQL, PARTITION BY RANGE (measured_at)) de
+RectifierReading.
+
+    rectifiers_rectifierreading              table mère (partitionnée)
+    rectifiers_rectifierreading_p2025_08     [2025-08-01, 2025-09-01) UTC
+    rectifiers_rectifierreading_default      lignes hors des partitions créées
+
+Les requêtes filtrées sur measured_at ne lisent que les partitions concernées
+(élagage) ; la rétention se fait par DETACH / DROP d'une partition au lieu
+d'un DELETE massif. La clé primaire physique est (id, measured_at) : PostgreSQL
+impose la clé de partition dans les contraintes d'unicité, `id` reste unique
+par son identity.
+
+Les imports de mois sans partition tombent dans la partition par défaut ;
+`manage.py rectifier_partitions --from AAAA-MM` crée ces mois et y déplace
+les lignes. Sous un autre moteur (sqlite en dev) tout est sans effet.
+"""
+import datetime
+
+from django.db import connection, transaction
+
+from .models import RectifierReading
+
+
+PARENT = RectifierReading._meta.db_table
+DEFAULT = f"{PARENT}_default"
+
+
+def _q(name):
+    return connection.ops.quote_name(name)
+
+
+def month_start(year, month):
+    return datetime.datetime(year, month, 1, tzinfo=datetime.timezone.utc)
+
+
+def next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def months_between(start, end):
+    """(année, mois) de start à end inclus (dates / datetimes)."""
+    ym, last = (start.year, start.month), (end.year, end.month)
+    while ym <= last:
+        yield ym
+        ym = next_month(*ym)
+
+
+def partition_name(year, month):
+    return f"{PARENT}_p{year:04d}_{month:02d}"
+
+
+def is_partitioned(using=connection):
+    if using.vendor != "postgresql":
+        return False
+    with using.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [PARENT])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def partitions():
+    """{nom: (année, mois)} des partitions mensuelles attachées (hors défaut)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            """,
+            [PARENT],
+        )
+        names = [r[0] for r in cursor.fetchall()]
+    prefix = f"{PARENT}_p"
+    return {
+        n: (int(n[len(prefix):len(prefix) + 4]), int(n[-2:]))
+        for n in names if n.startswith(prefix)
+    }
+
+
+def create_partition(year, month, cursor):
+    """
+    Crée la partition du mois. Les lignes du mois déjà tombées dans la partition
+    par défaut y sont déplacées (PostgreSQL refuse sinon la nouvelle partition).
+    """
+    lo, hi = month_start(year, month), month_start(*next_month(year, month))
+    name = partition_name(year, month)
+    cursor.execute(f"SELECT 1 FROM {_q(DEFAULT)} WHERE measured_at >= %s AND measured_at < %s LIMIT 1", [lo, hi])
+    stray = cursor.fetchone() is not None
+    if stray:
+        cursor.execute(f"ALTER TABLE {_q(PARENT)} DETACH PARTITION {_q(DEFAULT)}")
+    cursor.execute(
+        f"CREATE TABLE {_q(name)} PARTITION OF {_q(PARENT)} FOR VALUES FROM (%s) TO (%s)", [lo, hi]
+    )
+    if stray:
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {_q(DEFAULT)} WHERE measured_at >= %s AND measured_at < %s RETURNING *
+            )
+            INSERT INTO {_q(PARENT)} SELECT * FROM moved
+            """,
+            [lo, hi],
+        )
+        cursor.execute(f"ALTER TABLE {_q(PARENT)} ATTACH PARTITION {_q(DEFAULT)} DEFAULT")
+    return name
+
+
+def ensure_partitions(start, end):
+    """Crée les partitions manquantes de start à end (inclus). Retourne les noms créés."""
+    if not start or not end or not is_partitioned():
+        return []
+    existing = set(partitions().values())
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for ym in months_between(start, end):
+            if ym not in existing:
+                created.append(create_partition(*ym, cursor))
+    return created
+
+
+def detach_partition(year, month, drop=False):
+    """
+    Détache la partition du mois : elle reste une table autonome (archive,
+    pg_dump possible) ou est supprimée si drop=True. Retourne le nom ou None.
+    """
+    name = partition_name(year, month)
+    if name not in partitions():
+        return None
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {_q(PARENT)} DETACH PARTITION {_q(name)}")
+        if drop:
+            cursor.execute(f"DROP TABLE {_q(name)}")
+    return name
+
+
+def rebuild_table(partitioned, using=connection):
+    """
+    Recrée la table (partitionnée ou simple) en conservant données, identity,
+    contraintes et index (mêmes noms, lus par introspection). Utilisé par les
+    migrations 0003 (aller / retour).
+    """
+    old = f"{PARENT}_rebuild"
+    q = using.ops.quote_name
+    with using.cursor() as cursor:
+        constraints = using.introspection.get_constraints(cursor, PARENT)
+        cursor.execute(f"ALTER TABLE {q(PARENT)} RENAME TO {q(old)}")
+        cursor.execute(
+            f"CREATE TABLE {q(PARENT)} (LIKE {q(old)} INCLUDING DEFAULTS INCLUDING IDENTITY)"
+            + (" PARTITION BY RANGE (measured_at)" if partitioned else "")
+        )
+        if partitioned:
+            cursor.execute(
+                f"SELECT DISTINCT date_trunc('month', measured_at AT TIME ZONE 'UTC') FROM {q(old)}"
+            )
+            months = {(d.year, d.month) for (d,) in cursor.fetchall()}
+            today = datetime.date.today()
+            months.update(months_between(today, today + datetime.timedelta(days=92)))
+            for ym in sorted(months):
+                cursor.execute(
+                    f"CREATE TABLE {q(partition_name(*ym))} PARTITION OF {q(PARENT)} FOR VALUES FROM (%s) TO (%s)",
+                    [month_start(*ym), month_start(*next_month(*ym))],
+                )
+            cursor.execute(f"CREATE TABLE {q(DEFAULT)} PARTITION OF {q(PARENT)} DEFAULT")
+
+        cursor.execute(f"INSERT INTO {q(PARENT)} SELECT * FROM {q(old)}")
+        cursor.execute(f"DROP TABLE {q(old)}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {q(PARENT)}",
+            [PARENT],
+        )
+
+        for name, c in constraints.items():
+            columns = list(c["columns"])
+            if c["primary_key"]:
+                columns = ["id", "measured_at"] if partitioned else ["id"]
+                sql = f"ALTER TABLE {q(PARENT)} ADD CONSTRAINT {q(name)} PRIMARY KEY ({', '.join(map(q, columns))})"
+            elif c["unique"]:
+                sql = f"ALTER TABLE {q(PARENT)} ADD CONSTRAINT {q(name)} UNIQUE ({', '.join(map(q, columns))})"
+            elif c["foreign_key"]:
+                table, column = c["foreign_key"]
+                sql = (
+                    f"ALTER TABLE {q(PARENT)} ADD CONSTRAINT {q(name)} FOREIGN KEY ({q(columns[0])}) "
+                    f"REFERENCES {q(table)} ({q(column)}) DEFERRABLE INITIALLY DEFERRED"
+                )
+            elif c["index"]:
+                orders = c.get("orders") or ["ASC"] * len(columns)
+                cols = ", ".join(f"{q(col)} {order}" for col, order in zip(columns, orders))
+                sql = f"CREATE INDEX {q(name)} ON {q(PARENT)} ({cols})"
+            else:
+                continue
+            cursor.execute(sql)
@@ -0,0 +1,187 @@
+# rectifiers/rollups.py
+"""
+Agrégats horaires / journaliers / mensuels des relevés redresseurs.
+
+Chaque niveau est calculé depuis le précédent (brut -> heure -> jour -> mois) :
+  - à l'import, seuls les seaux touchés sont recalculés (refresh_rollups) ;
+  - `manage.py rebuild_rectifier_rollups` reconstruit une plage complète.
+
+Les requêtes de séries lisent l'agrégat le plus grossier compatible avec la
+largeur demandée (pick_rollup).
+"""
+import datetime
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Trunc
+
+from .models import RectifierDaily, RectifierHourly, RectifierMonthly, RectifierReading
+
+
+UTC = datetime.timezone.utc
+KEY_FIELDS = ["site_id", "country_id", "param_name", "bucket"]
+VALUE_FIELDS = ["value_count", "value_sum", "value_min", "value_max"]
+
+# (grain, modèle, source, champ horaire de la source, durée mini du grain en secondes)
+LEVELS = [
+    ("hour", RectifierHourly, RectifierReading, "measured_at", 3600),
+    ("day", RectifierDaily, RectifierHourly, "bucket", 86400),
+    ("month", RectifierMonthly, RectifierDaily, "bucket", 28 * 86400),
+]
+ROLLUPS = {grain: model for grain, model, *_ in LEVELS}
+
+# Recalcul incrémental : nb de seaux horaires par lot ; lignes par INSERT (recalcul et reconstruction)
+REFRESH_BATCH_SIZE = 5000
+
+
+def truncate(dt, grain):
+    """Début du seau (UTC) contenant dt (aware, ou naïf = UTC)."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(UTC)
+    dt = dt.replace(minute=0, second=0, microsecond=0, tzinfo=UTC)
+    if grain in ("day", "month"):
+        dt = dt.replace(hour=0)
+    if grain == "month":
+        dt = dt.replace(day=1)
+    return dt
+
+
+def next_bucket(dt, grain):
+    if grain == "hour":
+        return dt + datetime.timedelta(hours=1)
+    if grain == "day":
+        return dt + datetime.timedelta(days=1)
+    return dt.replace(year=dt.year + 1, month=1) if dt.month == 12 else dt.replace(month=dt.month + 1)
+
+
+def aggregate(source, time_field, grain):
+    """values() groupé par (site, pays, paramètre, seau) depuis le niveau source."""
+    if source is RectifierReading:
+        aggregates = dict(
+            value_count=Count("param_value"), value_sum=Sum("param_value"),
+            value_min=Min("param_value"), value_max=Max("param_value"),
+        )
+    else:
+        aggregates = dict(
+            value_count=Sum("value_count"), value_sum=Sum("value_sum"),
+            value_min=Min("value_min"), value_max=Max("value_max"),
+        )
+    return (
+        source.objects
+        .annotate(b=Trunc(time_field, grain, tzinfo=UTC))
+        .values("site_id", "country_id", "param_name", "b")
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+
+def _build(model, row):
+    return model(
+        site_id=row["site_id"], country_id=row["country_id"], param_name=row["param_name"],
+        bucket=row["b"], value_count=row["value_count"] or 0, value_sum=row["value_sum"] or 0,
+        value_min=row["value_min"], value_max=row["value_max"],
+    )
+
+
+def _refresh_level(grain, model, source, time_field, keys):
+    """Recalcule les seaux `keys` = {(site_id, param_name, début du seau)} d'un niveau."""
+    start = min(k[2] for k in keys)
+    end = next_bucket(max(k[2] for k in keys), grain)
+    rows = aggregate(source, time_field, grain).filter(**{
+        "site_id__in": {k[0] for k in keys},
+        "param_name__in": {k[1] for k in keys},
+        f"{time_field}__gte": start,
+        f"{time_field}__lt": end,
+    })
+    objs = [
+        _build(model, r) for r in rows
+        if (r["site_id"], r["param_name"], truncate(r["b"], grain)) in keys
+    ]
+    model.objects.bulk_create(
+        objs, batch_size=REFRESH_BATCH_SIZE, update_conflicts=True,
+        unique_fields=["site", "country", "param_name", "bucket"], update_fields=VALUE_FIELDS,
+    )
+
+    # seaux devenus vides (relevés supprimés / changés de pays)
+    fresh = {(o.site_id, o.country_id, o.param_name, truncate(o.bucket, grain)) for o in objs}
+    candidates = model.objects.filter(
+        site_id__in={k[0] for k in keys}, param_name__in={k[1] for k in keys},
+        bucket__gte=start, bucket__lt=end,
+    ).values_list("pk", *KEY_FIELDS)
+    stale = [
+        pk for pk, site_id, country_id, param_name, bucket in candidates.iterator()
+        if (site_id, param_name, truncate(bucket, grain)) in keys
+        and (site_id, country_id, param_name, truncate(bucket, grain)) not in fresh
+    ]
+    if stale:
+        model.objects.filter(pk__in=stale).delete()
+    return len(objs)
+
+
+def refresh_rollups(touched):
+    """
+    touched = {(site_id, param_name, measured_at ou début d'heure), ...} écrits par un import.
+    Recalcule heure, puis jour, puis mois pour ces seaux, mois par mois et par lots
+    de REFRESH_BATCH_SIZE seaux horaires (comme rebuild_rollups : mémoire et
+    requêtes bornées). Retourne {grain: lignes écrites}.
+    """
+    written = {grain: 0 for grain, *_ in LEVELS}
+    months = {}
+    for s, p, t in touched:
+        months.setdefault(truncate(t, "month"), set()).add((s, p, truncate(t, "hour")))
+    for month in sorted(months):
+        # tri par site / paramètre : un seau jour ou mois est rarement réparti sur plusieurs lots
+        hours = sorted(months.pop(month))
+        for i in range(0, len(hours), REFRESH_BATCH_SIZE):
+            keys = set(hours[i:i + REFRESH_BATCH_SIZE])
+            for grain, model, source, time_field, _ in LEVELS:
+                keys = {(s, p, truncate(t, grain)) for s, p, t in keys}
+                written[grain] += _refresh_level(grain, model, source, time_field, keys)
+    return written
+
+
+def rebuild_rollups(start, end, site_ids=None):
+    """
+    Reconstruit les trois niveaux sur [start, end) (arrondis au mois) : suppression
+    puis insertion, mois par mois (une transaction par mois), par lots de
+    REFRESH_BATCH_SIZE lignes (mémoire bornée).
+    Retourne {grain: lignes écrites}.
+    """
+    written = {grain: 0 for grain, *_ in LEVELS}
+    month = truncate(start, "month")
+    while month < end:
+        upper = next_bucket(month, "month")
+        with transaction.atomic():
+            for grain, model, source, time_field, _ in LEVELS:
+                scope = model.objects.filter(bucket__gte=month, bucket__lt=upper)
+                rows = aggregate(source, time_field, grain).filter(**{
+                    f"{time_field}__gte": month, f"{time_field}__lt": upper,
+                })
+                if site_ids is not None:
+                    scope = scope.filter(site_id__in=site_ids)
+                    rows = rows.filter(site_id__in=site_ids)
+                scope.delete()
+                # lu en flux, inséré par lots : jamais tout le mois en mémoire
+                objs = (_build(model, r) for r in rows.iterator(chunk_size=REFRESH_BATCH_SIZE))
+                while True:
+                    batch = list(islice(objs, REFRESH_BATCH_SIZE))
+                    if not batch:
+                        break
+                    model.objects.bulk_create(batch)
+                    written[grain] += len(batch)
+        month = upper
+    return written
+
+
+def pick_rollup(width=None, calendar_month=False):
+    """
+    (grain, modèle) de l'agrégat le plus grossier utilisable pour des seaux de
+    `width` secondes (multiples du grain), ou (None, None) : lecture du brut.
+    """
+    if calendar_month:
+        return "month", RectifierMonthly
+    for grain, model, _, _, seconds in reversed(LEVELS[:2]):
+        if width and width % seconds == 0:
+            return grain, model
+    return None, None
@@ -0,0 +1,102 @@
+# rectifiers/series.py
+"""
+Séries temporelles réduites pour les graphiques (GET /api/rectifiers/series/).
+
+  mode=bucket : min / avg / max / count par seau de temps, calculés en SQL
+                (date_bin sous PostgreSQL >= 14, arithmétique epoch sous sqlite),
+                depuis l'agrégat horaire / journalier / mensuel le plus grossier
+                compatible (rectifiers.rollups) ; bornes alors arrondies au grain ;
+  mode=lttb   : sous-échantillonnage Largest-Triangle-Three-Buckets des points
+                bruts (forme de la courbe conservée : pics, creux).
+
+La taille de la réponse dépend du nombre de points demandé, pas du volume brut.
+"""
+import math
+import re
+
+import numpy as np
+from django.db.models import DateTimeField, Func
+
+
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+MAX_SITES = 50
+
+# largeurs "rondes" proposées quand seule la résolution (points) est donnée
+NICE_STEPS = [
+    1, 5, 10, 30,
+    60, 5 * 60, 15 * 60, 30 * 60,
+    3600, 3 * 3600, 6 * 3600, 12 * 3600,
+    86400, 7 * 86400,
+]
+UNITS = {"s": 1, "m": 60, "min": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+MONTH_BUCKETS = {"1mo", "month"}  # seaux calendaires (agrégat mensuel)
+
+# origine des seaux : un lundi, pour des seaux hebdomadaires alignés sur la semaine
+ORIGIN = "2000-01-03 00:00:00+00"
+ORIGIN_EPOCH = 946857600
+
+
+def parse_width(value):
+    """'15m', '1h', '2d', '900' -> secondes (None si illisible)."""
+    m = re.fullmatch(r"\s*(\d+)\s*(s|m|min|h|d|w)?\s*", value or "")
+    if not m or int(m.group(1)) == 0:
+        return None
+    return int(m.group(1)) * UNITS[m.group(2) or "s"]
+
+
+def auto_width(seconds, points):
+    """Plus petite largeur ronde donnant au plus `points` seaux sur `seconds`."""
+    raw = max(seconds / points, 1)
+    for step in NICE_STEPS:
+        if step >= raw:
+            return step
+    week = NICE_STEPS[-1]
+    return math.ceil(raw / week) * week
+
+
+class DateBin(Func):
+    """Début du seau de `seconds` secondes contenant l'horodatage (UTC)."""
+    output_field = DateTimeField()
+
+    def __init__(self, expression, seconds, **extra):
+        self.seconds = int(seconds)
+        super().__init__(expression, **extra)
+
+    def as_postgresql(self, compiler, connection, **extra):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return (
+            f"date_bin(%s::interval, {sql}, TIMESTAMP WITH TIME ZONE '{ORIGIN}')",
+            [f"{self.seconds} seconds", *params],
+        )
+
+    def as_sqlite(self, compiler, connection, **extra):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return (
+            f"datetime((CAST(strftime('%%s', {sql}) AS INTEGER) - {ORIGIN_EPOCH}) / %s * %s + {ORIGIN_EPOCH}, 'unixepoch')",
+            [*params, self.seconds, self.seconds],
+        )
+
+
+def lttb(x, y, threshold):
+    """
+    Indices des points retenus par Largest-Triangle-Three-Buckets (x croissant).
+    Premier et dernier points toujours gardés ; dans chaque seau intermédiaire,
+    le point formant le plus grand triangle avec le point retenu précédent et la
+    moyenne du seau suivant.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)  # threshold - 2 seaux
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt = slice(hi, edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x, avg_y = x[nxt].mean(), y[nxt].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
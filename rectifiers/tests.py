@@ -1,3 +1,311 @@
+import datetime
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
 from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from energy.models import Country, Site
+from rectifiers import loader, partitions, rollups, series
+from rectifiers.importers import RectifierImporter
+from rectifiers.models import RectifierDaily, RectifierHourly, RectifierMonthly, RectifierReading
+from rectifiers.views import RectifierReadingViewSet
+from users.models import CustomUser
+
+
+UTC = datetime.timezone.utc
+
+
+def at(*args):
+    return datetime.datetime(*args, tzinfo=UTC)
+
+
+def snapshot():
+    return [
+        sorted(
+            model.objects.values_list(
+                "site_id", "country_id", "param_name", "bucket",
+                "value_count", "value_sum", "value_min", "value_max",
+            )
+        )
+        for model in (RectifierHourly, RectifierDaily, RectifierMonthly)
+    ]
+
+
+class RectifierFixture(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.senegal = Country.objects.create(name="Senegal")
+        cls.mali = Country.objects.create(name="Mali")
+        cls.s1 = Site.objects.create(site_id="S1", site_name="S1", country=cls.senegal)
+        cls.s2 = Site.objects.create(site_id="S2", site_name="S2", country=cls.senegal)
+
+    def reading(self, site, measured_at, value, param="p", country=None):
+        return RectifierReading.objects.create(
+            site=site, country=country or self.senegal, param_name=param,
+            param_value=value, measured_at=measured_at,
+        )
+
+
+class RollupTests(RectifierFixture):
+    def setUp(self):
+        self.readings = [
+            self.reading(self.s1, at(2025, 8, 1, 0, 10), Decimal("1")),
+            self.reading(self.s1, at(2025, 8, 1, 0, 40), Decimal("3")),
+            self.reading(self.s1, at(2025, 8, 1, 1, 5), None),
+            self.reading(self.s1, at(2025, 8, 2, 3), Decimal("5")),
+            self.reading(self.s2, at(2025, 8, 31, 23, 59), Decimal("2"), param="q"),
+            self.reading(self.s1, at(2025, 9, 1), Decimal("7")),
+        ]
+
+    def touched(self, readings=None):
+        return {(r.site_id, r.param_name, r.measured_at) for r in readings or self.readings}
+
+    def rebuilt(self):
+        for model in rollups.ROLLUPS.values():
+            model.objects.all().delete()
+        rollups.rebuild_rollups(at(2025, 8, 1), at(2025, 10, 1))
+        return snapshot()
+
+    def test_refresh_levels(self):
+        written = rollups.refresh_rollups(self.touched())
+        self.assertEqual(written, {"hour": 5, "day": 4, "month": 3})
+
+        hour = RectifierHourly.objects.get(site=self.s1, param_name="p", bucket=at(2025, 8, 1, 0))
+        self.assertEqual((hour.value_count, hour.value_sum, hour.value_min, hour.value_max), (2, 4, 1, 3))
+        empty = RectifierHourly.objects.get(site=self.s1, param_name="p", bucket=at(2025, 8, 1, 1))
+        self.assertEqual((empty.value_count, empty.value_sum, empty.value_min), (0, 0, None))
+        month = RectifierMonthly.objects.get(site=self.s1, param_name="p", bucket=at(2025, 8, 1))
+        self.assertEqual((month.value_count, month.value_sum, month.value_max), (3, 9, 5))
+
+    def test_refresh_matches_rebuild(self):
+        rollups.refresh_rollups(self.touched())
+        self.assertEqual(snapshot(), self.rebuilt())
+
+    def test_refresh_in_small_batches_matches_rebuild(self):
+        with mock.patch.object(rollups, "REFRESH_BATCH_SIZE", 1):
+            rollups.refresh_rollups(self.touched())
+        self.assertEqual(snapshot(), self.rebuilt())
+
+    def test_rebuild_in_small_batches(self):
+        expected, counts = self.rebuilt(), rollups.rebuild_rollups(at(2025, 8, 1), at(2025, 10, 1))
+        manager = RectifierHourly.objects
+        with mock.patch.object(rollups, "REFRESH_BATCH_SIZE", 2), \
+                mock.patch.object(manager, "bulk_create", wraps=manager.bulk_create) as bulk_create:
+            self.assertEqual(rollups.rebuild_rollups(at(2025, 8, 1), at(2025, 10, 1)), counts)
+        self.assertEqual([len(c.args[0]) for c in bulk_create.call_args_list], [2, 2, 1])
+        self.assertEqual(snapshot(), expected)
+
+    def test_incremental_refresh_only_touches_given_buckets(self):
+        rollups.refresh_rollups(self.touched())
+        new = self.reading(self.s1, at(2025, 8, 1, 0, 50), Decimal("10"))
+        rollups.refresh_rollups(self.touched([new]))
+        hour = RectifierHourly.objects.get(site=self.s1, param_name="p", bucket=at(2025, 8, 1, 0))
+        self.assertEqual((hour.value_count, hour.value_max), (3, 10))
+        self.assertEqual(snapshot(), self.rebuilt())
+
+    def test_stale_buckets_are_deleted(self):
+        rollups.refresh_rollups(self.touched())
+        september = self.readings[-1]
+        september.delete()
+        rollups.refresh_rollups(self.touched([september]))
+        for model in rollups.ROLLUPS.values():
+            self.assertFalse(model.objects.filter(bucket__gte=at(2025, 9, 1)).exists())
+        self.assertEqual(snapshot(), self.rebuilt())
+
+    def test_country_change_moves_buckets(self):
+        rollups.refresh_rollups(self.touched())
+        moved = self.readings[4]
+        RectifierReading.objects.filter(pk=moved.pk).update(country=self.mali)
+        rollups.refresh_rollups(self.touched([moved]))
+        for model in rollups.ROLLUPS.values():
+            rows = model.objects.filter(site=self.s2, param_name="q")
+            self.assertEqual(list(rows.values_list("country_id", flat=True)), [self.mali.pk])
+
+
+class LoaderTests(RectifierFixture):
+    def row(self, site, measured_at, value, fingerprint=1, country=None):
+        return (
+            site.pk, (country or self.senegal).pk, "p", value, "A",
+            measured_at, "f.xlsx", fingerprint,
+        )
+
+    def merge(self, rows):
+        # COPY + INSERT ... ON CONFLICT sous PostgreSQL, bulk_create(update_conflicts) ailleurs
+        with transaction.atomic():
+            loader.create_stage()
+            return loader.merge(rows)
+
+    def test_insert_then_upsert(self):
+        t1, t2 = datetime.datetime(2025, 8, 1, 0), datetime.datetime(2025, 8, 1, 1)
+        self.assertEqual(self.merge([self.row(self.s1, t1, Decimal("1.5")), self.row(self.s2, t1, None)]), 2)
+        self.merge([
+            self.row(self.s1, t1, Decimal("2.25"), fingerprint=2, country=self.mali),
+            self.row(self.s1, t2, Decimal("9")),
+        ])
+
+        self.assertEqual(RectifierReading.objects.count(), 3)
+        updated = RectifierReading.objects.get(site=self.s1, measured_at=at(2025, 8, 1, 0))
+        self.assertEqual(
+            (updated.param_value, updated.country_id, updated.row_fingerprint),
+            (Decimal("2.25"), self.mali.pk, 2),
+        )
+        self.assertIsNone(RectifierReading.objects.get(site=self.s2).param_value)
+        self.assertIsNotNone(updated.imported_at)
+
+    def test_text_values_round_trip(self):
+        self.merge([(self.s1.pk, self.senegal.pk, 'p,"x"', None, "", datetime.datetime(2025, 8, 1), "", None)])
+        reading = RectifierReading.objects.get()
+        self.assertEqual((reading.param_name, reading.measure, reading.row_fingerprint), ('p,"x"', "", None))
+
+    def test_empty_merge(self):
+        self.assertEqual(loader.merge([]), 0)
+
+    def test_value_limit(self):
+        self.assertEqual(loader.value_limit(), 10 ** 10)
+
+
+class ImporterTests(TestCase):
+    def run_import(self, *rows):
+        lines = ["Country,Site ID,Param Name,Param Value,Measure,Date", *(",".join(r) for r in rows)]
+        f = ContentFile("\n".join(lines).encode(), name="r.csv")
+        return RectifierImporter(f, f.name).run()
+
+    def test_too_long_texts_are_reported_without_aborting(self):
+        result = self.run_import(
+            ("Senegal", "S1", "p", "1", "A" * 16, "2025-08-01 00:00"),
+            ("Senegal", "S1", "p", "2", "A" * 17, "2025-08-01 01:00"),
+            ("Senegal", "S1", "p" * 121, "3", "A", "2025-08-01 02:00"),
+            ("Senegal", "S" * 51, "p", "4", "A", "2025-08-01 03:00"),
+            ("X" * 101, "S2", "p", "5", "A", "2025-08-01 04:00"),
+        )
+        self.assertEqual(result["upserted"], 1)
+        self.assertEqual(len(result["errors"]), 4)
+        self.assertIn("measure trop long (max 16", result["errors"][0])
+        self.assertIn("param_name trop long", result["errors"][1])
+        self.assertIn("site_id trop long", result["errors"][2])
+        self.assertIn("country trop long", result["errors"][3])
+        self.assertEqual(list(RectifierReading.objects.values_list("measure", flat=True)), ["A" * 16])
+        # ni site ni pays créés pour les lignes rejetées
+        self.assertEqual(list(Site.objects.values_list("site_id", flat=True)), ["S1"])
+        self.assertEqual(list(Country.objects.values_list("name", flat=True)), ["Senegal"])
+
+
+class PartitionHelperTests(TestCase):
+    def test_months_between(self):
+        months = list(partitions.months_between(datetime.date(2024, 11, 30), datetime.date(2025, 2, 1)))
+        self.assertEqual(months, [(2024, 11), (2024, 12), (2025, 1), (2025, 2)])
+
+    def test_partition_name(self):
+        self.assertEqual(partitions.partition_name(2025, 8), f"{partitions.PARENT}_p2025_08")
+
+    def test_not_partitioned_outside_postgresql(self):
+        if connection.vendor == "postgresql":
+            self.skipTest("PostgreSQL")
+        self.assertFalse(partitions.is_partitioned())
+        self.assertEqual(partitions.ensure_partitions(at(2025, 8, 1), at(2025, 9, 1)), [])
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "partitionnement PostgreSQL uniquement")
+class PartitionTests(RectifierFixture):
+    def rows_in(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {connection.ops.quote_name(table)}")
+            return cursor.fetchone()[0]
+
+    def test_create_partition_moves_rows_out_of_default(self):
+        self.assertTrue(partitions.is_partitioned())
+        # mois lointain : pas de partition, la ligne tombe dans la partition par défaut
+        self.reading(self.s1, at(2099, 5, 10), Decimal("1"))
+        self.reading(self.s1, at(2099, 6, 10), Decimal("2"))
+        self.assertEqual(self.rows_in(partitions.DEFAULT), 2)
+
+        created = partitions.ensure_partitions(at(2099, 5, 1), at(2099, 5, 1))
+        self.assertEqual(created, [partitions.partition_name(2099, 5)])
+        self.assertEqual(self.rows_in(partitions.partition_name(2099, 5)), 1)
+        self.assertEqual(self.rows_in(partitions.DEFAULT), 1)
+        self.assertEqual(RectifierReading.objects.count(), 2)
+        self.assertEqual(partitions.ensure_partitions(at(2099, 5, 1), at(2099, 5, 1)), [])
+
+    def test_rebuild_table_round_trip(self):
+        self.reading(self.s1, at(2025, 8, 1), Decimal("1"))
+        self.reading(self.s2, at(2099, 1, 1), Decimal("2"))
+        before = sorted(RectifierReading.objects.values_list("pk", "site_id", "measured_at", "param_value"))
+
+        partitions.rebuild_table(partitioned=False)
+        self.assertFalse(partitions.is_partitioned())
+        partitions.rebuild_table(partitioned=True)
+        self.assertTrue(partitions.is_partitioned())
+
+        after = sorted(RectifierReading.objects.values_list("pk", "site_id", "measured_at", "param_value"))
+        self.assertEqual(before, after)
+        # une partition par mois présent dans les données
+        self.assertEqual(self.rows_in(partitions.partition_name(2025, 8)), 1)
+        self.assertEqual(self.rows_in(partitions.partition_name(2099, 1)), 1)
+        self.assertEqual(self.rows_in(partitions.DEFAULT), 0)
+        # identity recalée : une nouvelle ligne ne réutilise pas d'id
+        new = self.reading(self.s1, at(2025, 8, 2), Decimal("3"))
+        self.assertGreater(new.pk, max(pk for pk, *_ in before))
+
+
+class SeriesTests(RectifierFixture):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="u", pays="")  # sans filtre pays
+        t0 = at(2025, 8, 1)
+        RectifierReading.objects.bulk_create(
+            RectifierReading(
+                site=self.s1, country=self.senegal, param_name="p", measured_at=t0 + datetime.timedelta(minutes=10 * i),
+                param_value=Decimal(100 if i == 37 else i % 7),
+            )
+            for i in range(200)
+        )
+        for i in range(4):
+            self.reading(self.s2, t0 + datetime.timedelta(hours=i), Decimal(i))
+        self.reading(self.s2, t0 + datetime.timedelta(hours=5), None)
+        self.reading(self.s2, t0, Decimal("9"), param="q")
+
+    def get(self, **params):
+        request = APIRequestFactory().get("/", {"param": "p", **params})
+        force_authenticate(request, self.user)
+        return RectifierReadingViewSet.as_view({"get": "series"})(request)
+
+    def test_lttb_downsamples_each_site(self):
+        response = self.get(site_id="S1,S2", mode="lttb", points=20)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["mode"], response.data["points"]), ("lttb", 20))
+        s1, s2 = response.data["series"]
+        self.assertEqual((s1["site_id"], s2["site_id"]), ("S1", "S2"))
+
+        stamps = [p["t"] for p in s1["points"]]
+        self.assertEqual(len(stamps), 20)
+        self.assertEqual(stamps, sorted(set(stamps)))
+        self.assertEqual((stamps[0], stamps[-1]), (at(2025, 8, 1), at(2025, 8, 1) + datetime.timedelta(minutes=1990)))
+        self.assertIn(100.0, [p["value"] for p in s1["points"]])  # pic conservé
+
+        # moins de points que demandé : tous gardés, valeurs nulles exclues
+        self.assertEqual([p["value"] for p in s2["points"]], [0.0, 1.0, 2.0, 3.0])
+
+    def test_lttb_respects_date_bounds(self):
+        response = self.get(site_id="S1", mode="lttb", points=5, date_from="2025-08-01T01:00:00Z", date_to="2025-08-01T02:00:00Z")
+        points = response.data["series"][0]["points"]
+        self.assertEqual(len(points), 5)
+        self.assertEqual((points[0]["t"], points[-1]["t"]), (at(2025, 8, 1, 1), at(2025, 8, 1, 2)))
+
+    def test_invalid_requests(self):
+        for params in ({}, {"site_id": "S1", "mode": "raw"}, {"site_id": "S1", "points": "x"},
+                       {"site_id": ",".join(f"S{i}" for i in range(51))}):
+            self.assertEqual(self.get(**params).status_code, 400, params)
+        response = self.get(site_id="NONE", mode="lttb")
+        self.assertEqual((response.status_code, response.data["series"]), (200, []))
 
-# Create your tests here.
+    def test_lttb_indices(self):
+        x = np.arange(1000, dtype=float)
+        keep = series.lttb(x, np.sin(x / 50), 50)
+        self.assertEqual(len(keep), 50)
+        self.assertEqual((keep[0], keep[-1]), (0, 999))
+        self.assertTrue((np.diff(keep) > 0).all())
+        self.assertEqual(list(series.lttb(x[:10], x[:10], 20)), list(range(10)))
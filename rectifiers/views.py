@@ -1,64 +1,70 @@
 # rectifiers/views.py
-import math
-import re
-import pandas as pd
-from dateutil.parser import parse as parse_date
-
-from django.db import transaction, DataError
-from django.db.models import Q
-from rest_framework import viewsets, status
+import datetime
+import itertools
+from functools import reduce
+from operator import or_
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 
-from energy.models import Country, Site
+from enertrack_backend.exports import ExportMixin, model_fields
+from enertrack_backend.pagination import KeysetPagination, StreamAllMixin
+from ingestion.views import ImportViewMixin
+from .importers import RectifierImporter
 from .models import RectifierReading
 from .serializers import RectifierReadingSerializer
+from . import rollups, series
 
 
-def _norm_col(s: str) -> str:
-    s = str(s or "").lower()
-    s = re.sub(r"[^a-z0-9]+", " ", s)
-    return re.sub(r"\s+", " ", s).strip()
-
-def to_none_if_code(v):
-    if v is None:
-        return None
-    s = str(v).strip().upper()
-    if s in {"NI", "NM", "NC", "N/A", ""}:
-        return None
-    return v
-
-def safe_decimal(v, decimals=6):
-    v = to_none_if_code(v)
-    if v is None or (isinstance(v, float) and math.isnan(v)):
-        return None
+def _instant(value, name):
+    """'2025-08-01' ou '2025-08-01T10:00[:00][+00:00]' -> datetime aware."""
     try:
-        return round(float(str(v).replace(",", "")), decimals)
-    except Exception:
-        return None
+        dt = parse_datetime(value)
+        if dt is None:
+            d = parse_date(value)
+            dt = d and datetime.datetime.combine(d, datetime.time.min)
+    except ValueError:
+        dt = None
+    if dt is None:
+        raise ValidationError({"detail": f"{name} attendu au format AAAA-MM-JJ[THH:MM]"})
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
 
-def safe_dt(v):
-    if v is None or (isinstance(v, float) and math.isnan(v)):
-        return None
-    try:
-        # pandas to_datetime gère bien beaucoup de formats, mais ici on reste simple
-        return parse_date(str(v))
-    except Exception:
-        return None
 
+def _float(v):
+    return None if v is None else float(v)
 
-class RectifierReadingViewSet(viewsets.ReadOnlyModelViewSet):
+
+class RectifierReadingViewSet(ExportMixin, StreamAllMixin, ImportViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     GET /api/rectifiers/?q=&site_id=&country=&param=&date_from=&date_to=
+    GET /api/rectifiers/export/?output=csv|ndjson|parquet|arrow  (mêmes filtres, en flux)
+    GET /api/rectifiers/series/?site_id=A,B&param=&date_from=&date_to=&points=500|bucket=1h[&mode=lttb]
     POST /api/rectifiers/import/  (multipart: file=... [, country=...])
+    POST /api/rectifiers/import-async/  (idem, en tâche de fond -> task_id)
     """
     queryset = RectifierReading.objects.select_related("site", "site__country", "country")
     serializer_class = RectifierReadingSerializer
+    pagination_class = KeysetPagination
+    export_name = "rectifiers"
+    export_columnar = True
+    export_fields = [("site_id", "site__site_id"), ("site_name", "site__site_name"), ("country", "country__name"), *model_fields(RectifierReading, exclude=["site", "country"])]
+    importer_class = RectifierImporter
     parser_classes = [MultiPartParser]
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        # tri sur colonnes locales : même ordre que l'index de pagination (Meta.indexes)
+        return self.filter_readings(super().get_queryset()).order_by("-measured_at", "site_id")
+
+    def filter_readings(self, qs, time_field="measured_at"):
+        """Filtres de la requête, communs aux relevés et aux agrégats (time_field=None : sans les dates)."""
         p = self.request.query_params
 
         # Filtre par pays de l'utilisateur si défini (comme energy)
@@ -69,7 +75,8 @@ class RectifierReadingViewSet(viewsets.ReadOnlyModelViewSet):
         if p.get("country"):
             qs = qs.filter(country__name__iexact=p["country"])
         if p.get("site_id"):
-            qs = qs.filter(site__site_id__iexact=p["site_id"])
+            sites = [s.strip() for s in p["site_id"].split(",") if s.strip()]
+            qs = qs.filter(reduce(or_, (Q(site__site_id__iexact=s) for s in sites), Q()))
         if p.get("param"):
             qs = qs.filter(param_name__iexact=p["param"])
         if p.get("q"):
@@ -79,115 +86,119 @@ class RectifierReadingViewSet(viewsets.ReadOnlyModelViewSet):
                 Q(site__site_name__icontains=q) |
                 Q(param_name__icontains=q)
             )
-        if p.get("date_from"):
-            qs = qs.filter(measured_at__gte=p["date_from"])
-        if p.get("date_to"):
-            qs = qs.filter(measured_at__lte=p["date_to"])
-
-        return qs.order_by("-measured_at", "site__site_id")
-
-    @action(detail=False, methods=["post"], url_path="import", parser_classes=[MultiPartParser])
-    def import_file(self, request):
-        f = request.FILES.get("file")
-        if not f:
-            return Response({"detail": "file is required"}, status=400)
-
-        override_country = request.data.get("country")
-
-        # Lecture Excel/CSV
+        # bornes typées sur measured_at seul : PostgreSQL n'ouvre que les partitions
+        # mensuelles concernées (voir rectifiers.partitions)
+        if time_field and p.get("date_from"):
+            qs = qs.filter(**{f"{time_field}__gte": _instant(p["date_from"], "date_from")})
+        if time_field and p.get("date_to"):
+            qs = qs.filter(**{f"{time_field}__lte": _instant(p["date_to"], "date_to")})
+        return qs
+
+    @action(detail=False, methods=["get"])
+    def series(self, request):
+        """
+        Courbe(s) d'un paramètre réduite(s) à `points` points par site :
+          bucket (défaut) : {"t", "min", "avg", "max", "count"} par seau
+                            (largeur ?bucket=15m|1h|1d|1mo..., sinon déduite de ?points=),
+                            lus dans l'agrégat le plus grossier compatible ("source") ;
+          lttb            : {"t", "value"}, points bruts sous-échantillonnés.
+        """
+        p = request.query_params
+        sites = [s.strip() for s in p.get("site_id", "").split(",") if s.strip()]
+        if not p.get("param") or not sites:
+            return Response({"detail": "param et site_id sont requis"}, status=400)
+        if len(sites) > series.MAX_SITES:
+            return Response({"detail": f"{series.MAX_SITES} sites au plus"}, status=400)
+        mode = p.get("mode", "bucket")
+        if mode not in ("bucket", "lttb"):
+            return Response({"detail": "mode doit valoir : bucket, lttb"}, status=400)
         try:
-            if f.name.lower().endswith((".xlsx", ".xls")):
-                df_raw = pd.read_excel(f, header=None, engine="openpyxl")
-            else:
-                df_raw = pd.read_csv(f, header=None, sep=None, engine="python")
-        except Exception as e:
-            return Response({"detail": f"Read error: {e}"}, status=400)
-
-        # trouver la ligne d'en-tête contenant 'Country' et 'Site ID'
-        header_idx = None
-        for i in range(min(len(df_raw), 30)):
-            row_norm = [_norm_col(x) for x in df_raw.iloc[i].astype(str).tolist()]
-            if "country" in row_norm and "site id" in row_norm and "param name" in row_norm:
-                header_idx = i
-                break
-        if header_idx is None:
-            return Response({"detail": "En-tête introuvable (attendu: Country, Site ID, Param Name, Param Value, Measure, Date)."}, status=400)
-
-        df_body = df_raw.iloc[header_idx:].reset_index(drop=True)
-        columns = [str(c).strip() for c in df_body.iloc[0].tolist()]
-        df = df_body.iloc[1:].copy()
-        df.columns = columns
-        df = df.where(pd.notna(df), None)
-
-        # map colonnes
-        norm_cols = {c: _norm_col(c) for c in df.columns}
-        def col_like(*cands):
-            for real, normed in norm_cols.items():
-                if normed in cands:
-                    return real
-            return None
-
-        C_COUNTRY = col_like("country")
-        C_SITE_ID = col_like("site id")
-        C_PARAM   = col_like("param name")
-        C_VALUE   = col_like("param value", "value")
-        C_MEASURE = col_like("measure", "unit")
-        C_DATE    = col_like("date", "timestamp", "time")
-
-        required = [C_SITE_ID, C_PARAM, C_VALUE, C_DATE]
-        if any(c is None for c in required):
-            return Response({"detail": "Colonnes essentielles manquantes (Site ID, Param Name, Param Value, Date)."}, status=400)
-
-        created = 0
-        upserted = 0
-        errors = []
-
-        with transaction.atomic():
-            for _, row in df.iterrows():
-                sid = (row.get(C_SITE_ID) or "").strip()
-                if not sid:
-                    continue
-
-                raw_country = (row.get(C_COUNTRY) or "").strip()
-                country_name = override_country or raw_country or getattr(getattr(request, "user", None), "pays", None) or "Unknown"
-                country, _ = Country.objects.get_or_create(name=country_name)
-
-                # Référentiel site (si non présent, on le crée avec le pays)
-                site, _ = Site.objects.get_or_create(
-                    site_id=sid,
-                    defaults={"country": country, "site_name": sid},
-                )
-                if site.country_id != country.id:
-                    site.country = country
-                    site.save()
-
-                param_name  = (row.get(C_PARAM) or "").strip()
-                param_value = safe_decimal(row.get(C_VALUE), decimals=6)
-                measure     = (row.get(C_MEASURE) or "").strip()
-                measured_at = safe_dt(row.get(C_DATE))
-                if not measured_at:
-                    errors.append(f"{sid}: date illisible -> {row.get(C_DATE)}")
-                    continue
-
-                try:
-                    obj, created_flag = RectifierReading.objects.update_or_create(
-                        site=site, param_name=param_name, measured_at=measured_at,
-                        defaults=dict(
-                            country=country,
-                            param_value=param_value,
-                            measure=measure,
-                            source_filename=f.name,
-                        )
-                    )
-                    upserted += 1
-                    if created_flag:
-                        created += 1
-                except DataError as e:
-                    errors.append(f"{sid} {measured_at}: overflow/invalid value -> {row.get(C_VALUE)}")
-                    continue
-
+            points = int(p.get("points", series.DEFAULT_POINTS))
+        except ValueError:
+            return Response({"detail": "points doit être un entier"}, status=400)
+        points = max(2, min(points, series.MAX_POINTS))
+
+        qs = self.get_queryset().order_by()
+        start = _instant(p["date_from"], "date_from") if p.get("date_from") else None
+        end = _instant(p["date_to"], "date_to") if p.get("date_to") else None
+        if start is None or end is None:
+            bounds = qs.aggregate(first=Min("measured_at"), last=Max("measured_at"))
+            start, end = start or bounds["first"], end or bounds["last"]
+        payload = {
+            "param": p["param"],
+            "mode": mode,
+            "from": start,
+            "to": end,
+        }
+        if start is None or end is None or end < start:
+            return Response({**payload, "series": []})
+
+        if mode == "lttb":
+            return Response({**payload, "points": points, "series": self._lttb_series(qs, points)})
+
+        monthly = p.get("bucket") in series.MONTH_BUCKETS
+        if monthly:
+            width = None
+        elif p.get("bucket"):
+            width = series.parse_width(p["bucket"])
+            if width is None:
+                return Response({"detail": "bucket attendu au format <n>s|m|h|d|w ou 1mo (ex: 15m, 1h)"}, status=400)
+            if (end - start).total_seconds() / width > series.MAX_POINTS:
+                return Response({"detail": f"bucket trop fin : {series.MAX_POINTS} seaux au plus"}, status=400)
+        else:
+            width = series.auto_width((end - start).total_seconds(), points)
+
+        grain, rollup = rollups.pick_rollup(width, calendar_month=monthly)
+        if rollup is None:
+            rows = (
+                qs.filter(measured_at__gte=start, measured_at__lte=end)
+                .annotate(t=series.DateBin("measured_at", width))
+                .values("site__site_id", "t")
+                .annotate(min=Min("param_value"), max=Max("param_value"), total=Sum("param_value"), count=Count("param_value"))
+            )
+        else:
+            rows = (
+                self.filter_readings(rollup.objects.all(), time_field=None)
+                .filter(bucket__gte=rollups.truncate(start, grain), bucket__lte=end)
+                .annotate(t=F("bucket") if monthly else series.DateBin("bucket", width))
+                .values("site__site_id", "t")
+                .annotate(min=Min("value_min"), max=Max("value_max"), total=Sum("value_sum"), count=Sum("value_count"))
+            )
+        out = [
+            {
+                "site_id": site_id,
+                "points": [
+                    {
+                        "t": r["t"], "min": _float(r["min"]), "max": _float(r["max"]), "count": r["count"],
+                        "avg": float(r["total"]) / r["count"] if r["count"] else None,
+                    }
+                    for r in group
+                ],
+            }
+            for site_id, group in itertools.groupby(rows.order_by("site__site_id", "t"), key=lambda r: r["site__site_id"])
+        ]
         return Response({
-            "upserted": upserted,
-            "created": created,
-            "errors": errors,
-        }, status=status.HTTP_201_CREATED if upserted else status.HTTP_200_OK)
+            **payload,
+            "bucket": "month" if monthly else None,
+            "bucket_seconds": width,
+            "source": grain or "raw",
+            "series": out,
+        })
+
+    def _lttb_series(self, qs, points):
+        rows = (
+            qs.filter(param_value__isnull=False)
+            .values_list("site__site_id", "measured_at", "param_value")
+            .order_by("site__site_id", "measured_at")
+            .iterator(chunk_size=settings.STREAM_CHUNK_SIZE)
+        )
+        out = []
+        for site_id, group in itertools.groupby(rows, key=lambda r: r[0]):
+            stamps, values = [], []
+            for _, t, v in group:
+                stamps.append(t)
+                values.append(float(v))
+            x = np.array([t.timestamp() for t in stamps])
+            keep = series.lttb(x, np.array(values), points)
+            out.append({"site_id": site_id, "points": [{"t": stamps[i], "value": values[i]} for i in keep]})
+        return out